@@ -0,0 +1,242 @@
+"""Static asset pipeline: bundle, minify, fingerprint and precompress CSS/JS.
+
+    flask --app app build-assets      # run on every deploy (bin/post_compile on Heroku)
+
+writes css/dist/:
+
+    dist/bundle/site.3f2a9c1b0d.css       style.css + colourcustomiser/colour.css
+    dist/js/chat.9be41c07aa.js            every other .css/.js, one file each
+    dist/js/chat.9be41c07aa.js.gz / .br   precompressed copies
+    dist/manifest.json                    {'js/chat.js': 'dist/js/chat.9be41c07aa.js', ...}
+
+Once a manifest exists, url_for('static', filename='js/chat.js') returns the
+fingerprinted file, which is served with a year-long immutable
+Cache-Control, as brotli or gzip when the browser accepts it. Templates
+include bundles with asset_urls('bundle/site.css'), which lists the parts
+instead while the manifest is missing or the app runs in debug mode, so
+edits show up without a rebuild.
+
+rcssmin, rjsmin and brotli are optional: without them CSS is minified by
+a small built-in pass, JS is only precompressed, and only gzip is written.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import time
+
+from flask import current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+STALE_BUILD_AGE = 7 * 24 * 3600  # old fingerprinted files are kept this long for cached pages
+
+# Files every page loads, served as one request (order is cascade order)
+BUNDLES = {
+    'bundle/site.css': ['style.css', 'colourcustomiser/colour.css'],
+    'bundle/site.js': ['js/base.js', 'colourcustomiser/thememanager.js', 'colourcustomiser/maincolour.js'],
+}
+
+# Never fingerprinted: user files and the build output itself
+SKIP_DIRS = ('uploads', DIST_DIR)
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|([^"\'/]+|/)', re.S)
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^)\'"]+)\1\s*\)')
+_CSS_IMPORT = re.compile(r'@import[^;]+;')
+
+_manifest = {}
+
+
+# --- MINIFYING ---
+def _squeeze_css(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r' ?([{};,>]) ?', r'\1', code)
+    return code.replace(';}', '}')
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    # Strings are kept as they are; comments go; whitespace is squeezed elsewhere
+    out = []
+    for string, comment, code in _CSS_TOKENS.findall(text):
+        if string:
+            out.append(string)
+        elif code:
+            out.append(_squeeze_css(code))
+    return ''.join(out).strip()
+
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text  # a safe JS minifier needs a real parser; gzip/brotli still apply
+
+
+def _absolute_urls(css, rel_path, static_url_path):
+    """Rewrite relative url(...) so it still resolves from dist/"""
+    base = posixpath.dirname(rel_path)
+
+    def repl(match):
+        quote, target = match.groups()
+        if re.match(r'(/|#|data:|[a-z]+:)', target):
+            return match.group(0)
+        return f"url({quote}{static_url_path}/{posixpath.normpath(posixpath.join(base, target))}{quote})"
+    return _CSS_URL.sub(repl, css)
+
+
+# --- BUILD ---
+def _sources(static_folder):
+    for dirpath, dirnames, files in os.walk(static_folder):
+        rel_dir = os.path.relpath(dirpath, static_folder).replace(os.sep, '/')
+        if rel_dir == '.':
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            rel_dir = ''
+        for f in sorted(files):
+            if f.endswith(('.css', '.js')):
+                yield posixpath.join(rel_dir, f)
+
+
+def _process(rel_path, text, static_url_path):
+    if rel_path.endswith('.css'):
+        return minify_css(_absolute_urls(text, rel_path, static_url_path))
+    return minify_js(text)
+
+
+def _write(dist, rel_path, content):
+    """Write a fingerprinted file plus .gz/.br copies; returns its path relative to the static folder"""
+    data = content.encode('utf-8')
+    stem, ext = posixpath.splitext(rel_path)
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+    path = os.path.join(dist, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    outputs = {path: data, path + '.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        outputs[path + '.br'] = brotli.compress(data, quality=11)
+    for out_path, payload in outputs.items():
+        if not os.path.exists(out_path):
+            with open(out_path + '.tmp', 'wb') as f:
+                f.write(payload)
+            os.replace(out_path + '.tmp', out_path)
+        else:
+            os.utime(out_path)  # still current, so not pruned
+    return f"{DIST_DIR}/{name}", {k[len(path):] or 'raw': len(v) for k, v in outputs.items()}
+
+
+def build_assets(static_folder, static_url_path='/css'):
+    """Build dist/ and its manifest; returns {source: (raw bytes, {variant: bytes})}"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest, stats, processed = {}, {}, {}
+
+    for rel_path in _sources(static_folder):
+        with open(os.path.join(static_folder, *rel_path.split('/')), encoding='utf-8') as f:
+            text = f.read()
+        processed[rel_path] = _process(rel_path, text, static_url_path)
+        manifest[rel_path], sizes = _write(dist, rel_path, processed[rel_path])
+        stats[rel_path] = (len(text.encode('utf-8')), sizes)
+
+    for bundle, parts in BUNDLES.items():
+        chunks = [processed[p] for p in parts if p in processed]
+        if bundle.endswith('.css'):
+            # @import is only valid before every other rule
+            imports = [i for c in chunks for i in _CSS_IMPORT.findall(c)]
+            content = ''.join(imports) + '\n'.join(_CSS_IMPORT.sub('', c) for c in chunks)
+        else:
+            content = ';\n'.join(chunks)
+        manifest[bundle], sizes = _write(dist, bundle, content)
+        stats[bundle] = (sum(stats[p][0] for p in parts if p in stats), sizes)
+
+    with open(os.path.join(dist, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(os.path.join(dist, MANIFEST + '.tmp'), os.path.join(dist, MANIFEST))
+    _prune(dist)
+    return stats
+
+
+def _prune(dist):
+    """Drop outputs of older builds once no cached page can still point at them"""
+    cutoff = time.time() - STALE_BUILD_AGE
+    for dirpath, _, files in os.walk(dist):
+        for f in files:
+            path = os.path.join(dirpath, f)
+            if f != MANIFEST and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# --- SERVING ---
+def _enabled():
+    return bool(_manifest) and not current_app.debug
+
+
+def asset_urls(bundle):
+    """URLs a template should include for a bundle: the built file, or its parts"""
+    if _enabled() and bundle in _manifest:
+        return [url_for('static', filename=bundle)]
+    return [url_for('static', filename=part) for part in BUNDLES[bundle]]
+
+
+def fingerprint_static(endpoint, values):
+    """url_defaults hook: static URLs point at the fingerprinted file when one exists"""
+    if endpoint == 'static' and _enabled():
+        filename = values.get('filename')
+        values['filename'] = _manifest.get(filename, filename)
+
+
+def serve_built_asset():
+    """before_request hook: dist/ files as brotli or gzip with immutable caching"""
+    if request.endpoint != 'static':
+        return None
+    filename = request.view_args.get('filename', '')
+    if not filename.startswith(DIST_DIR + '/'):
+        return None
+    path = safe_join(current_app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    mimetype = mimetypes.guess_type(path)[0]
+    for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.exists(path + ext):
+            response = send_file(path + ext, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def register_assets(app):
+    global _manifest
+    _manifest = load_manifest(app.static_folder)
+    app.url_defaults(fingerprint_static)
+    app.before_request(serve_built_asset)
+    app.add_template_global(asset_urls)
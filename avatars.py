@@ -0,0 +1,187 @@
+"""Avatar service: small square avatars at fixed sizes, cached on disk.
+
+    /avatar/<user_id>?s=64&v=<version>
+
+- s is snapped to one of AVATAR_SIZES
+- uploaded photos are cropped to a square, resized and cached under
+  instance/avatar-cache/ (WebP when the browser accepts it, else JPEG)
+- users without a photo (default.png, the old initials URL) get an SVG
+  with their initials on their background_color, as does a photo that
+  cannot be decoded
+- a photo is only ever an uploaded blob (blobstore.py); profile_pic is
+  otherwise one of BUILTIN_AVATARS (see is_valid_profile_pic)
+- the ETag is a hash of everything that decides the bytes; v is the same
+  for the current profile, so avatar_url() links can be cached forever
+
+Rendering photos needs Pillow; without it the initials are shown.
+"""
+import hashlib
+import os
+import re
+import time
+
+from flask import current_app, url_for
+from markupsafe import escape
+from werkzeug.security import safe_join
+
+from blobstore import BLOB_PATTERN, uploads_dir
+from offload import run_blocking
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+AVATAR_SIZES = (32, 64, 128)
+DEFAULT_SIZE = 64
+RENDER_VERSION = 1  # bump when the rendering below changes
+CACHE_MAX_AGE = 30 * 24 * 3600  # unused cache files are pruned after this (gc-blobs)
+
+DEFAULT_COLOR = '#f8f9fa'
+# Used when a user has never picked a colour, so not every placeholder is grey
+PALETTE = ('#e57373', '#f06292', '#ba68c8', '#7986cb', '#4fc3f7', '#4db6ac', '#81c784', '#ffb74d', '#a1887f')
+
+UPLOAD_PREFIX = '/css/uploads/'  # profile_pic of an uploaded photo: UPLOAD_PREFIX + blob name
+# The suggested pictures on choose_profile_pic.html
+BUILTIN_AVATARS = tuple(f'https://api.dicebear.com/7.x/avataaars/svg?seed={seed}'
+                        for seed in ('Felix', 'Aneka', 'Willow', 'Bear', 'Bandit', 'Jasper'))
+
+_HEX = re.compile(r'#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})')
+
+
+def _digest(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def snap_size(size):
+    """The smallest rendered size at least `size` wide"""
+    if not size:
+        return DEFAULT_SIZE
+    return next((s for s in AVATAR_SIZES if s >= size), AVATAR_SIZES[-1])
+
+
+# --- SOURCES ---
+def uploaded_photo(pic):
+    """Absolute path of the uploaded blob a profile_pic names, or None"""
+    if not (pic or '').startswith(UPLOAD_PREFIX):
+        return None
+    name = pic[len(UPLOAD_PREFIX):]
+    if not BLOB_PATTERN.fullmatch(name):
+        return None
+    path = safe_join(uploads_dir(), name)
+    return path if path and os.path.isfile(path) else None
+
+
+def is_valid_profile_pic(pic):
+    """Whether a submitted profile_pic is a built-in avatar or an uploaded blob"""
+    return pic in BUILTIN_AVATARS or uploaded_photo(pic) is not None
+
+
+def avatar_source(user):
+    """('photo', path), ('remote', url) or ('initials', None) for a user's profile_pic"""
+    pic = user.profile_pic or ''
+    if pic.startswith('http'):
+        # The old "Remove Photo" stored a third-party initials URL; draw those locally
+        if '/initials/' in pic:
+            return 'initials', None
+        return 'remote', pic
+    path = uploaded_photo(pic)
+    if path:
+        return 'photo', path
+    return 'initials', None
+
+
+def avatar_version(user):
+    """Changes whenever anything shown in the avatar changes"""
+    return _digest(RENDER_VERSION, user.profile_pic, user.background_color, user.username)[:12]
+
+
+def avatar_url(user, size=DEFAULT_SIZE):
+    return url_for('media.avatar', user_id=user.id, s=snap_size(size), v=avatar_version(user))
+
+
+# --- INITIALS PLACEHOLDER ---
+def initials(username):
+    words = [w for w in re.split(r'[\s_.\-]+', username or '') if w]
+    if not words:
+        return '?'
+    return ''.join(w[0] for w in words[:2]).upper()
+
+
+def placeholder_colors(user):
+    """(background, text) colours; the text is dark or light for contrast"""
+    match = _HEX.fullmatch((user.background_color or '').strip())
+    if match and user.background_color.lower() != DEFAULT_COLOR:
+        hex_value = match.group(1)
+        if len(hex_value) == 3:
+            hex_value = ''.join(c * 2 for c in hex_value)
+        background = '#' + hex_value.lower()
+    else:
+        background = PALETTE[int(_digest(user.username), 16) % len(PALETTE)]
+    r, g, b = (int(background[i:i + 2], 16) / 255 for i in (1, 3, 5))
+    luminance = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    return background, '#212529' if luminance > 0.6 else '#ffffff'
+
+
+def placeholder(user, size):
+    """(svg, etag) of the initials placeholder"""
+    background, foreground = placeholder_colors(user)
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">'
+        f'<rect width="100" height="100" fill="{background}"/>'
+        f'<text x="50" y="50" dy=".35em" text-anchor="middle" font-family="Helvetica,Arial,sans-serif" '
+        f'font-size="42" font-weight="600" fill="{foreground}">{escape(initials(user.username))}</text></svg>'
+    )
+    return svg, _digest(RENDER_VERSION, svg)
+
+
+# --- PHOTO CACHE ---
+def _cache_dir():
+    return current_app.config.get('AVATAR_CACHE_DIR') or os.path.join(current_app.instance_path, 'avatar-cache')
+
+
+def _render_photo(src, dst, size, fmt):
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im).convert('RGB')
+    im = ImageOps.fit(im, (size, size), Image.LANCZOS)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    im.save(tmp_path, format=fmt.upper(), quality=85)
+    os.replace(tmp_path, dst)
+
+
+def photo_etag(path, size, fmt):
+    # Relative, so every host serving the app agrees on the ETag
+    return _digest(RENDER_VERSION, os.path.relpath(path, current_app.root_path), size, fmt)
+
+
+def cached_photo(path, size, fmt):
+    """Path of the rendered avatar, rendering it on first use; None without Pillow or if it can't decode the photo"""
+    if Image is None:
+        return None
+    key = photo_etag(path, size, fmt)
+    dst = os.path.join(_cache_dir(), key[:2], f"{key}.{fmt}")
+    if not os.path.exists(dst):
+        try:
+            run_blocking(_render_photo, path, dst, size, fmt)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            print(f"Error rendering avatar {path}: {e}")
+            return None
+    return dst
+
+
+def prune_cache(max_age=CACHE_MAX_AGE):
+    """Delete cached avatars older than max_age (they are re-rendered on demand)"""
+    cutoff = time.time() - max_age
+    removed = []
+    for dirpath, _, files in os.walk(_cache_dir()):
+        for f in files:
+            path = os.path.join(dirpath, f)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(path)
+    return removed
+
+
+def register_avatar_helpers(app):
+    app.add_template_global(avatar_url)
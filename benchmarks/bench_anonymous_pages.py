@@ -0,0 +1,71 @@
+"""Anonymous page cache benchmark: a burst of visitors from a shared link.
+
+Each simulated visitor is a fresh client (no cookies) that opens a shared
+event link, with a different fbclid each time as social networks add, and
+then the browse page. Reports median latency and SQL queries per page with
+page_cache.py disabled and enabled.
+
+    python benchmarks/bench_anonymous_pages.py [--visitors 200] [--events 300]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as clock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--visitors', type=int, default=200)
+    parser.add_argument('--events', type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    import fragments
+    import page_cache
+    from sqlalchemy import event as sa_event
+    from app import create_app
+    from models import db, Event
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        for i in range(args.events):
+            db.session.add(Event(title=f'Event {i}', description='Come along! ' * 10, date=date(2030, 1, 1 + i % 28),
+                                 time=clock(10, 0), category='Social', location='Community hall', slots=20, host='Yong'))
+        db.session.commit()
+        shared_id = Event.query.order_by(Event.id.desc()).first().id
+        queries = []
+        sa_event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+
+    pages = {'shared event': f'/events/{shared_id}?fbclid={{n}}&utm_source=facebook', 'browse': '/events/browse'}
+    print(f"visitors: {args.visitors}  events: {args.events}")
+    print(f"{'page':<14} {'cache':<22} {'median ms':>10} {'queries':>8}")
+    for label, enabled in (('off', False), ('listing cache only', True), ('listing + page cache', True)):
+        fragments.ENABLED = enabled
+        page_cache.ENABLED = label == 'listing + page cache'
+        fragments.listing_cache.clear()
+        results = {name: ([], []) for name in pages}
+        for n in range(args.visitors):
+            client = app.test_client()
+            for name, url in pages.items():
+                queries.clear()
+                start = time.perf_counter()
+                assert client.get(url.format(n=n)).status_code == 200
+                results[name][0].append((time.perf_counter() - start) * 1000)
+                results[name][1].append(len(queries))
+        for name, (times, counts) in results.items():
+            print(f"{name:<14} {label:<22} {statistics.median(times):>10.2f} {statistics.mean(counts):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Chat start-up benchmark: separate calls vs one /chat/bootstrap request.
+
+Seeds --friends friends with --messages messages in each conversation,
+then measures what the chat page fetches on load before the last open
+conversation is interactive:
+
+    separate    /chat/unread-count, the whole /chat/history/<id>, and the
+                last message of every conversation for the contact list
+                (/chat/history/<friend>?limit=1 each)
+    bootstrap   /chat/bootstrap?open=<id> (badges, previews, presence and
+                the latest history page)
+
+Reports requests, SQL queries, bytes and total server time per page load,
+and an estimated load time on a link with --rtt ms round trips where the
+browser runs six requests at a time. Query counts should not grow with
+--friends or --messages for bootstrap.
+
+    python benchmarks/bench_chat_bootstrap.py [--friends 50] [--messages 200] [--loads 20] [--rtt 150]
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--friends', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--loads', type=int, default=20)
+    parser.add_argument('--rtt', type=float, default=150, help='round trip time in ms')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from sqlalchemy import event as sa_event
+    from app import create_app
+    from models import db, User, Message
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        viewer = User.query.first()
+        friends = [User(username=f'friend{i}', email=f'friend{i}@example.com', _password_hash='-')
+                   for i in range(args.friends)]
+        db.session.add_all(friends)
+        viewer.friends.extend(friends)
+        db.session.flush()
+        start = datetime.utcnow() - timedelta(days=30)
+        for friend in friends:
+            for i in range(args.messages):
+                sender, receiver = (viewer, friend) if i % 2 else (friend, viewer)
+                db.session.add(Message(sender_id=sender.id, receiver_id=receiver.id, message=f'Message {i} ' * 5,
+                                       timestamp=start + timedelta(minutes=i), is_read=i < args.messages - 4))
+        db.session.commit()
+        viewer_id, open_id = viewer.id, friends[0].id
+        friend_ids = [f.id for f in friends]
+        queries = []
+        sa_event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(viewer_id)
+        sess['_fresh'] = True
+    client.get('/chat/unread-count')  # first request: schema guard, identity cache
+
+    flows = {
+        'separate': ['/chat/unread-count', f'/chat/history/{open_id}'] +
+                    [f'/chat/history/{friend_id}?limit=1' for friend_id in friend_ids],
+        'bootstrap': [f'/chat/bootstrap?open={open_id}'],
+    }
+    print(f"friends: {args.friends}  messages per conversation: {args.messages}  loads: {args.loads}  "
+          f"rtt: {args.rtt:.0f} ms")
+    print(f"{'flow':<10} {'requests':>8} {'queries':>8} {'KB':>8} {'server ms':>10} {'est. load ms':>13}")
+    for name, urls in flows.items():
+        times, counts, sizes = [], [], []
+        for _ in range(args.loads):
+            queries.clear()
+            size, started = 0, time.perf_counter()
+            for url in urls:
+                response = client.get(url, headers={'Accept-Encoding': 'br, gzip'})
+                assert response.status_code == 200, (url, response.status_code)
+                size += len(response.get_data())
+            times.append((time.perf_counter() - started) * 1000)
+            counts.append(len(queries))
+            sizes.append(size)
+        server_ms = statistics.median(times)
+        load_ms = server_ms + math.ceil(len(urls) / 6) * args.rtt
+        print(f"{name:<10} {len(urls):>8} {statistics.mean(counts):>8.1f} {statistics.median(sizes) / 1024:>8.1f} "
+              f"{server_ms:>10.2f} {load_ms:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
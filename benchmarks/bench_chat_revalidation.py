@@ -0,0 +1,84 @@
+"""Chat JSON revalidation benchmark: full responses vs 304s from watermark ETags.
+
+Seeds a conversation of --messages messages (some edited, the rest read)
+plus unread messages from other friends, then fetches /chat/history/<id>
+and /chat/unread-count repeatedly: once as a plain GET every time, once
+sending back the ETag of the previous response like the browser does.
+Reports median latency, SQL queries and bytes on the wire per request.
+
+    python benchmarks/bench_chat_revalidation.py [--messages 500] [--requests 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from sqlalchemy import event as sa_event
+    from app import create_app
+    from models import db, User, Message
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        viewer, peer, *others = User.query.all()
+        start = datetime.utcnow() - timedelta(days=30)
+        for i in range(args.messages):
+            sender, receiver = (viewer, peer) if i % 2 else (peer, viewer)
+            db.session.add(Message(sender_id=sender.id, receiver_id=receiver.id, message=f'Message {i} ' * 8,
+                                   timestamp=start + timedelta(minutes=i), is_read=True,
+                                   edited=i % 25 == 0, edited_at=start + timedelta(minutes=i + 1) if i % 25 == 0 else None))
+        for other in others:
+            for i in range(3):
+                db.session.add(Message(sender_id=other.id, receiver_id=viewer.id, message=f'Hello {i}'))
+        db.session.commit()
+        viewer_id, peer_id = viewer.id, peer.id
+        queries = []
+        sa_event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(viewer_id)
+        sess['_fresh'] = True
+
+    headers = {'Accept-Encoding': 'br, gzip'}
+    print(f"messages: {args.messages}  requests: {args.requests}")
+    print(f"{'endpoint':<20} {'mode':<12} {'median ms':>10} {'queries':>8} {'bytes':>8} {'304s':>5}")
+    for url in (f'/chat/history/{peer_id}', '/chat/unread-count'):
+        for mode in ('full', 'revalidate'):
+            etag = None
+            times, counts, sizes, not_modified = [], [], [], 0
+            for _ in range(args.requests):
+                request_headers = dict(headers, **({'If-None-Match': etag} if mode == 'revalidate' and etag else {}))
+                queries.clear()
+                started = time.perf_counter()
+                response = client.get(url, headers=request_headers)
+                times.append((time.perf_counter() - started) * 1000)
+                assert response.status_code in (200, 304), response.status_code
+                not_modified += response.status_code == 304
+                etag = response.headers.get('ETag', etag)
+                counts.append(len(queries))
+                sizes.append(len(response.get_data()))
+            print(f"{url.split('/')[2]:<20} {mode:<12} {statistics.median(times):>10.2f} "
+                  f"{statistics.mean(counts):>8.1f} {statistics.median(sizes):>8.0f} {not_modified:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Chat revisit benchmark: re-downloading the history page vs delta sync.
+
+Seeds a conversation of --messages messages, then simulates --visits
+visits to the chat. Between visits the peer sends --new messages and one
+older message is edited and another deleted. Each visit fetches either:
+
+    refetch   the latest history page, /chat/history/<id>?limit=50, as
+              chat.js did before the IndexedDB cache
+    sync      /chat/sync/<id> with the watermark of the previous visit
+              (what a cached conversation asks for)
+    idle      /chat/sync/<id> when nothing changed since, sending back
+              the ETag (a 304)
+
+Reports median latency, SQL queries, and bytes per visit as JSON and on
+the wire (compressed, as sent to the browser).
+
+    python benchmarks/bench_chat_sync.py [--messages 500] [--new 3] [--visits 30]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--new', type=int, default=3)
+    parser.add_argument('--visits', type=int, default=30)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from sqlalchemy import event as sa_event
+    from app import create_app
+    from models import db, User, Message
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        viewer, peer = User.query.limit(2).all()
+        start = datetime.utcnow() - timedelta(days=30)
+        rng = random.Random(48)
+        words = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(2, 9))) for _ in range(3000)]
+        for i in range(args.messages):
+            sender, receiver = (viewer, peer) if i % 2 else (peer, viewer)
+            db.session.add(Message(sender_id=sender.id, receiver_id=receiver.id, message=' '.join(rng.choices(words, k=rng.randint(3, 25))),
+                                   timestamp=start + timedelta(minutes=i), is_read=True))
+        db.session.commit()
+        viewer_id, peer_id = viewer.id, peer.id
+        queries = []
+        sa_event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+
+    viewer_client, peer_client = app.test_client(), app.test_client()
+    for client, user_id in ((viewer_client, viewer_id), (peer_client, peer_id)):
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+
+    def changes(visit):
+        """The peer sends a few messages, edits one of theirs and deletes another"""
+        with app.app_context():
+            for i in range(args.new):
+                db.session.add(Message(sender_id=peer_id, receiver_id=viewer_id, message=' '.join(rng.choices(words, k=rng.randint(3, 25)))))
+            db.session.commit()
+            edit, delete = [m.id for m in Message.query.filter_by(sender_id=peer_id)
+                            .order_by(Message.id.desc()).offset(10 + 2 * visit).limit(2)]
+        peer_client.put(f'/chat/message/{edit}/edit', json={'message': ' '.join(rng.choices(words, k=12))})
+        peer_client.delete(f'/chat/message/{delete}/delete')
+
+    def sync_url(state):
+        watermark = state['watermark']
+        params = {'after': watermark['after'], 'from': state['from'], 'deleted': watermark['deleted']}
+        if watermark['edited']:
+            params['edited'] = watermark['edited']
+        return f'/chat/sync/{peer_id}?{urlencode(params)}'
+
+    headers = {'Accept-Encoding': 'br, gzip'}
+    first = viewer_client.get(f'/chat/sync/{peer_id}').get_json()
+    state = {'watermark': first['watermark'], 'from': first['messages'][0]['id'], 'etag': None}
+
+    print(f"messages: {args.messages}  new per visit: {args.new}  visits: {args.visits}")
+    print(f"{'flow':<8} {'status':>6} {'median ms':>10} {'queries':>8} {'JSON bytes':>11} {'wire bytes':>11}")
+    for flow in ('refetch', 'sync', 'idle'):
+        times, counts, sizes, raw, statuses = [], [], [], [], set()
+        for visit in range(args.visits):
+            if flow != 'idle':
+                changes(visit)
+            url = f'/chat/history/{peer_id}?limit=50' if flow == 'refetch' else sync_url(state)
+            request_headers = dict(headers)
+            if flow == 'idle' and state['etag']:
+                request_headers['If-None-Match'] = state['etag']
+            queries.clear()
+            started = time.perf_counter()
+            response = viewer_client.get(url, headers=request_headers)
+            times.append((time.perf_counter() - started) * 1000)
+            counts.append(len(queries))
+            sizes.append(len(response.get_data()))
+            statuses.add(response.status_code)
+            # Again uncompressed, for the JSON size and the new watermark
+            plain = viewer_client.get(url, headers={'If-None-Match': request_headers.get('If-None-Match', '')})
+            raw.append(len(plain.get_data()))
+            if response.status_code == 200 and flow != 'refetch':
+                state['watermark'] = plain.get_json()['watermark']
+                state['etag'] = viewer_client.get(sync_url(state)).headers.get('ETag')
+        print(f"{flow:<8} {'/'.join(map(str, sorted(statuses))):>6} {statistics.median(times):>10.2f} "
+              f"{statistics.mean(counts):>8.1f} {statistics.median(raw):>11.0f} {statistics.median(sizes):>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
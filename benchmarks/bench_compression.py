@@ -0,0 +1,100 @@
+"""Compression benchmark: payload size and CPU cost per route.
+
+Requests a set of pages and JSON endpoints as a logged-in user, once
+without Accept-Encoding and once each with gzip and br, and reports the
+bytes sent plus the CPU time compress.py spends per response at its
+dynamic settings (measured on the uncompressed body, cache bypassed).
+
+    python benchmarks/bench_compression.py [--messages 300] [--posts 30] [--repeat 20]
+
+The chat history is filled with --messages messages first, and a
+community with --posts posts and every seed user as a member is created.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = [
+    '/', '/feed', '/communities', '/communities/{community}', '/events/browse', '/events/1',
+    '/events/my-events', '/story/home', '/chat/messaging', '/chat/history/{peer}',
+]
+
+
+def cpu_ms(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--posts', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    import compress
+    from app import create_app
+    from models import db, User, Message, Community, CommunityMember, Post
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        user_id = User.query.filter_by(username='Yong').first().id
+        peer_id = User.query.filter_by(username='Sarah').first().id
+        for i in range(args.messages):
+            sender, receiver = (user_id, peer_id) if i % 2 else (peer_id, user_id)
+            db.session.add(Message(sender_id=sender, receiver_id=receiver,
+                                   message=f"Message {i}: are we still on for the community walk on Saturday?"))
+        community = Community(name='Neighbourhood Walkers', description='Weekly walks around the estate.',
+                              category='Sports', creator_id=user_id)
+        db.session.add(community)
+        db.session.flush()
+        for user in User.query.all():
+            db.session.add(CommunityMember(user_id=user.id, community_id=community.id,
+                                           role='admin' if user.id == user_id else 'member'))
+        for i in range(args.posts):
+            db.session.add(Post(content=f"Post {i}: meeting at the void deck at 7am, bring water!",
+                                user_id=user_id if i % 2 else peer_id, community_id=community.id))
+        db.session.commit()
+        community_id = community.id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    encodings = ['gzip'] + (['br'] if compress.brotli is not None else [])
+    print(f"{'route':<24} {'raw':>9} " + ' '.join(f"{e:>9} {e + ' ms':>8}" for e in encodings))
+    totals = dict.fromkeys(['raw'] + encodings, 0)
+    with app.app_context():
+        for route in ROUTES:
+            url = route.format(peer=peer_id, community=community_id)
+            raw = client.get(url).get_data()
+            row = f"{url:<24} {len(raw):>9,} "
+            totals['raw'] += len(raw)
+            for encoding in encodings:
+                response = client.get(url, headers={'Accept-Encoding': encoding})
+                sent = len(response.get_data()) if response.headers.get('Content-Encoding') == encoding else len(raw)
+                cost = cpu_ms(lambda: compress._compress(raw, encoding), args.repeat)
+                row += f"{sent:>9,} {cost:>8.2f} "
+                totals[encoding] += sent
+            print(row)
+    print(f"{'total':<24} {totals['raw']:>9,} " + ' '.join(f"{totals[e]:>9,} {'':>8}" for e in encodings))
+    for encoding in encodings:
+        print(f"{encoding}: {1 - totals[encoding] / totals['raw']:.1%} fewer bytes")
+
+
+if __name__ == '__main__':
+    main()
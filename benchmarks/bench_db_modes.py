@@ -0,0 +1,141 @@
+"""Socket latency under mixed DB load for each worker / database mode.
+
+A "pinger" Socket.IO client sends chat messages back to back and times each
+send_message -> receive_message round trip, while other clients load
+/chat/history on a long conversation (large read plus an UPDATE/commit) and
+send messages of their own. Each mode runs in a fresh interpreter against a
+throwaway SQLite database:
+
+- eventlet         monkey-patched, DB calls run on the hub (DB_OFFLOAD=0)
+- eventlet+tpool   monkey-patched, DB calls proxied through eventlet's thread pool
+- threading        plain OS threads (SOCKETIO_ASYNC_MODE=threading)
+
+    python benchmarks/bench_db_modes.py [--clients 8] [--seconds 10] [--history 5000]
+
+Reports p50 / p99 / max round-trip time for each mode.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PING_INTERVAL = 0.01  # seconds between pings
+
+MODES = {
+    'eventlet': {'SOCKETIO_ASYNC_MODE': 'eventlet', 'DB_OFFLOAD': '0'},
+    'eventlet+tpool': {'SOCKETIO_ASYNC_MODE': 'eventlet', 'DB_OFFLOAD': '1'},
+    'threading': {'SOCKETIO_ASYNC_MODE': 'threading'},
+}
+
+
+# --- CHILD: runs one mode ---
+def child(args):
+    green = os.environ['SOCKETIO_ASYNC_MODE'] == 'eventlet'
+    if green:
+        import eventlet
+        eventlet.monkey_patch()
+    import threading
+    import time
+    from datetime import datetime, timedelta
+
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from extensions import socketio
+    from models import db, User, Message
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        users = {u.username: u.id for u in User.query.all()}
+        a, b = users['Yong'], users['Sarah']
+        start = datetime.utcnow() - timedelta(days=1)
+        db.session.bulk_insert_mappings(Message, [
+            {'sender_id': (a, b)[i % 2], 'receiver_id': (b, a)[i % 2],
+             'message': f'history message {i} ' * 4, 'timestamp': start + timedelta(seconds=i)}
+            for i in range(args.history)
+        ])
+        db.session.commit()
+
+    def logged_in(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+        return client
+
+    deadline = time.monotonic() + args.seconds
+    samples = []
+
+    def pinger():
+        sio = socketio.test_client(app, flask_test_client=logged_in(a))
+        while time.monotonic() < deadline:
+            # A starved pinger wakes up late; count that as latency too
+            t0 = time.perf_counter() + PING_INTERVAL
+            time.sleep(PING_INTERVAL)
+            sio.emit('send_message', {'receiver_id': b, 'message': 'ping'})
+            sio.get_received()
+            samples.append(time.perf_counter() - t0)
+        sio.disconnect()
+
+    def reader():
+        client = logged_in(b)
+        while time.monotonic() < deadline:
+            client.get(f'/chat/history/{a}')
+            time.sleep(0)  # yield between requests, as waiting on a real socket would
+
+    def writer():
+        sio = socketio.test_client(app, flask_test_client=logged_in(b))
+        while time.monotonic() < deadline:
+            sio.emit('send_message', {'receiver_id': a, 'message': 'load'})
+            sio.get_received()
+            time.sleep(0)
+        sio.disconnect()
+
+    workers = [pinger] + [reader if i % 2 else writer for i in range(args.clients)]
+    threads = [threading.Thread(target=fn) for fn in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(json.dumps(samples))
+
+
+# --- PARENT: one subprocess per mode ---
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--history', type=int, default=5000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    print(f"clients: {args.clients}  seconds: {args.seconds}  history: {args.history} messages")
+    for mode, env_overrides in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", **env_overrides)
+            out = subprocess.run([sys.executable, __file__, '--child',
+                                  '--clients', str(args.clients), '--seconds', str(args.seconds),
+                                  '--history', str(args.history)],
+                                 cwd=ROOT, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{mode:<16} failed:\n{out.stderr[-2000:]}")
+            continue
+        samples = sorted(json.loads(out.stdout.strip().splitlines()[-1]))
+        if not samples:
+            print(f"{mode:<16} no samples")
+            continue
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        ms = lambda v: f"{v * 1000:8.1f} ms"
+        print(f"{mode:<16} n={len(samples):<5} p50 {ms(samples[len(samples) // 2])}   p99 {ms(p99)}   max {ms(samples[-1])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Hub latency benchmark: does the eventlet loop stay responsive under load?
+
+Every websocket on the eventlet worker is served by the same hub, so any
+time the hub spends stuck in a blocking call is added straight onto every
+Socket.IO round trip. This script runs a probe green thread that wakes up
+every few milliseconds and records how late it was woken, while other green
+threads hammer the app with logins (password hashing) and chat uploads
+(file writes and deletes). It runs the load twice, with offloading turned
+off and on, against a throwaway SQLite database.
+
+    python benchmarks/bench_hub_latency.py [--clients 8] [--rounds 5] [--upload-kb 4096]
+
+Reports the p50 / p99 / max probe delay for each mode.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TICK = 0.005  # seconds between probe wake-ups
+
+
+def probe(samples, stop):
+    while not stop:
+        start = time.perf_counter()
+        eventlet.sleep(TICK)
+        samples.append(time.perf_counter() - start - TICK)
+
+
+def login_loop(app, rounds):
+    client = app.test_client()
+    for _ in range(rounds):
+        client.post('/auth', data={'action': 'login', 'email': 'yong@example.com', 'password': 'password123'})
+        client.get('/logout')
+
+
+def upload_loop(app, user_id, peer_id, rounds, payload):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    for _ in range(rounds):
+        client.post('/chat/upload', data={
+            'file': (io.BytesIO(payload), 'bench.bin'),
+            'receiver_id': str(peer_id),
+        }, content_type='multipart/form-data')
+    client.delete(f'/chat/clear/{peer_id}')
+
+
+def run_load(app, user_id, peer_id, args, payload):
+    samples, stop = [], []
+    ticker = eventlet.spawn(probe, samples, stop)
+    eventlet.sleep(TICK * 10)
+
+    pool = eventlet.GreenPool()
+    for i in range(args.clients):
+        if i % 2:
+            pool.spawn(upload_loop, app, user_id, peer_id, args.rounds, payload)
+        else:
+            pool.spawn(login_loop, app, args.rounds)
+    pool.waitall()
+
+    stop.append(True)
+    ticker.wait()
+    return samples
+
+
+def report(label, samples):
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    ms = lambda v: f"{v * 1000:8.1f} ms"
+    print(f"{label:<12} p50 {ms(statistics.median(ordered))}   p99 {ms(p99)}   max {ms(ordered[-1])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--upload-kb', type=int, default=4096)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    import offload
+    from app import create_app
+    from models import User
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.root_path = tmp  # keep benchmark uploads out of the repo
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        user_id = User.query.filter_by(username='Yong').first().id
+        peer_id = User.query.filter_by(username='Sarah').first().id
+
+    payload = os.urandom(args.upload_kb * 1024)
+    print(f"clients: {args.clients}  rounds: {args.rounds}  upload: {args.upload_kb} KB")
+    for enabled in (False, True):
+        offload.ENABLED = enabled
+        samples = run_load(app, user_id, peer_id, args, payload)
+        report('offload ' + ('on' if enabled else 'off'), samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Listing cache benchmark: latency and SQL queries per request, cached vs uncached.
+
+Seeds a few hundred events, communities and stories, then requests each
+listing page repeatedly as a logged-in user with fragments.py disabled
+and enabled. With the cache enabled every page is primed once first, so
+the numbers are for the steady state between writes; --write-every N adds
+a write (and the invalidation it triggers) every N requests to show the
+cost of misses.
+
+    python benchmarks/bench_listing_cache.py [--rows 300] [--requests 50] [--write-every 0] [--backend local]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as clock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ['/events/browse', '/communities', '/story/browse', '/notifications']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--write-every', type=int, default=0)
+    parser.add_argument('--backend', default='', help="CACHE_URL: '' (per process), 'local' or redis://...")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ['CACHE_URL'] = args.backend
+
+    import fragments
+    from sqlalchemy import event as sa_event
+    from app import create_app
+    from models import db, User, Event, Community, CommunityMember, Story, Notification
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        users = User.query.all()
+        viewer = users[0]
+        for i in range(args.rows):
+            author = users[i % len(users)]
+            db.session.add(Event(title=f'Event {i}', description='Come along! ' * 10, date=date(2030, 1, 1 + i % 28),
+                                 time=clock(10, 0), category='Social', location='Community hall', slots=20,
+                                 host=author.username))
+            db.session.add(Story(title=f'Story {i}', description='A day out. ' * 10, tags='Travel,Food',
+                                 privacy='Public', likes=i, user_id=author.id))
+            if i % 5 == 0:
+                community = Community(name=f'Community {i}', description='Neighbours. ' * 5,
+                                      category='social', creator_id=author.id)
+                db.session.add(community)
+                db.session.flush()
+                for member in users[:3]:
+                    db.session.add(CommunityMember(user_id=member.id, community_id=community.id))
+            if i % 10 == 0:
+                db.session.add(Notification(message=f'Notification {i}', user_id=viewer.id))
+        db.session.commit()
+        viewer_id = viewer.id
+        queries = []
+        sa_event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(viewer_id)
+        sess['_fresh'] = True
+
+    def write(n):
+        with app.app_context():
+            event = Event.query.first()
+            event.title = f'Event renamed {n}'
+            db.session.commit()
+            fragments.invalidate('events', f'event:{event.id}')
+
+    print(f"rows: {args.rows}  requests per page: {args.requests}  backend: {args.backend or 'per process'}  "
+          f"write every: {args.write_every or 'never'}")
+    print(f"{'page':<18} {'uncached ms':>12} {'queries':>8} {'cached ms':>10} {'queries':>8} {'speedup':>8}")
+    for page in PAGES:
+        row = []
+        for enabled in (False, True):
+            fragments.ENABLED = enabled
+            client.get(page)
+            times, counts = [], []
+            for n in range(args.requests):
+                if args.write_every and n % args.write_every == args.write_every - 1:
+                    write(n)
+                queries.clear()
+                start = time.perf_counter()
+                assert client.get(page).status_code == 200
+                times.append((time.perf_counter() - start) * 1000)
+                counts.append(len(queries))
+            row.append((statistics.median(times), statistics.mean(counts)))
+        (off_ms, off_q), (on_ms, on_q) = row
+        print(f"{page:<18} {off_ms:>12.2f} {off_q:>8.1f} {on_ms:>10.2f} {on_q:>8.1f} {off_ms / on_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
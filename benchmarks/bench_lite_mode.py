@@ -0,0 +1,262 @@
+"""Lite mode benchmark: bytes and render time of full and lite pages, checked against budgets.
+
+Seeds --events events, a community with --posts posts, --stories stories
+and a user with --friends friends and a long chat, with --photos distinct
+photos between them (JPEGs with their resized variants from images.py),
+then loads each page on a cold browser cache, once as it is and once
+with `Save-Data: on` (lite.py), on a built static folder
+(`flask --app app build-assets`). A page visit counts:
+
+    html       the page as sent (brotli/gzip), headers included
+    css/js     every local stylesheet and script it references
+    images     every image it references, from srcset the candidate a
+               360px-wide phone at 2x picks for a full-width image; all of
+               them, as if the reader scrolled to the end
+    3rd party  CDN requests (counted, not fetched)
+    ms         median server time for the HTML over --requests loads
+
+Lite pages must stay within LITE_BUDGET; the script exits with status 1
+when one does not, so it can run in CI next to the other checks.
+
+    python benchmarks/bench_lite_mode.py [--events 60] [--posts 60] [--stories 40] [--friends 60] [--photos 12]
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as clock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# page: (KB over the wire for a cold visit, KB of the HTML alone, server ms).
+# A lite list is LITE_PAGE_SIZE cards with one ~20 KB thumbnail each
+LITE_BUDGET = {
+    'event browse': (300, 8, 100),
+    'event details': (60, 4, 50),
+    'communities': (300, 8, 100),
+    'community detail': (320, 10, 100),
+    'story browse': (300, 8, 100),
+    'story details': (60, 4, 50),
+    'chat': (30, 4, 50),
+    'chat thread': (30, 4, 50),
+}
+LITE_THIRD_PARTY = 1  # Bootstrap's stylesheet; no fonts, no scripts
+PHONE_WIDTH = 720  # device pixels of a 360px-wide screen at 2x
+
+HEADERS = {'Accept-Encoding': 'gzip, br', 'Accept': 'image/avif,image/webp,*/*'}
+LOCAL_ASSET = re.compile(r'(?:href|src)="(/css/(?!uploads/)[^"]+\.(?:css|js))"')
+THIRD_PARTY = re.compile(r'<(?:link|script)[^>]+(?:href|src)="((?:https?:)?//[^"]+)"')
+IMG = re.compile(r'<img\b[^>]*>')
+ATTR = re.compile(r'(\w+)="([^"]*)"')
+BACKGROUND = re.compile(r"url\('(/uploads/[^']+)'\)")
+
+
+def size(response):
+    return len(response.data) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+
+
+def text(response):
+    data = response.data
+    if response.content_encoding == 'br':
+        import brotli
+        data = brotli.decompress(data)
+    elif response.content_encoding == 'gzip':
+        import gzip
+        data = gzip.decompress(data)
+    return data.decode('utf-8')
+
+
+def image_urls(html):
+    """Every image the page shows, as a phone would request it"""
+    urls = []
+    for tag in IMG.findall(html):
+        attrs = dict(ATTR.findall(tag))
+        src = attrs.get('src', '').replace('&amp;', '&')
+        if attrs.get('srcset'):
+            candidates = sorted((int(w[:-1]), url) for url, w in
+                                (c.strip().rsplit(' ', 1) for c in attrs['srcset'].split(',')))
+            src = next((url for w, url in candidates if w >= PHONE_WIDTH), candidates[-1][1])
+        if src.startswith('/'):
+            urls.append(src)
+    return list(dict.fromkeys(urls + BACKGROUND.findall(html)))
+
+
+def visit(app, user_id, url, extra_headers):
+    """(html bytes, css/js bytes, image bytes, requests, third-party requests, html)"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    headers = {**HEADERS, **extra_headers}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, (url, response.status_code)
+    html = text(response)
+    html_bytes, requests = size(response), 1
+    assets = images = 0
+    for asset in dict.fromkeys(LOCAL_ASSET.findall(html)):
+        assets += size(client.get(asset, headers=headers))
+        requests += 1
+    for image in image_urls(html):
+        images += size(client.get(image, headers=headers))
+        requests += 1
+    return html_bytes, assets, images, requests, len(set(THIRD_PARTY.findall(html))), html
+
+
+def render_ms(app, user_id, url, extra_headers, repeat):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers={**HEADERS, **extra_headers})
+        response.get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def make_photos(count):
+    """count distinct noisy 1600x1067 JPEGs (noise keeps them from compressing unrealistically well)"""
+    from PIL import Image
+    photos = []
+    for i in range(count):
+        im = Image.effect_noise((400, 267), 40 + i * 5).convert('RGB').resize((1600, 1067))
+        buffer = io.BytesIO()
+        im.save(buffer, format='JPEG', quality=85)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def store_photo(data):
+    """Write a photo blob and its variants directly (no worker pool); returns the blob name"""
+    import blobstore
+    import images
+    digest = hashlib.sha256(data).hexdigest()
+    name = blobstore.blob_name(digest, '.jpg')
+    path = os.path.join(blobstore.uploads_dir(), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    images.render_variants(path, blobstore.variant_dir(digest))
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=60)
+    parser.add_argument('--posts', type=int, default=60)
+    parser.add_argument('--stories', type=int, default=40)
+    parser.add_argument('--friends', type=int, default=60)
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--photos', type=int, default=12)
+    parser.add_argument('--requests', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    shutil.copytree(os.path.join(ROOT, 'css'), os.path.join(tmp, 'css'),
+                    ignore=shutil.ignore_patterns('uploads', 'dist'))
+    os.symlink(os.path.join(ROOT, 'html'), os.path.join(tmp, 'html'))  # templates, under the moved root_path
+
+    import assets
+    from app import create_app
+    from models import db, User, Community, CommunityMember, Post, Event, Story, Message
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    app.root_path = tmp  # keep benchmark uploads out of the repo
+    app.static_folder = os.path.join(tmp, 'css')
+    assets.build_assets(app.static_folder, app.static_url_path)
+    assets._manifest = assets.load_manifest(app.static_folder)
+
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        photos = [store_photo(data) for data in make_photos(args.photos)]
+        viewer = User.query.filter_by(username='Yong').first()
+        friends = [User(username=f'friend{i}', email=f'friend{i}@example.com', password='x')
+                   for i in range(args.friends)]
+        db.session.add_all(friends)
+        db.session.flush()
+        viewer.friends.extend(friends)
+        peer = friends[0]
+        peer.friends.append(viewer)
+        for i in range(args.messages):
+            sender, receiver = (viewer, peer) if i % 2 else (peer, viewer)
+            db.session.add(Message(sender_id=sender.id, receiver_id=receiver.id, is_read=True,
+                                   message=f'Message {i}: see you at the garden on Saturday?',
+                                   timestamp=datetime(2030, 1, 1, i // 60 % 24, i % 60)))
+        for i in range(args.events):
+            db.session.add(Event(title=f'Event {i}', description='Come along and meet the neighbours! ' * 4,
+                                 date=date(2020, 1, 1 + i % 28), time=clock(10, 0), category='Social',
+                                 location='Community hall', slots=20, host='Someone else',
+                                 image=photos[i % len(photos)]))
+        community = Community(name='Neighbours', description='Everyone nearby', category='social',
+                              creator_id=viewer.id, image_filename=photos[0])
+        db.session.add(community)
+        db.session.flush()
+        db.session.add(CommunityMember(user_id=viewer.id, community_id=community.id, role='admin'))
+        for i in range(args.posts):
+            db.session.add(Post(content=f'Post {i}: ' + 'news from the block. ' * 6, user_id=viewer.id,
+                                community_id=community.id, created_at=datetime(2030, 1, 1, 12, i % 60),
+                                image_filename=photos[i % len(photos)]))
+        for i in range(10):
+            db.session.add(Community(name=f'Club {i}', description='A club for everyone', category='hobbies',
+                                     creator_id=peer.id, image_filename=photos[i % len(photos)]))
+        for i in range(args.stories):
+            db.session.add(Story(title=f'Story {i}', description='When I was young, we played by the river. ' * 3,
+                                 user_id=peer.id, tags='Memories', date=date(2030, 1, 1),
+                                 media='uploads/' + photos[i % len(photos)], privacy='Public'))
+        db.session.commit()
+        event_id = Event.query.filter(Event.image.isnot(None)).order_by(Event.id.desc()).first().id
+        story_id = Story.query.order_by(Story.id.desc()).first().id
+        viewer_id, community_id, peer_id = viewer.id, community.id, peer.id
+
+    pages = {
+        'event browse': '/events/browse',
+        'event details': f'/events/{event_id}',
+        'communities': '/communities',
+        'community detail': f'/communities/{community_id}',
+        'story browse': '/story/browse',
+        'story details': f'/story/details/{story_id}',
+        'chat': '/chat/messaging',
+        'chat thread': f'/chat/messaging?with={peer_id}',
+    }
+    print(f"events: {args.events}  posts: {args.posts}  stories: {args.stories}  friends: {args.friends}  "
+          f"messages: {args.messages}")
+    print(f"{'page':<17} {'mode':<5} {'html KB':>8} {'css/js KB':>10} {'images KB':>10} {'total KB':>9} "
+          f"{'requests':>9} {'3rd party':>10} {'ms':>7}")
+    failures = []
+    for name, url in pages.items():
+        for mode, headers in (('full', {}), ('lite', {'Save-Data': 'on'})):
+            html_bytes, asset_bytes, image_bytes, requests, third, html = visit(app, viewer_id, url, headers)
+            ms = render_ms(app, viewer_id, url, headers, args.requests)
+            total = html_bytes + asset_bytes + image_bytes
+            print(f"{name:<17} {mode:<5} {html_bytes / 1024:>8.1f} {asset_bytes / 1024:>10.1f} "
+                  f"{image_bytes / 1024:>10.1f} {total / 1024:>9.1f} {requests:>9} {third:>10} {ms:>7.1f}")
+            if mode != 'lite':
+                continue
+            total_kb, html_kb, budget_ms = LITE_BUDGET[name]
+            checks = [(total / 1024 <= total_kb, f"{total / 1024:.1f} KB > {total_kb} KB"),
+                      (html_bytes / 1024 <= html_kb, f"HTML {html_bytes / 1024:.1f} KB > {html_kb} KB"),
+                      (ms <= budget_ms, f"{ms:.1f} ms > {budget_ms} ms"),
+                      (third <= LITE_THIRD_PARTY, f"{third} third-party requests > {LITE_THIRD_PARTY}"),
+                      ('<script' not in html, "ships a script")]
+            failures += [f"{name}: {message}" for ok, message in checks if not ok]
+
+    if failures:
+        print("\nlite budget exceeded:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nevery lite page is within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Media bandwidth benchmark: bytes sent for repeat views of chat and story media.
+
+A simulated browser opens the same chat (image and voice attachments) and
+story video several times, VIEW_GAP seconds apart, and seeks around in the
+video each time. The same workload is replayed with three client behaviours:
+
+    no cache     every view downloads every file; seeking downloads the video
+    revalidate   what the old default headers allowed: a conditional GET (or
+                 conditional Range request) per file per view, 304 when unchanged
+    current      honours the Cache-Control / ETag headers the app sends now:
+                 blob URLs are immutable, so repeat views make no request
+
+    python benchmarks/bench_media_bandwidth.py [--views 10] [--images 8] [--video-mb 8]
+
+Reports requests and bytes (bodies plus headers) per behaviour.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VIEW_GAP = 600  # seconds of simulated time between two views
+SEEK_BYTES = 512 * 1024  # bytes fetched by one seek
+SEEKS = (0.25, 0.5, 0.9)  # positions in the video
+
+
+class Browser:
+    """Just enough of a browser HTTP cache to count what goes over the wire"""
+
+    def __init__(self, client, policy):
+        self.client = client
+        self.policy = policy
+        self.cache = {}  # url -> (etag, fresh until)
+        self.requests = 0
+        self.bytes = 0
+
+    def _fetch(self, url, headers):
+        response = self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes += len(response.data) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+        return response
+
+    def get(self, url, now, byte_range=None):
+        key = (url, byte_range)
+        entry = self.cache.get(key)
+        if self.policy == 'current' and entry and entry[1] > now:
+            return  # fresh in cache: no request at all
+        headers = {}
+        if byte_range:
+            headers['Range'] = f'bytes={byte_range[0]}-{byte_range[1]}'
+        if self.policy != 'no cache' and entry:
+            headers['If-None-Match'] = entry[0]
+        response = self._fetch(url, headers)
+        if response.status_code not in ((206, 304) if byte_range else (200, 304)):
+            raise RuntimeError(f"{url}: {response.status_code}")
+        max_age = response.cache_control.max_age if self.policy == 'current' else 0
+        self.cache[key] = (response.headers.get('ETag'), now + (max_age or 0))
+
+    def seek(self, url, size, now):
+        """Fetch a few stretches of a video, as a player does when the user seeks"""
+        if self.policy == 'no cache':
+            self.get(url, now)  # no ranges: the whole file comes down
+            return
+        for position in SEEKS:
+            start = int(size * position)
+            self.get(url, now, (start, start + SEEK_BYTES - 1))
+
+
+def upload(client, peer_id, name, payload):
+    response = client.post('/chat/upload', data={
+        'file': (io.BytesIO(payload), name),
+        'receiver_id': str(peer_id),
+    }, content_type='multipart/form-data')
+    return response.get_json()['message']['attachment_url']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--views', type=int, default=10)
+    parser.add_argument('--images', type=int, default=8)
+    parser.add_argument('--image-kb', type=int, default=300)
+    parser.add_argument('--video-mb', type=int, default=8)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from app import create_app
+    from models import User
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.root_path = tmp  # keep benchmark uploads out of the repo
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        user_id = User.query.filter_by(username='Yong').first().id
+        peer_id = User.query.filter_by(username='Sarah').first().id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    # .gif is not resized by images.py, so every view asks for the same bytes
+    urls = [upload(client, peer_id, f'photo{i}.gif', os.urandom(args.image_kb * 1024)) for i in range(args.images)]
+    urls += [upload(client, peer_id, f'voice{i}.webm', os.urandom(400 * 1024)) for i in range(2)]
+    video_size = args.video_mb * 1024 * 1024
+    video_url = upload(client, peer_id, 'story.mp4', os.urandom(video_size))
+
+    print(f"views: {args.views}  images: {args.images} x {args.image_kb} KB  voice: 2 x 400 KB  video: {args.video_mb} MB")
+    results = {}
+    for policy in ('no cache', 'revalidate', 'current'):
+        browser = Browser(app.test_client(), policy)
+        for view in range(args.views):
+            now = view * VIEW_GAP
+            for url in urls:
+                browser.get(url, now)
+            browser.seek(video_url, video_size, now)
+        results[policy] = browser
+        print(f"{policy:<12} requests {browser.requests:6d}   sent {browser.bytes / 1024 / 1024:9.2f} MB")
+
+    for baseline in ('no cache', 'revalidate'):
+        saved = 1 - results['current'].bytes / results[baseline].bytes
+        print(f"current vs {baseline}: {saved:.1%} fewer bytes, "
+              f"{results[baseline].requests - results['current'].requests} fewer requests")
+    client.delete(f'/chat/clear/{peer_id}')
+
+
+if __name__ == '__main__':
+    main()
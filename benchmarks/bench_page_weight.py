@@ -0,0 +1,91 @@
+"""Page weight benchmark: CSS/JS bytes for a first visit and a repeat visit.
+
+A simulated browser walks a few pages as a logged-in user, fetching every
+local stylesheet and script the HTML references (with Accept-Encoding:
+gzip, br), then walks them again an hour later. It honours Cache-Control
+and ETags like a browser would. This runs twice: with the raw files under
+css/ and with the build from `flask --app app build-assets`.
+
+    python benchmarks/bench_page_weight.py
+
+Reports requests and bytes (bodies plus headers) for static assets per visit.
+Third-party CDN files are not counted. The build is written to a temporary
+copy of the static folder.
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ['/', '/feed', '/communities', '/events/browse', '/events/1', '/story', '/chat/messaging', '/profile']
+REPEAT_AFTER = 3600  # seconds between the two visits
+LOCAL_ASSET = re.compile(r'(?:href|src)="(/css/(?!uploads/)[^"]+\.(?:css|js))"')
+
+
+class Browser:
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}  # url -> (etag, fresh until)
+
+    def visit(self, now):
+        requests = sent = 0
+        for page in PAGES:
+            html = self.client.get(page).get_data(as_text=True)
+            for url in dict.fromkeys(LOCAL_ASSET.findall(html)):
+                entry = self.cache.get(url)
+                if entry and entry[1] > now:
+                    continue
+                headers = {'Accept-Encoding': 'gzip, br'}
+                if entry and entry[0]:
+                    headers['If-None-Match'] = entry[0]
+                response = self.client.get(url, headers=headers)
+                requests += 1
+                sent += len(response.data) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+                self.cache[url] = (response.headers.get('ETag'), now + (response.cache_control.max_age or 0))
+        return requests, sent
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    shutil.copytree(os.path.join(ROOT, 'css'), os.path.join(tmp, 'css'),
+                    ignore=shutil.ignore_patterns('uploads', 'dist'))
+
+    import assets
+    from app import create_app
+    from models import User
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    app.static_folder = os.path.join(tmp, 'css')
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        user_id = User.query.filter_by(username='Yong').first().id
+
+    def browser():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+        return Browser(client)
+
+    print(f"pages: {', '.join(PAGES)}")
+    for label in ('raw files', 'built'):
+        if label == 'built':
+            assets.build_assets(app.static_folder, app.static_url_path)
+            assets._manifest = assets.load_manifest(app.static_folder)
+        else:
+            assets._manifest = {}
+        b = browser()
+        first, repeat = b.visit(0), b.visit(REPEAT_AFTER)
+        print(f"{label:<10} first visit {first[0]:3d} requests {first[1] / 1024:8.1f} KB   "
+              f"repeat visit {repeat[0]:3d} requests {repeat[1] / 1024:8.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Service worker benchmark: bytes per navigation and pages that work offline.
+
+A simulated browser, logged in, walks PAGES on a built static folder
+(`flask --app app build-assets`) in four ways:
+
+    http cache   repeat visit an hour later; the browser honours
+                 Cache-Control and ETags, as bench_page_weight.py does
+    evicted      the same after the HTTP cache was cleared, which small
+                 phones do often
+    worker       repeat visit, HTTP cache cleared again, through the
+                 strategies of html/sw.js: the shell from the install,
+                 dist/ files cache first, other static files
+                 stale-while-revalidate
+    offline      the worker with the network gone: pages served from its
+                 saved copies, or /offline
+
+Reports requests and bytes (bodies plus headers) per visit, HTML
+included, and the bytes the install precaches. Third-party CDN files are
+not counted.
+
+    python benchmarks/bench_service_worker.py
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ['/', '/feed', '/communities', '/events/browse', '/events/1', '/story', '/chat/messaging', '/profile']
+REPEAT_AFTER = 3600  # seconds between visits
+LOCAL_ASSET = re.compile(r'(?:href|src)="(/css/(?!uploads/)[^"]+\.(?:css|js|svg|png))"')
+
+
+def size(response):
+    return len(response.data) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+
+
+def text(response):
+    data = response.data
+    if response.content_encoding == 'br':
+        import brotli
+        data = brotli.decompress(data)
+    elif response.content_encoding == 'gzip':
+        data = gzip.decompress(data)
+    return data.decode('utf-8')
+
+
+class Browser:
+    def __init__(self, client, worker=False):
+        self.client = client
+        self.worker = worker
+        self.http_cache = {}  # url -> (etag, fresh until)
+        self.caches = {}  # the worker's: url -> response
+        self.shell = set()
+        self.online = True
+
+    def get(self, url, headers=None):
+        return self.client.get(url, headers={'Accept-Encoding': 'gzip, br', **(headers or {})})
+
+    def install(self):
+        """The worker's install step: precache the shell listed in /sw.js"""
+        script = text(self.get('/sw.js'))
+        shell = json.loads(re.search(r'const SETTINGS = (.*);', script).group(1))['shell']
+        self.shell.update(shell)
+        sent = 0
+        for url in shell:
+            response = self.get(url)
+            self.caches[url] = response
+            sent += size(response)
+        return len(shell), sent
+
+    def navigate(self, page):
+        """(requests, bytes, html or None)"""
+        if not self.online:
+            cached = self.caches.get(page) if self.worker else None
+            return 0, 0, text(cached) if cached else None
+        response = self.get(page)
+        if self.worker and response.status_code == 200:
+            self.caches[page] = response
+        return 1, size(response), text(response)
+
+    def asset(self, url, now):
+        if self.worker and (url in self.shell or url in self.caches and '/dist/' in url or not self.online):
+            return 0, 0
+        # The HTTP cache; for the worker, the refresh behind a stale-while-revalidate hit
+        entry = self.http_cache.get(url)
+        if entry and entry[1] > now:
+            return 0, 0
+        headers = {'If-None-Match': entry[0]} if entry and entry[0] else {}
+        response = self.get(url, headers)
+        self.http_cache[url] = (response.headers.get('ETag'), now + (response.cache_control.max_age or 0))
+        if self.worker:
+            self.caches[url] = response
+        return 1, size(response)
+
+    def visit(self, now):
+        requests = sent = shown = 0
+        for page in PAGES:
+            n, b, html = self.navigate(page)
+            requests, sent = requests + n, sent + b
+            if html is None:
+                continue
+            shown += 1
+            for url in dict.fromkeys(LOCAL_ASSET.findall(html)):
+                n, b = self.asset(url, now)
+                requests, sent = requests + n, sent + b
+        return requests, sent, shown
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    shutil.copytree(os.path.join(ROOT, 'css'), os.path.join(tmp, 'css'),
+                    ignore=shutil.ignore_patterns('uploads', 'dist'))
+
+    import assets
+    from app import create_app
+    from models import User
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    app.static_folder = os.path.join(tmp, 'css')
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        user_id = User.query.filter_by(username='Yong').first().id
+    assets.build_assets(app.static_folder, app.static_url_path)
+    assets._manifest = assets.load_manifest(app.static_folder)
+
+    def browser(worker=False):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+        return Browser(client, worker)
+
+    def report(label, result):
+        requests, sent, shown = result
+        print(f"{label:<12} {requests:>9} {sent / 1024:>9.1f} {shown:>7}/{len(PAGES)}")
+
+    print(f"pages: {', '.join(PAGES)}")
+    print(f"{'visit':<12} {'requests':>9} {'KB':>9} {'shown':>9}")
+    b = browser()
+    report('first', b.visit(0))
+    report('http cache', b.visit(REPEAT_AFTER))
+    b.http_cache.clear()
+    report('evicted', b.visit(2 * REPEAT_AFTER))
+
+    w = browser(worker=True)
+    w.visit(0)
+    files, precached = w.install()
+    w.http_cache.clear()
+    report('worker', w.visit(REPEAT_AFTER))
+    w.online = False
+    report('offline', w.visit(2 * REPEAT_AFTER))
+    print(f"install precaches {files} files, {precached / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
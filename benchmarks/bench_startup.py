@@ -0,0 +1,75 @@
+"""Startup benchmark: import-to-ready latency of app.py.
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite
+database so nothing is shared between runs.
+
+    python benchmarks/bench_startup.py [--runs 5]
+
+Reports the median of:
+- import    : `import app` + create_app()
+- ready     : import + first request (includes the one-off schema check)
+- seed      : `flask seed` on an empty database, then on a seeded one
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+from app import create_app
+app = create_app()
+t1 = time.perf_counter()
+app.test_client().get('/events/browse')
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t0)
+"""
+
+
+def run_probe(env):
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    imported, ready = out.strip().splitlines()[-1].split()
+    return float(imported), float(ready)
+
+
+def run_seed(env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'seed'], cwd=ROOT, env=env,
+                   capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    imports, readies, cold_seeds, warm_seeds = [], [], [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            imported, ready = run_probe(env)
+            imports.append(imported)
+            readies.append(ready)
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            cold_seeds.append(run_seed(env))
+            warm_seeds.append(run_seed(env))
+
+    ms = lambda values: f"{statistics.median(values) * 1000:8.1f} ms"
+    print(f"runs: {args.runs}")
+    print(f"import app            {ms(imports)}")
+    print(f"import + 1st request  {ms(readies)}")
+    print(f"flask seed (empty db) {ms(cold_seeds)}")
+    print(f"flask seed (seeded)   {ms(warm_seeds)}")
+
+
+if __name__ == '__main__':
+    main()
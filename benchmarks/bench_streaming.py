@@ -0,0 +1,104 @@
+"""Streamed rendering benchmark: time to first byte and to last byte.
+
+Seeds a community with --posts posts (each with comments and likes), a
+user who joined and created --events events and has --friends friends,
+then loads community detail, My Events and the chat page with
+streaming.py disabled (render_template) and enabled (stream_page).
+The first byte is timed as the first chunk the WSGI app hands back,
+and the last byte as the end of the body.
+
+    python benchmarks/bench_streaming.py [--posts 300] [--events 300] [--friends 200] [--requests 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as clock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=300)
+    parser.add_argument('--events', type=int, default=300)
+    parser.add_argument('--friends', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    import streaming
+    from app import create_app
+    from models import (db, User, Community, CommunityMember, Post, CommunityComment, PostLike,
+                        Event, EventParticipant)
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        viewer = User.query.first()
+        others = [User(username=f'friend{i}', email=f'friend{i}@example.com', password='x')
+                  for i in range(args.friends)]
+        db.session.add_all(others)
+        community = Community(name='Neighbours', description='Everyone nearby', category='social',
+                              creator_id=viewer.id)
+        db.session.add(community)
+        db.session.flush()
+        viewer.friends.extend(others)
+        db.session.add(CommunityMember(user_id=viewer.id, community_id=community.id, role='admin'))
+        for i in range(args.posts):
+            author = others[i % len(others)] if others else viewer
+            post = Post(content=f'Post {i}: ' + 'news from the block. ' * 10, user_id=author.id,
+                        community_id=community.id, created_at=datetime(2030, 1, 1, 12, i % 60))
+            db.session.add(post)
+            db.session.flush()
+            for j in range(3):
+                db.session.add(CommunityComment(content=f'Comment {j}', user_id=viewer.id, post_id=post.id))
+            db.session.add(PostLike(user_id=viewer.id, post_id=post.id))
+        for i in range(args.events):
+            host = viewer.username if i % 3 == 0 else 'Someone else'
+            event = Event(title=f'Event {i}', description='Come along! ' * 10, date=date(2030, 1, 1 + i % 28),
+                          time=clock(10, 0), category='Social', location='Community hall', slots=20, host=host)
+            db.session.add(event)
+            db.session.flush()
+            db.session.add(EventParticipant(user_id=viewer.id, event_id=event.id))
+        db.session.commit()
+        viewer_id, community_id = viewer.id, community.id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(viewer_id)
+        sess['_fresh'] = True
+
+    pages = {'community detail': f'/communities/{community_id}',
+             'my events': '/events/my-events?month=1&year=2030',
+             'chat': '/chat/messaging'}
+    print(f"posts: {args.posts}  events: {args.events}  friends: {args.friends}  requests: {args.requests}")
+    print(f"{'page':<18} {'mode':<10} {'first byte ms':>14} {'last byte ms':>13} {'chunks':>7} {'KB':>7}")
+    for name, url in pages.items():
+        for mode, enabled in (('whole', False), ('streamed', True)):
+            streaming.ENABLED = enabled
+            first, last, chunks, size = [], [], 0, 0
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.get(url, headers={'Accept-Encoding': 'br, gzip'})
+                assert response.status_code == 200, response.status_code
+                body = iter(response.response)
+                parts = [next(body)]
+                first.append((time.perf_counter() - start) * 1000)
+                parts.extend(body)
+                last.append((time.perf_counter() - start) * 1000)
+                response.close()
+                chunks, size = len(parts), sum(len(p) for p in parts)
+            print(f"{name:<18} {mode:<10} {statistics.median(first):>14.2f} {statistics.median(last):>13.2f} "
+                  f"{chunks:>7} {size / 1024:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
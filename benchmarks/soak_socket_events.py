@@ -0,0 +1,106 @@
+"""Soak test: worker memory must stay flat across a long run of socket events.
+
+Drives the real Socket.IO handlers through the Flask-SocketIO test client
+against a throwaway SQLite database. Each block of 100 events mixes
+typing / stop_typing noise, a chat message, a legacy broadcast message and
+one message the database rejects (to exercise the rollback path). The script
+samples the process RSS as it goes.
+
+    python benchmarks/soak_socket_events.py [--events 1000000] [--samples 20] [--max-growth-mb 16]
+
+Growth is measured from the first sample, taken after a warm-up block, so
+one-off allocations (imports, caches filling, SQLite page cache) do not
+count. The exit status is 1 if growth exceeds --max-growth-mb.
+"""
+import argparse
+import contextlib
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BLOCK = 100  # events per block
+
+
+def rss_mb():
+    """Current resident set size in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        # Not Linux: fall back to the peak, which still shows a leak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def run_block(sio, peer_id):
+    for _ in range(BLOCK // 2 - 2):
+        sio.emit('typing', {'user_id': peer_id})
+        sio.emit('stop_typing', {'user_id': peer_id})
+    sio.emit('send_message', {'receiver_id': peer_id, 'message': 'soak'})
+    sio.emit('send_old_message', {'username': 'soak', 'message': 'soak'})
+    sio.emit('send_message', {'receiver_id': peer_id, 'message': {'not': 'bindable'}})
+    sio.emit('join', {'username': 'soak'})
+    sio.get_received()  # the test client queues everything it receives
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--max-growth-mb', type=float, default=16)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'soak.db')}"
+
+    from app import create_app
+    from extensions import socketio
+    from models import User
+    from seed import ensure_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        seed_data()
+        user_id = User.query.filter_by(username='Yong').first().id
+        peer_id = User.query.filter_by(username='Sarah').first().id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    blocks = max(1, args.events // BLOCK)
+    every = max(1, blocks // args.samples)
+    out = sys.stdout
+    samples = []
+    start = time.perf_counter()
+
+    # Handlers print every event; keep the report readable
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        sio = socketio.test_client(app, flask_test_client=client)
+        for _ in range(5):
+            run_block(sio, peer_id)
+        for i in range(1, blocks + 1):
+            run_block(sio, peer_id)
+            if i % every == 0 or i == blocks:
+                gc.collect()
+                samples.append((i * BLOCK, rss_mb()))
+                print(f"{i * BLOCK:>10,} events  {samples[-1][1]:8.1f} MB  "
+                      f"{time.perf_counter() - start:7.1f} s", file=out, flush=True)
+        sio.disconnect()
+
+    growth = samples[-1][1] - samples[0][1]
+    print(f"RSS growth after first sample: {growth:+.1f} MB (limit {args.max_growth_mb} MB)")
+    sys.exit(0 if growth <= args.max_growth_mb else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Content-addressed storage for user uploads.
+
+Every uploaded file is stored once, under the SHA-256 of its bytes:
+
+    css/uploads/blobs/ab/cd/abcd...ef.jpg
+
+Forwarding the same photo in chat, reusing it in a post or uploading it
+again as a story stores nothing new. Each column keeps the URL format its
+templates already expect; only the file name changes:
+
+    Message.attachment_url    /css/uploads/blobs/ab/cd/<sha256>.jpg
+    User.profile_pic          /css/uploads/blobs/ab/cd/<sha256>.jpg
+    Story.media               uploads/blobs/ab/cd/<sha256>.jpg  (comma-separated)
+    Event.image               blobs/ab/cd/<sha256>.jpg
+    Community.image_filename  blobs/ab/cd/<sha256>.jpg
+    Post.image_filename       blobs/ab/cd/<sha256>.jpg
+
+Reference counts come from those six columns themselves, so bulk deletes
+that bypass the ORM can never leave a count out of date. release() deletes
+a blob only once no row mentions it any more; `flask --app app gc-blobs`
+sweeps blobs that were orphaned in other ways (a replaced profile picture,
+a deleted account). A blob's bytes never change, so blob URLs are served
+with immutable cache headers (see routes/media.py).
+"""
+import hashlib
+import os
+import re
+import time
+
+from flask import current_app
+
+from models import db, Message, Story, Event, Community, Post, User
+from offload import run_blocking, save_upload, remove_files
+
+BLOB_PREFIX = 'blobs/'
+VARIANT_PREFIX = 'variants/'
+# Blobs younger than this are never deleted: the row that will reference a
+# freshly stored (or re-used) blob may not be committed yet
+GRACE_PERIOD = 600  # seconds
+
+BLOB_PATTERN = re.compile(r'blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9]+)?')
+
+# Called with the name of every newly written blob (images.py renders variants)
+STORE_HOOKS = []
+
+REFERENCE_COLUMNS = (
+    Message.attachment_url,
+    User.profile_pic,
+    Story.media,
+    Event.image,
+    Community.image_filename,
+    Post.image_filename,
+)
+
+
+def uploads_dir():
+    return os.path.join(current_app.root_path, 'css', 'uploads')
+
+
+def blob_name(digest, ext=''):
+    """Path of a blob relative to css/uploads"""
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def variant_dir(digest):
+    """Absolute directory holding the resized copies of a blob (see images.py)"""
+    return os.path.join(uploads_dir(), VARIANT_PREFIX, digest[:2], digest)
+
+
+def _hash_stream(stream):
+    hasher = hashlib.sha256()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(1024 * 1024), b''):
+        hasher.update(block)
+    stream.seek(0)
+    return hasher.hexdigest()
+
+
+# --- WRITING ---
+def store_blob(file, filename=None):
+    """Store an uploaded FileStorage by content and return its blob name.
+
+    The extension of the original file name is kept so the file is served
+    with the right content type.
+    """
+    ext = os.path.splitext(filename or file.filename or '')[1].lower()
+    if not re.fullmatch(r'(\.[a-z0-9]+)?', ext):
+        ext = ''
+    # Finished chunked uploads already carry their hash
+    digest = getattr(file, 'sha256', None) or run_blocking(_hash_stream, file.stream)
+    name = blob_name(digest, ext)
+    path = os.path.join(uploads_dir(), name)
+
+    if os.path.exists(path):
+        os.utime(path)  # restart the grace period for the new reference
+        if hasattr(file, 'discard'):
+            file.discard()
+        return name
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    save_upload(file, tmp_path)
+    os.replace(tmp_path, path)  # concurrent writers of the same bytes both succeed
+    for hook in STORE_HOOKS:
+        hook(name)
+    return name
+
+
+# --- REFERENCE COUNTING ---
+def blob_keys(value):
+    """Blob names mentioned by a column value (Story.media may mention several)"""
+    return [m.group(0) for m in BLOB_PATTERN.finditer(value or '')]
+
+
+def refcounts(names):
+    """{blob name: number of references} across every column that can hold uploads"""
+    counts = {name: 0 for name in names}
+    if not counts:
+        return counts
+    for column in REFERENCE_COLUMNS:
+        rows = db.session.query(column).filter(db.or_(*[column.contains(name) for name in counts])).all()
+        for (value,) in rows:
+            for name in blob_keys(value):
+                if name in counts:
+                    counts[name] += 1
+    return counts
+
+
+def _unreferenced_paths(names):
+    cutoff = time.time() - GRACE_PERIOD
+    paths = []
+    for name, count in refcounts(names).items():
+        path = os.path.join(uploads_dir(), name)
+        if count == 0 and os.path.exists(path) and os.path.getmtime(path) < cutoff:
+            paths.append(path)
+            variants = variant_dir(BLOB_PATTERN.fullmatch(name).group(1))
+            if os.path.isdir(variants):
+                paths.extend(os.path.join(variants, f) for f in os.listdir(variants))
+    return paths
+
+
+def release(values, legacy=False):
+    """Call after committing the removal of column values that may point at uploads.
+
+    Blobs are deleted once nothing references them. Pre-blob files are only
+    deleted when legacy=True, for the routes that always deleted them.
+    """
+    names, legacy_paths = set(), []
+    for value in values:
+        keys = blob_keys(value)
+        if keys:
+            names.update(keys)
+        elif legacy and value and value != 'default.png':
+            legacy_paths.append(os.path.join(current_app.root_path, value.lstrip('/')) if value.startswith('/')
+                                else os.path.join(uploads_dir(), value))
+    return remove_files(_unreferenced_paths(names) + legacy_paths)
+
+
+def iter_blobs():
+    """Names of every blob on disk"""
+    root = os.path.join(uploads_dir(), BLOB_PREFIX)
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            name = os.path.relpath(os.path.join(dirpath, f), uploads_dir()).replace(os.sep, '/')
+            if BLOB_PATTERN.fullmatch(name):
+                yield name
+
+
+def collect_garbage():
+    """Delete every blob that no row references, returning the removed paths"""
+    return remove_files(_unreferenced_paths(list(iter_blobs())))
@@ -0,0 +1,322 @@
+"""Chunked, resumable uploads for chat, story and event media.
+
+Large files are sent as a series of small requests instead of one multipart
+body, so a dropped mobile connection only costs the chunk in flight:
+
+    POST   /upload-sessions/init                  {filename, size, purpose}  -> {upload_id, chunk_size, offset}
+    GET    /upload-sessions/<id>                  -> {offset, size, complete}   (where to resume)
+    POST   /upload-sessions/<id>/append?offset=N  raw bytes of the next chunk -> {offset}
+    POST   /upload-sessions/<id>/complete         {sha256 (optional)}         -> {upload_id, sha256, size}
+    DELETE /upload-sessions/<id>                  abandon the upload
+
+Chunks go straight to a part file under the instance folder and a SHA-256
+of everything received so far is kept alongside, so completing an upload
+never re-reads the file. The declared size is checked against
+MAX_CONTENT_LENGTH and the per-purpose limit before a single byte is
+accepted.
+
+The existing routes take a finished upload through claim_upload(), which
+returns a werkzeug FileStorage; they save it exactly like a multipart file,
+and saving moves the part file into place instead of copying it.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from offload import run_blocking
+
+PART_TTL = 24 * 3600  # seconds before an abandoned upload is purged
+BLOCK_SIZE = 64 * 1024  # bytes of a chunk read and written at a time
+
+# purpose -> (allowed extensions or None for any, size cap or None for MAX_CONTENT_LENGTH only)
+PURPOSES = {
+    'chat': (None, 10 * 1024 * 1024),
+    'story': ({'jpg', 'jpeg', 'png', 'gif', 'mp4', 'mov', 'avi'}, None),
+    'event': ({'jpg', 'jpeg', 'png', 'gif'}, None),
+}
+
+_UPLOAD_ID = re.compile(r'[0-9a-f]{32}')
+
+# upload_id -> (offset, running sha256); rebuilt from the part file after a restart
+_hashers = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class UploadError(Exception):
+    """Protocol error returned to the client as JSON with an HTTP status"""
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+# --- STORAGE HELPERS ---
+def _parts_dir():
+    path = current_app.config.get('UPLOAD_PARTS_DIR') or os.path.join(current_app.instance_path, 'upload-parts')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(upload_id):
+    base = os.path.join(_parts_dir(), upload_id)
+    return base + '.part', base + '.json'
+
+
+def _lock(upload_id):
+    with _locks_guard:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def _write_meta(meta):
+    _, meta_path = _paths(meta['upload_id'])
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def _load_meta(upload_id, user_id):
+    """Metadata for one of user_id's uploads; other users' uploads look missing"""
+    if not _UPLOAD_ID.fullmatch(upload_id or ''):
+        raise UploadError('Upload not found', 404)
+    part_path, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise UploadError('Upload not found', 404)
+    if meta['user_id'] != user_id:
+        raise UploadError('Upload not found', 404)
+    meta['offset'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return meta
+
+
+def _hash_file(path, length):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while length > 0:
+            block = f.read(min(length, 1024 * 1024))
+            if not block:
+                break
+            hasher.update(block)
+            length -= len(block)
+    return hasher
+
+
+def _hasher_at(upload_id, part_path, offset):
+    """Running hash of the first `offset` bytes, re-hashing the part file only after a restart"""
+    cached = _hashers.get(upload_id)
+    if cached and cached[0] == offset:
+        return cached[1]
+    return run_blocking(_hash_file, part_path, offset)
+
+
+def _discard(upload_id):
+    _hashers.pop(upload_id, None)
+    with _locks_guard:
+        _locks.pop(upload_id, None)
+    for path in _paths(upload_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def purge_stale(max_age=PART_TTL):
+    """Remove uploads nobody has touched for max_age seconds"""
+    cutoff = time.time() - max_age
+    parts_dir = _parts_dir()
+    for name in os.listdir(parts_dir):
+        if name.endswith('.json') and os.path.getmtime(os.path.join(parts_dir, name)) < cutoff:
+            _discard(name[:-len('.json')])
+
+
+def size_limit(purpose):
+    """Largest file accepted for a purpose, or None for no limit"""
+    caps = [c for c in (PURPOSES[purpose][1], current_app.config.get('MAX_CONTENT_LENGTH')) if c]
+    return min(caps) if caps else None
+
+
+def _check_size(size, purpose):
+    limit = size_limit(purpose)
+    if limit and size > limit:
+        raise UploadError(f'File size exceeds {limit // (1024 * 1024)}MB limit', 413)
+
+
+def upload_size(file, purpose):
+    """Size of a claimed upload or a multipart file, checked against the purpose's limit"""
+    size = getattr(file, 'size', None)  # a ClaimedUpload knows its own
+    if size is None:
+        # A multipart file: werkzeug has already spooled it, so this only seeks
+        file.stream.seek(0, os.SEEK_END)
+        size = file.stream.tell()
+        file.stream.seek(0)
+    _check_size(size, purpose)
+    return size
+
+
+# --- PROTOCOL ---
+def init_upload(user_id, filename, size, purpose, content_type=None):
+    """Start an upload; every limit is checked here, before any data is sent"""
+    if purpose not in PURPOSES:
+        raise UploadError('Unknown upload purpose')
+    filename = secure_filename(filename or '')
+    if not filename:
+        raise UploadError('No file selected')
+    allowed, _ = PURPOSES[purpose]
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if allowed is not None and ext not in allowed:
+        raise UploadError('File type not allowed', 415)
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('File size is required')
+    if size <= 0:
+        raise UploadError('File is empty')
+    _check_size(size, purpose)
+
+    purge_stale()
+    meta = {
+        'upload_id': uuid.uuid4().hex,
+        'user_id': user_id,
+        'purpose': purpose,
+        'filename': filename,
+        'content_type': content_type or 'application/octet-stream',
+        'size': size,
+        'sha256': None,
+        'complete': False,
+        'created': time.time(),
+    }
+    part_path, _ = _paths(meta['upload_id'])
+    open(part_path, 'wb').close()
+    _write_meta(meta)
+    _hashers[meta['upload_id']] = (0, hashlib.sha256())
+    meta['offset'] = 0
+    return meta
+
+
+def get_status(upload_id, user_id):
+    return _load_meta(upload_id, user_id)
+
+
+def append_chunk(upload_id, user_id, offset, stream, length):
+    """Append one chunk at `offset`, returning the new offset.
+
+    The body goes to the part file BLOCK_SIZE at a time as it arrives, hashed
+    on the way, so a chunk is never held in memory whole. A connection that
+    drops mid-chunk truncates the part file back to `offset` and leaves the
+    running hash untouched, so the upload resumes from where it was.
+    """
+    meta = _load_meta(upload_id, user_id)
+    if meta['complete']:
+        raise UploadError('Upload already completed', 409, offset=meta['offset'])
+    if length is None:
+        raise UploadError('Content-Length is required', 411)
+    if length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        raise UploadError('Chunk too large', 413)
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        raise UploadError('Offset is required')
+
+    with _lock(upload_id):
+        meta = _load_meta(upload_id, user_id)
+        if offset != meta['offset']:
+            raise UploadError('Offset mismatch', 409, offset=meta['offset'])
+        if offset + length > meta['size']:
+            raise UploadError('Upload is larger than declared', 413, offset=meta['offset'])
+
+        part_path, meta_path = _paths(upload_id)
+        # A copy, so a chunk that fails halfway leaves the cached hash at offset
+        hasher = _hasher_at(upload_id, part_path, offset).copy()
+        received = 0
+        with open(part_path, 'r+b') as f:
+            f.seek(offset)
+            try:
+                while received < length:
+                    block = stream.read(min(BLOCK_SIZE, length - received))
+                    if not block:
+                        break
+                    run_blocking(f.write, block)
+                    hasher.update(block)
+                    received += len(block)
+            finally:
+                if received != length:
+                    f.truncate(offset)
+        if received != length:
+            raise UploadError('Incomplete chunk', 400, offset=offset)
+        _hashers[upload_id] = (offset + length, hasher)
+        os.utime(meta_path)  # keeps active uploads out of purge_stale()
+    return offset + length
+
+
+def complete_upload(upload_id, user_id, expected_sha256=None):
+    """Finish an upload once every byte has arrived, verifying the optional client hash"""
+    with _lock(upload_id):
+        meta = _load_meta(upload_id, user_id)
+        if meta['complete']:
+            return meta
+        if meta['offset'] != meta['size']:
+            raise UploadError('Upload is not finished', 409, offset=meta['offset'])
+
+        part_path, _ = _paths(upload_id)
+        digest = _hasher_at(upload_id, part_path, meta['offset']).hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            raise UploadError('Checksum mismatch', 422, sha256=digest)
+
+        meta['sha256'] = digest
+        meta['complete'] = True
+        _write_meta(meta)
+        _hashers.pop(upload_id, None)
+    return meta
+
+
+def abort_upload(upload_id, user_id):
+    _load_meta(upload_id, user_id)
+    with _lock(upload_id):
+        _discard(upload_id)
+
+
+# --- HAND-OFF TO THE EXISTING ROUTES ---
+class ClaimedUpload(FileStorage):
+    """A completed upload that routes can use in place of request.files[...]"""
+
+    def __init__(self, meta):
+        part_path, _ = _paths(meta['upload_id'])
+        super().__init__(stream=open(part_path, 'rb'), filename=meta['filename'],
+                         content_type=meta['content_type'])
+        self.upload_id = meta['upload_id']
+        self.sha256 = meta['sha256']
+        self.size = meta['size']
+
+    def save(self, dst, buffer_size=16384):
+        """Move the part file into place instead of copying it"""
+        self.stream.close()
+        part_path, meta_path = _paths(self.upload_id)
+        shutil.move(part_path, dst)
+        os.remove(meta_path)
+
+    def discard(self):
+        """Drop the part file without saving it (the bytes are already stored)"""
+        self.stream.close()
+        _discard(self.upload_id)
+
+
+def claim_upload(upload_id, user_id, purpose):
+    """Return the finished upload as a FileStorage, or None when no id was sent"""
+    if not upload_id:
+        return None
+    meta = _load_meta(upload_id, user_id)
+    if not meta['complete']:
+        raise UploadError('Upload is not finished', 409, offset=meta['offset'])
+    if meta['purpose'] != purpose:
+        raise UploadError('Upload was started for a different purpose')
+    return ClaimedUpload(meta)
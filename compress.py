@@ -0,0 +1,146 @@
+"""Dynamic response compression (brotli or gzip, from Accept-Encoding).
+
+Applies to rendered pages and JSON as they leave the app:
+
+- only text types (COMPRESSIBLE_TYPES) of at least COMPRESS_MIN_SIZE bytes;
+  smaller bodies fit in a packet or two anyway
+- never responses that are already encoded (css/dist/ from assets.py),
+  partial (206), file passthrough (send_file: uploads, raw static files)
+  or marked Cache-Control: no-transform
+- streamed responses are compressed chunk by chunk, flushing after each
+  one, so the browser still gets the first bytes early
+- bodies of COMPRESS_OFFLOAD_SIZE or more are compressed in eventlet's
+  thread pool (offload.py) instead of on the hub
+- compressed bodies are kept for a few minutes keyed by a hash of the
+  original, so the same JSON/HTML sent to many clients (polling, event
+  lists) is compressed once
+- a strong ETag becomes weak: the compressed bytes differ, but
+  If-None-Match still matches
+
+brotli is optional; without it only gzip is offered.
+"""
+import gzip
+import hashlib
+import zlib
+
+from flask import current_app, request
+
+from cache import TTLCache
+from offload import run_blocking
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # dynamic content: much faster than 11 for a few % more bytes
+CACHED_BODY_MAX = 1024 * 1024
+
+# Benchmarks flip this to measure uncompressed responses
+ENABLED = True
+
+_compressed = TTLCache(maxsize=256, ttl=300)
+
+
+# --- ENCODING ---
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def compress_body(data, encoding):
+    """Compressed bytes of data, reusing a recent result for the same body"""
+    key = None
+    if len(data) <= CACHED_BODY_MAX:
+        key = (hashlib.sha1(data).digest(), encoding)
+        cached = _compressed.get(key)
+        if cached is not None:
+            return cached
+    if len(data) >= current_app.config['COMPRESS_OFFLOAD_SIZE']:
+        body = run_blocking(_compress, data, encoding)
+    else:
+        body = _compress(data, encoding)
+    if key is not None:
+        _compressed.set(key, body)
+    return body
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of chunks, flushing after each so none is held back"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield process(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+# --- RESPONSE HOOK ---
+def _compressible(response):
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return False
+    if request.method == 'HEAD' or response.status_code in (204, 206, 304) or response.status_code < 200:
+        return False
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return False
+    return not response.cache_control.no_transform
+
+
+def compress_response(response):
+    """after_request hook: compress text responses the browser can decode"""
+    if not ENABLED or not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = pick_encoding()
+    if encoding is None:
+        return response
+
+    min_size = current_app.config['COMPRESS_MIN_SIZE']
+    if response.is_streamed:
+        # Error pages are streamed too, but their length is known
+        if response.content_length is not None and response.content_length < min_size:
+            return response
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress_body(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def register_compression(app):
+    # Registered before the blueprints so it runs after their after_request hooks
+    app.after_request(compress_response)
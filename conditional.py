@@ -0,0 +1,61 @@
+"""Conditional GETs for JSON endpoints, validated by watermarks.
+
+Chat re-fetches the same JSON every time a conversation is opened or the
+unread badges are polled, and most of the time nothing has changed. Hashing
+the body would still run the query and serialize every row, so endpoints
+describe their data with a few cheap numbers instead (a watermark: row
+count, max id, latest edited_at, ...) read in one aggregate query, and
+only build the body when the client's copy is out of date:
+
+    etag = watermark_etag('history', me, peer, *history_watermark(me, peer))
+    return conditional_json(etag, lambda: {'messages': [...]})
+
+A watermark has to move on every change the body can show. Row count plus
+max id covers inserts and deletes (a delete lowers the count, an insert
+raises the max id), and a max timestamp covers in-place edits. "An insert
+raises the max id" only holds for ids that are never reused: on SQLite that
+takes AUTOINCREMENT (`sqlite_autoincrement`, as on Message), or a plain
+INTEGER PRIMARY KEY gives a deleted newest row's id to the next insert and
+"delete the newest, then add one" leaves count and max id unchanged.
+Because the numbers come from the database they survive restarts and agree
+across workers.
+
+Responses are `Cache-Control: private, no-cache`: the browser keeps the
+body and revalidates with If-None-Match on every fetch(), so chat.js gets
+the 304 handled for it.
+"""
+import hashlib
+
+from flask import current_app, jsonify, request
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+def watermark_etag(*parts):
+    """A short ETag for a watermark tuple (scope first, so endpoints never collide)"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def not_modified(etag):
+    """304 for a matching If-None-Match, or None.
+
+    Weak comparison, as RFC 9110 asks for If-None-Match: compress.py
+    sends these ETags back weakened.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+    return None
+
+
+def conditional_json(etag, build):
+    """304 when the client has etag, else jsonify(build()) carrying it"""
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,36 @@
+import os
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'mysecretkey')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///bridgegen_complete.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # --- UPLOADS ---
+    # Largest request body, and largest file accepted by the chunked upload API
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    # Worker processes that render image thumbnails and WebP/AVIF copies (needs Pillow)
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+    # --- RESPONSES ---
+    # Smaller bodies are sent uncompressed (they fit in a packet or two anyway)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1400))
+    # Larger bodies are compressed in the thread pool instead of on the hub
+    COMPRESS_OFFLOAD_SIZE = int(os.environ.get('COMPRESS_OFFLOAD_SIZE', 64 * 1024))
+
+    # --- CACHING ---
+    # Shared backend for listing/fragment caches (fragments.py): unset = per
+    # process only, 'local' = in-process stand-in, or a redis:// URL
+    CACHE_URL = os.environ.get('CACHE_URL', '')
+
+    # --- CONCURRENCY ---
+    # Socket.IO worker model: 'eventlet' (Procfile) or 'threading'
+    # (gunicorn -k gthread --threads N). Unset = pick eventlet if installed.
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE') or None
+    # Under a monkey-patched eventlet worker, run every DB call in eventlet's
+    # native thread pool instead of on the hub (see offload.py)
+    DB_OFFLOAD = os.environ.get('DB_OFFLOAD', '1') != '0'
+    # Connections per worker; keep it at or below the thread count
+    # (EVENTLET_THREADPOOL_SIZE, default 20, or gunicorn --threads)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
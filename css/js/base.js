@@ -0,0 +1,258 @@
+// Site-wide scripts for html/base.html: translator menu, theme modal, accessibility tools, chatbot
+
+// Language list with codes and names
+const languages = [
+    { code: 'en', name: 'English' },
+    { code: 'zh-CN', name: '中文 (简体)' },
+    { code: 'zh-TW', name: '中文 (繁體)' },
+    { code: 'ms', name: 'Bahasa Melayu' },
+    { code: 'ta', name: 'தமிழ்' },
+    { code: 'hi', name: 'हिन्दी' },
+    { code: 'bn', name: 'বাংলা' },
+    { code: 'te', name: 'తెలుగు' },
+    { code: 'ml', name: 'മലയാളം' },
+    { code: 'th', name: 'ไทย' },
+    { code: 'vi', name: 'Tiếng Việt' },
+    { code: 'id', name: 'Bahasa Indonesia' },
+    { code: 'ja', name: '日本語' },
+    { code: 'ko', name: '한국어' },
+    { code: 'fr', name: 'Français' },
+    { code: 'es', name: 'Español' },
+    { code: 'de', name: 'Deutsch' },
+    { code: 'ar', name: 'العربية' },
+    { code: 'ru', name: 'Русский' },
+    { code: 'pt', name: 'Português' },
+    { code: 'it', name: 'Italiano' },
+    { code: 'nl', name: 'Nederlands' },
+    { code: 'pl', name: 'Polski' },
+    { code: 'tr', name: 'Türkçe' }
+];
+
+// Get current language from cookie or URL
+function getCurrentLanguage() {
+    const match = document.cookie.match(/googtrans=\/en\/([^;]+)/);
+    return match ? match[1] : 'en';
+}
+
+// Populate language list
+function populateLanguages() {
+    const languageList = document.getElementById('language-list');
+    const currentLang = getCurrentLanguage();
+
+    languageList.innerHTML = '';
+
+    languages.forEach(lang => {
+        const item = document.createElement('div');
+        item.className = 'language-item' + (lang.code === currentLang ? ' active' : '');
+        item.innerHTML = `
+            <i class="fas fa-check"></i>
+            <span>${lang.name}</span>
+        `;
+        item.onclick = function() {
+            changeLanguage(lang.code);
+        };
+        languageList.appendChild(item);
+    });
+}
+
+// Change language by manipulating Google Translate
+function changeLanguage(langCode) {
+    // Set the Google Translate cookie
+    const domain = window.location.hostname;
+    document.cookie = `googtrans=/en/${langCode}; path=/; domain=${domain}`;
+    document.cookie = `googtrans=/en/${langCode}; path=/`;
+
+    // Reload page to apply translation
+    window.location.reload();
+}
+
+// Initialize when page loads
+document.addEventListener('DOMContentLoaded', function() {
+    populateLanguages();
+});
+
+// ============================================================
+// UTILITY FUNCTIONS
+// ============================================================
+
+function openModal() { 
+    const modal = document.getElementById('themeModal');
+    if(modal) modal.style.display = 'flex';
+}
+
+// ============================================================
+// FONT SIZE ADJUSTMENT WITH LOCALSTORAGE
+// ============================================================
+
+let currentFontSize = parseFloat(localStorage.getItem('fontSize')) || 1.0;
+
+// Apply saved font size on page load
+document.addEventListener('DOMContentLoaded', function() {
+    document.body.style.fontSize = currentFontSize + 'rem';
+});
+
+function adjustFontSize(change) {
+    currentFontSize += change * 0.1;
+
+    // Limit font size range (80% to 150%)
+    if (currentFontSize < 0.8) currentFontSize = 0.8;
+    if (currentFontSize > 1.5) currentFontSize = 1.5;
+
+    // Apply font size to body
+    document.body.style.fontSize = currentFontSize + 'rem';
+
+    // Save to localStorage
+    localStorage.setItem('fontSize', currentFontSize);
+
+    // Show notification
+    showFontSizeNotification(currentFontSize);
+}
+
+function showFontSizeNotification(size) {
+    // Remove existing notification if any
+    const existing = document.getElementById('font-size-notification');
+    if (existing) existing.remove();
+
+    const notification = document.createElement('div');
+    notification.id = 'font-size-notification';
+    notification.style.cssText = `
+        position: fixed;
+        top: 80px;
+        right: 20px;
+        background: #4A90E2;
+        color: white;
+        padding: 10px 20px;
+        border-radius: 8px;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.2);
+        z-index: 10000;
+        font-size: 0.9rem;
+        animation: slideIn 0.3s ease;
+    `;
+
+    const percentage = Math.round(size * 100);
+    notification.textContent = `Font Size: ${percentage}%`;
+    document.body.appendChild(notification);
+
+    setTimeout(() => {
+        notification.style.animation = 'slideOut 0.3s ease';
+        setTimeout(() => notification.remove(), 300);
+    }, 2000);
+}
+
+// ============================================================
+// CHATBOT FUNCTIONS
+// ============================================================
+
+function toggleChatbot() {
+    const window = document.getElementById('chatbot-window');
+    if (window) window.classList.toggle('active');
+}
+
+function handleChatKeyPress(event) {
+    if (event.key === 'Enter') {
+        sendChatMessage();
+    }
+}
+
+function sendChatMessage() {
+    const input = document.getElementById('chatbot-input');
+    const message = input.value.trim();
+    if (!message) return;
+
+    const messagesDiv = document.getElementById('chatbot-messages');
+    const userMsg = document.createElement('div');
+    userMsg.className = 'chatbot-message user';
+    userMsg.innerHTML = `<div class="message-bubble">${message}</div>`;
+    messagesDiv.appendChild(userMsg);
+
+    input.value = '';
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+
+    fetch('/chatbot', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message: message })
+    })
+    .then(response => response.json())
+    .then(data => {
+        const botMsg = document.createElement('div');
+        botMsg.className = 'chatbot-message bot';
+        botMsg.innerHTML = `<div class="message-bubble">${data.response}</div>`;
+        messagesDiv.appendChild(botMsg);
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        const botMsg = document.createElement('div');
+        botMsg.className = 'chatbot-message bot';
+        botMsg.innerHTML = '<div class="message-bubble">Sorry, I encountered an error. Please try again.</div>';
+        messagesDiv.appendChild(botMsg);
+    });
+}
+
+// ============================================================
+// DRAGGABLE FUNCTIONALITY
+// ============================================================
+
+function makeDraggable(element) {
+    if (!element) return;
+
+    let pos1 = 0, pos2 = 0, pos3 = 0, pos4 = 0;
+    element.onmousedown = dragMouseDown;
+
+    function dragMouseDown(e) {
+        e = e || window.event;
+        if (e.target.tagName === 'BUTTON' || e.target.closest('button')) return;
+
+        e.preventDefault();
+        pos3 = e.clientX;
+        pos4 = e.clientY;
+        document.onmouseup = closeDragElement;
+        document.onmousemove = elementDrag;
+    }
+
+    function elementDrag(e) {
+        e = e || window.event;
+        e.preventDefault();
+
+        pos1 = pos3 - e.clientX;
+        pos2 = pos4 - e.clientY;
+        pos3 = e.clientX;
+        pos4 = e.clientY;
+
+        let newTop = element.offsetTop - pos2;
+        let newLeft = element.offsetLeft - pos1;
+
+        newTop = Math.max(70, Math.min(newTop, window.innerHeight - element.offsetHeight - 10));
+        newLeft = Math.max(10, Math.min(newLeft, window.innerWidth - element.offsetWidth - 10));
+
+        element.style.top = newTop + "px";
+        element.style.left = newLeft + "px";
+        element.style.right = "auto";
+        element.style.bottom = "auto";
+    }
+
+    function closeDragElement() {
+        document.onmouseup = null;
+        document.onmousemove = null;
+    }
+}
+
+// Make accessibility tools and chatbot draggable
+document.addEventListener('DOMContentLoaded', function() {
+    const accessibilityTools = document.querySelector('.accessibility-tools');
+    if (accessibilityTools) {
+        accessibilityTools.style.cursor = 'move';
+        accessibilityTools.style.userSelect = 'none';
+        makeDraggable(accessibilityTools);
+    }
+
+    const chatbotButton = document.getElementById('chatbot-button');
+    if (chatbotButton) {
+        chatbotButton.style.cursor = 'move';
+        chatbotButton.style.userSelect = 'none';
+        makeDraggable(chatbotButton);
+    }
+});
@@ -233,29 +233,20 @@ socket.on('receive_message', function(data) {
 socket.on('message_edited', function(data) {
     console.log('Message edited event:', data);
     
-    const messageElement = document.querySelector(`[data-message-id="${data.message_id}"]`);
-    if (messageElement) {
-        const messageBubble = messageElement.querySelector('.message-bubble');
-        const messageData = JSON.parse(messageElement.dataset.message || '{}');
-        
-        messageBubble.innerHTML = `
-            <p class="message-text">${escapeHtml(data.new_text)}<span class="message-edited">(edited)</span></p>
-            <div class="message-time">${formatMessageTime(messageData.timestamp)}</div>
-        `;
-        
-        messageData.message = data.new_text;
-        messageData.edited = true;
-        messageElement.dataset.message = JSON.stringify(messageData);
-    }
+    updateMessage(data.message_id, { message: data.new_text, edited: true });
 });
 
 // Handle message deleted by other user
 socket.on('message_deleted', function(data) {
     console.log('Message deleted event:', data);
     
-    const messageElement = document.querySelector(`[data-message-id="${data.message_id}"]`);
-    if (messageElement) {
-        messageElement.remove();
+    removeMessage(data.message_id);
+});
+
+// Catch up on what was missed while disconnected
+socket.on('connect', function() {
+    if (activeUserId && historyState.userId === activeUserId) {
+        syncConversation(activeUserId).catch(error => console.error('Error syncing chat:', error));
     }
 });
 
@@ -276,8 +267,8 @@ socket.on('user_stop_typing', function(data) {
 // CHAT FUNCTIONS
 // ============================================================
 
-// Open chat with a user
-function openChat(userId, username, avatar) {
+// Open chat with a user; history is its first page when already fetched
+function openChat(userId, username, avatar, history = null) {
     console.log('=== OPENING CHAT ===');
     console.log('User ID:', userId, 'Username:', username);
     
@@ -316,38 +307,171 @@ function openChat(userId, username, avatar) {
         unreadBadge.textContent = '0';
     }
     
+    // Reopened first on the next visit (see bootstrapChat)
+    sessionStorage.setItem('chat:lastOpen', userId);
+    
     // Load chat history
-    loadChatHistory(userId);
+    if (history) {
+        renderHistory(userId, history);
+        persistConversation();
+    } else {
+        loadChatHistory(userId);
+    }
 }
 
-// Load chat history from server
+// Messages per history page; older pages load when scrolled to the top
+const HISTORY_PAGE = 50;
+let historyState = { userId: null, oldestId: null, hasMore: false, loading: false, watermark: null };
+
+// Show the cached copy straight away, then fetch what changed since
 function loadChatHistory(userId) {
-    fetch(`/chat/history/${userId}`)
+    loadCachedConversation(userId)
+        .then(cached => {
+            if (activeUserId !== userId) return;
+            if (cached) renderHistory(userId, cached);
+            return syncConversation(userId);
+        })
+        .catch(error => console.error('Error loading chat history:', error));
+}
+
+// Apply /chat/sync: the messages created or edited and the ids deleted since
+// the watermark the open chat is up to (or a fresh first page, on reset)
+function syncConversation(userId) {
+    const watermark = historyState.userId === userId ? historyState.watermark : null;
+    let url = `/chat/sync/${userId}`;
+    if (watermark) {
+        const params = new URLSearchParams({
+            after: watermark.after,
+            from: conversation.length ? conversation[0].id : watermark.after,
+            deleted: watermark.deleted
+        });
+        if (watermark.edited) params.set('edited', watermark.edited);
+        url += '?' + params;
+    }
+    return fetch(url)
         .then(response => response.json())
         .then(data => {
-            const messagesDiv = document.getElementById('chatMessages');
-            messagesDiv.innerHTML = '';
-            
-            let lastDate = null;
-            data.messages.forEach(msg => {
-                const msgDate = new Date(msg.timestamp).toDateString();
-                if (msgDate !== lastDate) {
-                    addDateSeparator(msg.timestamp);
-                    lastDate = msgDate;
-                }
-                
-                appendMessage(msg, false);
-            });
-            
-            if (data.messages.length > 0) {
-                const lastMsg = data.messages[data.messages.length - 1];
-                const displayMessage = lastMsg.message || (lastMsg.attachment_url ? '📎 Attachment' : '');
-                updateContactLastMessage(lastMsg.sender_id, lastMsg.receiver_id, displayMessage, lastMsg.timestamp);
+            if (activeUserId !== userId) return;  // another chat was opened meanwhile
+            if (data.reset) {
+                renderHistory(userId, data);
+            } else if (data.messages.length || data.deleted.length) {
+                const deleted = new Set(data.deleted);
+                const byId = new Map(conversation.filter(msg => !deleted.has(msg.id)).map(msg => [msg.id, msg]));
+                data.messages.forEach(msg => byId.set(msg.id, msg));
+                conversation = Array.from(byId.values()).sort((a, b) => a.id - b.id);
+                refreshMessages();
+                showLastMessage();
             }
+            historyState.watermark = data.watermark;
+            persistConversation();
+        });
+}
+
+// Render the latest page of a conversation (from /chat/history or /chat/bootstrap)
+function renderHistory(userId, data) {
+    hideTypingIndicator();
+    conversation = data.messages.slice();
+    getMessageList().clear();  // row heights of the previous chat
+    refreshMessages();
+    historyState = {
+        userId: userId,
+        oldestId: data.messages.length ? data.messages[0].id : null,
+        hasMore: !!data.has_more,
+        loading: false,
+        watermark: data.watermark || null
+    };
+    
+    showLastMessage();
+    scrollToBottom();
+}
+
+function showLastMessage() {
+    if (conversation.length > 0) {
+        const lastMsg = conversation[conversation.length - 1];
+        const displayMessage = lastMsg.message || (lastMsg.attachment_url ? '📎 Attachment' : '');
+        updateContactLastMessage(lastMsg.sender_id, lastMsg.receiver_id, displayMessage, lastMsg.timestamp);
+    }
+}
+
+// Prepend the page before the oldest message shown; the list keeps the view still
+function loadOlderMessages() {
+    const state = historyState;
+    if (!state.hasMore || state.loading || state.oldestId === null) return;
+    state.loading = true;
+    
+    fetch(`/chat/history/${state.userId}?limit=${HISTORY_PAGE}&before=${state.oldestId}`)
+        .then(response => response.json())
+        .then(data => {
+            if (historyState !== state) return;  // another chat was opened meanwhile
+            const known = new Set(conversation.map(msg => msg.id));
+            conversation = data.messages.filter(msg => !known.has(msg.id)).concat(conversation);
+            refreshMessages();
+            persistConversation();
             
-            scrollToBottom();
+            state.oldestId = data.messages.length ? data.messages[0].id : state.oldestId;
+            state.hasMore = !!data.has_more;
+            state.loading = false;
         })
-        .catch(error => console.error('Error loading chat history:', error));
+        .catch(error => {
+            state.loading = false;
+            console.error('Error loading older messages:', error);
+        });
+}
+
+// ============================================================
+// OFFLINE CACHE (IndexedDB)
+// ============================================================
+
+// The latest CACHE_MESSAGES messages of each conversation, with the sync
+// watermark they are up to, per signed-in user
+const CACHE_MESSAGES = 200;
+let chatDbPromise = null;
+
+function openChatDb() {
+    if (!chatDbPromise) {
+        chatDbPromise = new Promise((resolve, reject) => {
+            if (!window.indexedDB) throw new Error('IndexedDB is not available');
+            const request = indexedDB.open('bridgegen-chat', 1);
+            request.onupgradeneeded = () => request.result.createObjectStore('conversations', { keyPath: 'key' });
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    return chatDbPromise;
+}
+
+function cacheKey(userId) {
+    return `${currentUserId}:${userId}`;
+}
+
+// The cached { messages, has_more, watermark }, or null (also without IndexedDB)
+function loadCachedConversation(userId) {
+    return openChatDb()
+        .then(db => new Promise((resolve, reject) => {
+            const request = db.transaction('conversations').objectStore('conversations').get(cacheKey(userId));
+            request.onsuccess = () => resolve(request.result || null);
+            request.onerror = () => reject(request.error);
+        }))
+        .catch(error => {
+            console.warn('Chat cache unavailable:', error);
+            return null;
+        });
+}
+
+// Save the open chat as it is now
+function persistConversation() {
+    const state = historyState;
+    if (state.userId !== activeUserId) return;
+    const messages = conversation.slice(-CACHE_MESSAGES);
+    const record = {
+        key: cacheKey(state.userId),
+        messages: messages,
+        has_more: state.hasMore || messages.length < conversation.length,
+        watermark: state.watermark
+    };
+    openChatDb()
+        .then(db => db.transaction('conversations', 'readwrite').objectStore('conversations').put(record))
+        .catch(error => console.warn('Could not cache chat:', error));
 }
 
 // ============================================================
@@ -390,22 +514,26 @@ function sendMessage() {
  * Send message with file attachment
  */
 function sendMessageWithFile(message) {
-    const formData = new FormData();
-    formData.append('file', window.selectedFile);
-    formData.append('receiver_id', activeUserId);
-    
-    if (message) {
-        formData.append('message', message);
-    }
-    
     const input = document.getElementById('messageInput');
     const originalPlaceholder = input.placeholder;
     input.placeholder = 'Sending file...';
     input.disabled = true;
     
-    fetch('/chat/upload', {
-        method: 'POST',
-        body: formData
+    // Send the file in resumable chunks, then attach it to the message by id
+    resumableUpload(window.selectedFile, 'chat', progress => {
+        input.placeholder = 'Sending file... ' + Math.round(progress * 100) + '%';
+    })
+    .then(uploadId => {
+        const formData = new FormData();
+        formData.append('upload_id', uploadId);
+        formData.append('receiver_id', activeUserId);
+        if (message) {
+            formData.append('message', message);
+        }
+        return fetch('/chat/upload', {
+            method: 'POST',
+            body: formData
+        });
     })
     .then(response => {
         if (!response.ok) {
@@ -439,11 +567,93 @@ function sendMessageWithFile(message) {
 // MESSAGE DISPLAY FUNCTIONS
 // ============================================================
 
+// The open conversation, oldest first. Only the rows in view are in the
+// DOM (see virtual_list.js), so changes go here and then to the list.
+let conversation = [];
+let messageList = null;
+let messageRowCache = new Map();
+
+function getMessageList() {
+    if (!messageList) {
+        messageList = new VirtualList(document.getElementById('chatMessages'), renderMessageRow);
+    }
+    return messageList;
+}
+
+// A date row before each day's first message. Unchanged messages keep
+// their row object, so the list keeps their elements.
+function messageRows() {
+    const rows = [];
+    const cache = new Map();
+    let lastDate = null;
+    conversation.forEach(msg => {
+        const msgDate = new Date(msg.timestamp).toDateString();
+        if (msgDate !== lastDate) {
+            const key = 'd:' + msgDate;
+            const row = messageRowCache.get(key) || { key: key, date: msg.timestamp };
+            rows.push(row);
+            cache.set(key, row);
+            lastDate = msgDate;
+        }
+        const key = 'm:' + msg.id;
+        const cached = messageRowCache.get(key);
+        const row = cached && cached.message === msg ? cached : { key: key, message: msg };
+        rows.push(row);
+        cache.set(key, row);
+    });
+    messageRowCache = cache;
+    return rows;
+}
+
+function renderMessageRow(row) {
+    if (!row.message) return createDateSeparator(row.date);
+    // A message being edited that left the view comes back unedited
+    if (currentEditingMessage && currentEditingMessage.id === row.message.id) {
+        currentEditingMessage = null;
+    }
+    return createMessageElement(row.message);
+}
+
+function refreshMessages() {
+    getMessageList().setRows(messageRows());
+}
+
 /**
- * Append message to chat window with edit/delete options
+ * Add a message to the open chat (or replace it: the upload response and
+ * the socket both deliver your own attachments)
  */
-function appendMessage(data, scroll = true) {
-    const messagesDiv = document.getElementById('chatMessages');
+function appendMessage(data) {
+    const list = getMessageList();
+    const follow = list.atBottom() || data.sender_id === currentUserId;
+    const index = conversation.findIndex(msg => msg.id === data.id);
+    if (index >= 0) {
+        conversation[index] = data;
+    } else {
+        conversation.push(data);
+    }
+    refreshMessages();
+    persistConversation();
+    if (follow) list.scrollToBottom();
+}
+
+function updateMessage(messageId, changes) {
+    const index = conversation.findIndex(msg => msg.id === messageId);
+    if (index < 0) return;
+    conversation[index] = Object.assign({}, conversation[index], changes);
+    refreshMessages();
+    persistConversation();
+}
+
+function removeMessage(messageId) {
+    conversation = conversation.filter(msg => msg.id !== messageId);
+    refreshMessages();
+    persistConversation();
+}
+
+/**
+ * Message element with edit/delete options
+ */
+function createMessageElement(data) {
     const isSent = data.sender_id === currentUserId;
     
     const messageWrapper = document.createElement('div');
@@ -496,11 +706,7 @@ function appendMessage(data, scroll = true) {
     }
     
     messageWrapper.appendChild(messageBubble);
-    messagesDiv.appendChild(messageWrapper);
-    
-    if (scroll) {
-        scrollToBottom();
-    }
+    return messageWrapper;
 }
 
 /**
@@ -512,7 +718,11 @@ function createAttachmentElement(data) {
     // Handle images
     if (fileType.startsWith('image/')) {
         const img = document.createElement('img');
-        img.src = data.attachment_url;
+        // Blobs are served resized (and as WebP/AVIF) from /uploads; the click still opens the original
+        const blob = data.attachment_url.indexOf('/css/uploads/blobs/') === 0;
+        img.src = blob ? data.attachment_url.replace('/css/uploads/', '/uploads/') + '?w=640' : data.attachment_url;
+        img.loading = 'lazy';
+        img.decoding = 'async';
         img.className = 'message-image';
         img.alt = data.attachment_name || 'Image';
         img.onclick = () => window.open(data.attachment_url, '_blank');
@@ -750,31 +960,15 @@ function saveEdit() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            const messageBubble = currentEditingMessage.element.querySelector('.message-bubble');
-            const messageData = JSON.parse(currentEditingMessage.element.dataset.message || '{}');
-            
-            messageBubble.innerHTML = `
-                <p class="message-text">${escapeHtml(newText)}<span class="message-edited">(edited)</span></p>
-                <div class="message-time">${formatMessageTime(messageData.timestamp)}</div>
-                <div class="message-options">
-                    <button class="message-options-btn" onclick="showMessageContextMenu(event, ${currentEditingMessage.id}, this.closest('.message-wrapper'))">
-                        <i class="fas fa-ellipsis-v"></i>
-                    </button>
-                </div>
-            `;
-            messageBubble.classList.remove('message-editing');
-            
-            messageData.message = newText;
-            messageData.edited = true;
-            currentEditingMessage.element.dataset.message = JSON.stringify(messageData);
+            const messageId = currentEditingMessage.id;
+            currentEditingMessage = null;
+            updateMessage(messageId, { message: newText, edited: true });
             
             socket.emit('message_edited', {
-                message_id: currentEditingMessage.id,
+                message_id: messageId,
                 new_text: newText,
                 receiver_id: activeUserId
             });
-            
-            currentEditingMessage = null;
         } else {
             alert('Failed to edit message: ' + (data.error || 'Unknown error'));
         }
@@ -788,21 +982,9 @@ function saveEdit() {
 function cancelEdit() {
     if (!currentEditingMessage) return;
     
-    const messageBubble = currentEditingMessage.element.querySelector('.message-bubble');
-    const messageData = JSON.parse(currentEditingMessage.element.dataset.message || '{}');
-    
-    messageBubble.innerHTML = `
-        <p class="message-text">${escapeHtml(currentEditingMessage.originalText)}${messageData.edited ? '<span class="message-edited">(edited)</span>' : ''}</p>
-        <div class="message-time">${formatMessageTime(messageData.timestamp)}</div>
-        <div class="message-options">
-            <button class="message-options-btn" onclick="showMessageContextMenu(event, ${messageData.id}, this.closest('.message-wrapper'))">
-                <i class="fas fa-ellipsis-v"></i>
-            </button>
-        </div>
-    `;
-    messageBubble.classList.remove('message-editing');
-    
+    const messageId = currentEditingMessage.id;
     currentEditingMessage = null;
+    getMessageList().rerender('m:' + messageId);
 }
 
 // ============================================================
@@ -848,7 +1030,7 @@ function deleteMessageConfirmed() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            currentContextMessageElement.remove();
+            removeMessage(currentContextMessageId);
             
             socket.emit('message_deleted', {
                 message_id: currentContextMessageId,
@@ -946,7 +1128,9 @@ function clearChatConfirmed() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            document.getElementById('chatMessages').innerHTML = '';
+            conversation = [];
+            refreshMessages();
+            persistConversation();
             showNotification('Chat history cleared');
         } else {
             alert('Failed to clear chat: ' + (data.error || 'Unknown error'));
@@ -999,12 +1183,11 @@ function removeFriendConfirmed() {
 // UI HELPER FUNCTIONS
 // ============================================================
 
-function addDateSeparator(dateString) {
-    const messagesDiv = document.getElementById('chatMessages');
+function createDateSeparator(dateString) {
     const separator = document.createElement('div');
     separator.className = 'date-separator';
     separator.textContent = formatDateSeparator(dateString);
-    messagesDiv.appendChild(separator);
+    return separator;
 }
 
 function updateContactLastMessage(senderId, receiverId, message, timestamp) {
@@ -1042,9 +1225,8 @@ function incrementUnreadCount(userId) {
 }
 
 function scrollToBottom() {
-    const messagesDiv = document.getElementById('chatMessages');
-    if (messagesDiv) {
-        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    if (document.getElementById('chatMessages')) {
+        getMessageList().scrollToBottom();
     }
 }
 
@@ -1240,6 +1422,71 @@ document.addEventListener('DOMContentLoaded', function() {
 // Auto-update timestamps every minute
 setInterval(updateAllContactTimestamps, 60000);
 
+function applyUnreadCounts(counts) {
+    document.querySelectorAll('.unread-badge').forEach(badge => {
+        const userId = parseInt(badge.id.replace('unread-', ''));
+        const count = userId === window.activeUserId ? 0 : (counts[userId] || 0);
+        badge.textContent = count;
+        badge.style.display = count > 0 ? 'inline-block' : 'none';
+    });
+}
+
+// Unread badges from the server every minute. The browser revalidates with
+// the ETag, so an unchanged count is a bodiless 304.
+function loadUnreadCounts() {
+    fetch('/chat/unread-count')
+        .then(response => response.json())
+        .then(data => applyUnreadCounts(data.counts))
+        .catch(error => console.error('Error loading unread counts:', error));
+}
+
+setInterval(loadUnreadCounts, 60000);
+
+// One request on page load: unread badges, online dots, the last message of
+// every conversation and the first page of the chat that was open last time
+function bootstrapChat() {
+    const lastOpen = parseInt(sessionStorage.getItem('chat:lastOpen')) || null;
+    (lastOpen ? loadCachedConversation(lastOpen) : Promise.resolve(null))
+        .then(cached => {
+            // A cached chat opens at once and syncs; the server only sends its history otherwise
+            const contact = document.querySelector(`.contact-item[data-user-id="${lastOpen}"]`);
+            if (cached && contact && !activeUserId) {
+                openChat(lastOpen, contact.dataset.username, contact.dataset.avatar);
+                return fetch('/chat/bootstrap');
+            }
+            return fetch(lastOpen ? `/chat/bootstrap?open=${lastOpen}` : '/chat/bootstrap');
+        })
+        .then(response => response.json())
+        .then(data => {
+            // Oldest first, so the most recent conversation ends up on top
+            Object.values(data.previews).sort((a, b) => a.id - b.id).forEach(msg => {
+                const displayMessage = msg.message || (msg.attachment_url ? '📎 Attachment' : '');
+                updateContactLastMessage(msg.sender_id, msg.receiver_id, displayMessage, msg.timestamp);
+            });
+            data.online.forEach(userId => {
+                const contact = document.querySelector(`.contact-item[data-user-id="${userId}"]`);
+                if (contact) contact.classList.add('is-online');
+            });
+            applyUnreadCounts(data.unread);
+            
+            if (data.history && !activeUserId) {
+                const contact = document.querySelector(`.contact-item[data-user-id="${data.history.user_id}"]`);
+                if (contact) {
+                    openChat(data.history.user_id, contact.dataset.username, contact.dataset.avatar, data.history);
+                }
+            }
+        })
+        .catch(error => console.error('Error loading chat:', error));
+}
+
+document.addEventListener('DOMContentLoaded', bootstrapChat);
+
+if (chatMessagesDiv) {
+    chatMessagesDiv.addEventListener('scroll', () => {
+        if (chatMessagesDiv.scrollTop < 100) loadOlderMessages();
+    });
+}
+
 // ============================================================
 // DEBUGGING HELPERS
 // ============================================================
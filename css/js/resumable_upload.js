@@ -0,0 +1,137 @@
+// Chunked, resumable uploads (server side: chunked_upload.py)
+//
+// resumableUpload(file, purpose, onProgress) sends the file in small chunks
+// and resolves with the upload_id once the server has every byte. A failed
+// chunk is retried with back-off, and the upload id is remembered in
+// localStorage so picking the same file again after a reload carries on
+// from the last chunk the server received instead of starting over.
+//
+// enhanceUploadForm(form, {inputName: purpose}) makes a normal form use it:
+// on submit the selected files are uploaded first, then the form is sent
+// with hidden <inputName>_upload_id fields instead of the file bytes.
+
+// ============================================================
+// CORE UPLOAD
+// ============================================================
+
+const UPLOAD_MAX_RETRIES = 8;
+
+function uploadStorageKey(file, purpose) {
+    return 'upload:' + purpose + ':' + file.name + ':' + file.size + ':' + file.lastModified;
+}
+
+function uploadSleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+async function uploadJson(url, options) {
+    const response = await fetch(url, options);
+    const data = await response.json().catch(() => ({}));
+    return { ok: response.ok, status: response.status, data: data };
+}
+
+async function startOrResumeUpload(file, purpose) {
+    const key = uploadStorageKey(file, purpose);
+    const savedId = localStorage.getItem(key);
+    if (savedId) {
+        const status = await uploadJson('/upload-sessions/' + savedId);
+        if (status.ok) {
+            return { key: key, uploadId: savedId, offset: status.data.offset, complete: status.data.complete };
+        }
+        localStorage.removeItem(key);
+    }
+
+    const init = await uploadJson('/upload-sessions/init', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size, purpose: purpose, content_type: file.type })
+    });
+    if (!init.ok) {
+        throw new Error(init.data.error || 'Could not start upload');
+    }
+    localStorage.setItem(key, init.data.upload_id);
+    localStorage.setItem('upload-chunk-size', init.data.chunk_size);
+    return { key: key, uploadId: init.data.upload_id, offset: 0, complete: false };
+}
+
+async function resumableUpload(file, purpose, onProgress) {
+    const session = await startOrResumeUpload(file, purpose);
+    const chunkSize = parseInt(localStorage.getItem('upload-chunk-size')) || 1024 * 1024;
+    let offset = session.offset;
+    let failures = 0;
+
+    while (!session.complete && offset < file.size) {
+        const chunk = file.slice(offset, Math.min(offset + chunkSize, file.size));
+        try {
+            const result = await uploadJson('/upload-sessions/' + session.uploadId + '/append?offset=' + offset, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: chunk
+            });
+            if (result.ok || result.status === 409) {
+                // 409 means the server is somewhere else: continue from its offset
+                offset = result.data.offset;
+                failures = 0;
+                if (onProgress) onProgress(offset / file.size);
+                continue;
+            }
+            if (result.status < 500) {
+                throw new Error(result.data.error || 'Upload rejected');
+            }
+        } catch (error) {
+            if (error.message && !(error instanceof TypeError)) throw error;  // TypeError = network failure
+        }
+        failures += 1;
+        if (failures > UPLOAD_MAX_RETRIES) {
+            throw new Error('Connection lost. Pick the file again to resume.');
+        }
+        await uploadSleep(Math.min(30000, 500 * Math.pow(2, failures)));
+    }
+
+    const done = await uploadJson('/upload-sessions/' + session.uploadId + '/complete', { method: 'POST' });
+    if (!done.ok) {
+        throw new Error(done.data.error || 'Upload failed');
+    }
+    localStorage.removeItem(session.key);
+    return session.uploadId;
+}
+
+// ============================================================
+// FORM ENHANCEMENT
+// ============================================================
+
+function enhanceUploadForm(form, inputs) {
+    if (!form || !window.fetch) return;
+
+    form.addEventListener('submit', async function (event) {
+        if (form.dataset.uploadsDone) return;
+        event.preventDefault();
+
+        const submitButton = form.querySelector('[type="submit"]');
+        const originalLabel = submitButton ? submitButton.innerHTML : '';
+        try {
+            for (const [name, purpose] of Object.entries(inputs)) {
+                const input = form.querySelector('input[type="file"][name="' + name + '"]');
+                if (!input || !input.files.length) continue;
+
+                for (const file of Array.from(input.files)) {
+                    const uploadId = await resumableUpload(file, purpose, progress => {
+                        if (submitButton) submitButton.innerHTML = 'Uploading ' + file.name + ' ' + Math.round(progress * 100) + '%';
+                    });
+                    const hidden = document.createElement('input');
+                    hidden.type = 'hidden';
+                    hidden.name = name + '_upload_id';
+                    hidden.value = uploadId;
+                    form.appendChild(hidden);
+                }
+                input.disabled = true;  // the bytes are already on the server
+            }
+        } catch (error) {
+            if (submitButton) submitButton.innerHTML = originalLabel;
+            alert('Upload failed: ' + error.message);
+            return;
+        }
+        form.dataset.uploadsDone = '1';
+        form.submit();
+    });
+}
@@ -0,0 +1,206 @@
+/**
+ * Windowed list: only the rows in view (plus a buffer above and below) are
+ * in the DOM; spacers stand in for the rest. Used by chat.js for message
+ * history, where long threads made older phones and tablets lag.
+ *
+ *   const list = new VirtualList(scroller, row => element);
+ *   list.setRows([{ key: 'm:1', data: msg }, ...]);
+ *
+ * - rows are plain objects with a unique key; a row's element is reused
+ *   while the row object is the same one, so replace the object to change
+ *   it (or call rerender(key))
+ * - heights are measured once rendered (ResizeObserver keeps them current
+ *   as images load or a row is edited) and estimated until then
+ * - every change keeps the view anchored: the first visible row stays
+ *   where it was when rows are prepended, edited or deleted, and a list
+ *   scrolled to the bottom stays at the bottom
+ */
+class VirtualList {
+    constructor(scroller, renderRow, options = {}) {
+        this.scroller = scroller;
+        this.renderRow = renderRow;
+        this.estimate = options.estimate || 64;  // px for rows not measured yet
+        this.buffer = options.buffer || 800;     // px rendered above and below the view
+
+        this.rows = [];
+        this.index = new Map();     // key -> row index
+        this.heights = new Map();   // key -> measured height
+        this.rendered = new Map();  // key -> { row, element }
+        this.offsets = [0];
+        this.frame = null;
+
+        this.root = document.createElement('div');
+        this.top = document.createElement('div');
+        this.items = document.createElement('div');
+        this.bottom = document.createElement('div');
+        this.root.className = 'vlist';
+        this.root.append(this.top, this.items, this.bottom);
+        scroller.prepend(this.root);
+        // Anchoring is done here; the browser's own would fight it
+        scroller.style.overflowAnchor = 'none';
+
+        this.resizeObserver = 'ResizeObserver' in window ? new ResizeObserver(() => this.measure()) : null;
+        if (!this.resizeObserver) {
+            this.root.addEventListener('load', () => this.measure(), true);
+        }
+        scroller.addEventListener('scroll', () => this.schedule(), { passive: true });
+        window.addEventListener('resize', () => this.measure());
+    }
+
+    setRows(rows) {
+        const anchor = this.anchor();
+        this.rows = rows;
+        this.index = new Map(rows.map((row, i) => [row.key, i]));
+        this.layout();
+        this.render(anchor);
+    }
+
+    rerender(key) {
+        const entry = this.rendered.get(key);
+        if (entry) entry.row = null;
+        this.render(this.anchor());
+    }
+
+    clear() {
+        this.heights.clear();
+        this.setRows([]);
+    }
+
+    atBottom() {
+        const s = this.scroller;
+        return s.scrollHeight - s.clientHeight - s.scrollTop < 8;
+    }
+
+    scrollToBottom() {
+        this.scroller.scrollTop = this.scroller.scrollHeight;
+        this.render('bottom');
+    }
+
+    elementFor(key) {
+        const entry = this.rendered.get(key);
+        return entry ? entry.element : null;
+    }
+
+    // --- internals ---
+
+    layout() {
+        const offsets = new Array(this.rows.length + 1);
+        offsets[0] = 0;
+        for (let i = 0; i < this.rows.length; i++) {
+            offsets[i + 1] = offsets[i] + (this.heights.get(this.rows[i].key) || this.estimate);
+        }
+        this.offsets = offsets;
+    }
+
+    // The first row at least partly in view and how far its top is above the view
+    anchor() {
+        if (!this.rows.length || this.atBottom()) return 'bottom';
+        const viewTop = this.scroller.scrollTop - this.origin();
+        const i = Math.min(this.find(viewTop), this.rows.length - 1);
+        return { key: this.rows[i].key, index: i, offset: this.offsets[i] - viewTop };
+    }
+
+    restore(anchor) {
+        if (anchor === 'bottom') {
+            this.scroller.scrollTop = this.scroller.scrollHeight;
+            return;
+        }
+        // A deleted anchor row is replaced by whatever now sits at its index
+        const i = this.index.has(anchor.key) ? this.index.get(anchor.key) : Math.min(anchor.index, this.rows.length - 1);
+        if (i < 0) return;
+        this.scroller.scrollTop = this.origin() + this.offsets[i] - anchor.offset;
+    }
+
+    // Where the list starts in the scroller's content (below its padding)
+    origin() {
+        return this.root.getBoundingClientRect().top - this.scroller.getBoundingClientRect().top
+            - this.scroller.clientTop + this.scroller.scrollTop;
+    }
+
+    // Index of the row containing y (binary search over the offsets)
+    find(y) {
+        let lo = 0, hi = this.rows.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (this.offsets[mid + 1] <= y) lo = mid + 1; else hi = mid;
+        }
+        return lo;
+    }
+
+    schedule() {
+        if (this.frame) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render(null);
+        });
+    }
+
+    measure() {
+        const anchor = this.anchor();
+        if (this.updateHeights()) {
+            this.layout();
+            this.render(anchor);
+        }
+    }
+
+    updateHeights() {
+        let changed = false;
+        this.rendered.forEach((entry, key) => {
+            const height = entry.element.offsetHeight;
+            if (height && this.heights.get(key) !== height) {
+                this.heights.set(key, height);
+                changed = true;
+            }
+        });
+        return changed;
+    }
+
+    render(anchor) {
+        // Measuring can move rows, which can bring new ones into view: settle in a few passes
+        for (let pass = 0; pass < 3; pass++) {
+            if (anchor) this.restore(anchor);
+            this.paint();
+            const settled = anchor || this.anchor();  // taken before the offsets move
+            if (!this.updateHeights()) return;
+            this.layout();
+            anchor = settled;
+        }
+        this.restore(anchor);
+        this.paint();
+    }
+
+    paint() {
+        const viewTop = this.scroller.scrollTop - this.origin();
+        const start = this.find(Math.max(0, viewTop - this.buffer));
+        const end = Math.min(this.rows.length, this.find(viewTop + this.scroller.clientHeight + this.buffer) + 1);
+
+        const keep = new Map();
+        const elements = [];
+        for (let i = start; i < end; i++) {
+            const row = this.rows[i];
+            let entry = this.rendered.get(row.key);
+            if (!entry || entry.row !== row) {
+                if (entry && this.resizeObserver) this.resizeObserver.unobserve(entry.element);
+                const element = document.createElement('div');
+                element.className = 'vlist-row';
+                element.appendChild(this.renderRow(row));
+                entry = { row, element };
+                if (this.resizeObserver) this.resizeObserver.observe(element);
+            }
+            keep.set(row.key, entry);
+            elements.push(entry.element);
+        }
+        this.rendered.forEach((entry, key) => {
+            if (!keep.has(key) && this.resizeObserver) this.resizeObserver.unobserve(entry.element);
+        });
+        this.rendered = keep;
+
+        this.top.style.height = this.offsets[start] + 'px';
+        this.bottom.style.height = (this.offsets[this.rows.length] - this.offsets[end]) + 'px';
+        // Skip the DOM write when the window did not move
+        const current = this.items.children;
+        if (current.length !== elements.length || elements.some((el, i) => current[i] !== el)) {
+            this.items.replaceChildren(...elements);
+        }
+    }
+}
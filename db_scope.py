@@ -0,0 +1,40 @@
+"""Database session lifecycle for Socket.IO event handlers.
+
+HTTP views get a clean session for free: Flask-SQLAlchemy removes it when
+the request's app context is torn down. Socket.IO handlers live inside a
+long-running connection, and a handler that fails half-way would otherwise
+leave a dirty transaction, an identity map full of objects and a checked-out
+pooled connection behind in a worker that runs for days.
+
+Wrap every handler with @scoped_event (below @socketio.on) so each event
+gets its own unit of work:
+
+    @socketio.on('send_message')
+    @scoped_event
+    def handle_send_message_new(data):
+        ...
+
+Handlers still commit their own work explicitly; the decorator never does.
+
+- error    -> roll back, log, re-raise (Flask-SocketIO reports it)
+- always   -> remove the session, returning its connection to the pool and
+              dropping anything a handler added but did not commit
+"""
+import functools
+
+from models import db
+
+
+def scoped_event(handler):
+    """Give a Socket.IO handler a fresh session with rollback/remove"""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        try:
+            return handler(*args, **kwargs)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error in socket event {handler.__name__}: {e}")
+            raise
+        finally:
+            db.session.remove()
+    return wrapper
@@ -0,0 +1,6 @@
+"""Flask extensions, created unbound and attached to an app in create_app()"""
+from flask_login import LoginManager
+from flask_socketio import SocketIO
+
+socketio = SocketIO()
+login_manager = LoginManager()
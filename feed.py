@@ -0,0 +1,188 @@
+"""Aggregated home feed: posts from joined communities + friends' stories.
+
+Each source is queried as its own (created_at, id) ordered stream and the
+streams are k-way merged with heapq. Pagination is keyset based, so a page is
+always a fixed number of queries no matter how deep the user scrolls.
+
+Rows without a timestamp (the columns are nullable) have no place in that
+order and can't be compared in the merge, so the sources leave them out.
+"""
+import base64
+import heapq
+import itertools
+from datetime import datetime
+
+from models import db, User, Story, StoryComment, Community, CommunityMember, Post, PostLike, CommunityComment, connections
+from timeline import visibility_filter
+
+FEED_PAGE_SIZE = 20
+
+# Tie-break order when a post and a story share the same timestamp
+KIND_POST = 1
+KIND_STORY = 0
+
+
+# --- CURSOR HELPERS ---
+def encode_cursor(created_at, kind, item_id):
+    """Encode the sort key of the last item on a page as an opaque token"""
+    raw = f"{created_at.isoformat()}|{kind}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    """Decode a cursor token, returning None for missing or malformed input"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token.encode()).decode()
+        ts, kind, item_id = raw.split('|')
+        return datetime.fromisoformat(ts), int(kind), int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _keyset_filter(ts_col, id_col, kind, cursor):
+    """Rows strictly after the cursor in (ts desc, kind desc, id desc) order"""
+    c_ts, c_kind, c_id = cursor
+    if kind < c_kind:
+        return ts_col <= c_ts
+    if kind > c_kind:
+        return ts_col < c_ts
+    return db.or_(ts_col < c_ts, db.and_(ts_col == c_ts, id_col < c_id))
+
+
+# --- SOURCE STREAMS ---
+def _community_posts(user_id, cursor, limit):
+    member_of = db.select(CommunityMember.community_id).where(CommunityMember.user_id == user_id)
+    query = Post.query.filter(Post.community_id.in_(member_of), Post.created_at.isnot(None))
+    if cursor:
+        query = query.filter(_keyset_filter(Post.created_at, Post.id, KIND_POST, cursor))
+    return query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit).all()
+
+
+def _friend_stories(user_id, cursor, limit):
+    friend_ids = db.select(connections.c.friend_id).where(connections.c.user_id == user_id)
+    query = Story.query.filter(Story.user_id.in_(friend_ids), Story.timestamp.isnot(None), visibility_filter(user_id))
+    if cursor:
+        query = query.filter(_keyset_filter(Story.timestamp, Story.id, KIND_STORY, cursor))
+    return query.order_by(Story.timestamp.desc(), Story.id.desc()).limit(limit).all()
+
+
+def _stream(rows, kind, ts_attr):
+    for row in rows:
+        yield (getattr(row, ts_attr), kind, row.id, row)
+
+
+# --- PAGE BUILDER ---
+def get_feed_page(user_id, cursor_token=None, limit=FEED_PAGE_SIZE):
+    """Build one page of the feed for a user.
+
+    Returns (items, next_cursor). Each item is a dict with 'kind' ('post' or
+    'story'), the underlying row, its author, and pre-computed counts so the
+    template never triggers lazy loads.
+    """
+    cursor = decode_cursor(cursor_token)
+
+    # One extra row per source tells us whether another page exists
+    posts = _community_posts(user_id, cursor, limit + 1)
+    stories = _friend_stories(user_id, cursor, limit + 1)
+
+    merged = heapq.merge(
+        _stream(posts, KIND_POST, 'created_at'),
+        _stream(stories, KIND_STORY, 'timestamp'),
+        key=lambda entry: entry[:3],
+        reverse=True,
+    )
+    page = list(itertools.islice(merged, limit + 1))
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last_ts, last_kind, last_id, _ = page[-1]
+        next_cursor = encode_cursor(last_ts, last_kind, last_id)
+
+    page_posts = [row for _, kind, _, row in page if kind == KIND_POST]
+    page_stories = [row for _, kind, _, row in page if kind == KIND_STORY]
+    post_ids = [p.id for p in page_posts]
+    story_ids = [s.id for s in page_stories]
+
+    # Batch-load everything the cards need
+    author_ids = {p.user_id for p in page_posts} | {s.user_id for s in page_stories}
+    authors = {u.id: u for u in User.query.filter(User.id.in_(author_ids)).all()} if author_ids else {}
+
+    community_ids = {p.community_id for p in page_posts}
+    communities = {c.id: c for c in Community.query.filter(Community.id.in_(community_ids)).all()} if community_ids else {}
+
+    like_counts = {}
+    comment_counts = {}
+    liked_ids = set()
+    if post_ids:
+        like_counts = dict(db.session.query(PostLike.post_id, db.func.count(PostLike.id))
+                           .filter(PostLike.post_id.in_(post_ids))
+                           .group_by(PostLike.post_id).all())
+        comment_counts = dict(db.session.query(CommunityComment.post_id, db.func.count(CommunityComment.id))
+                              .filter(CommunityComment.post_id.in_(post_ids))
+                              .group_by(CommunityComment.post_id).all())
+        liked_ids = {row.post_id for row in PostLike.query.with_entities(PostLike.post_id)
+                     .filter(PostLike.user_id == user_id, PostLike.post_id.in_(post_ids)).all()}
+
+    story_comment_counts = {}
+    if story_ids:
+        story_comment_counts = dict(db.session.query(StoryComment.story_id, db.func.count(StoryComment.id))
+                                    .filter(StoryComment.story_id.in_(story_ids))
+                                    .group_by(StoryComment.story_id).all())
+
+    items = []
+    for created_at, kind, item_id, row in page:
+        if kind == KIND_POST:
+            items.append({
+                'kind': 'post',
+                'id': item_id,
+                'created_at': created_at,
+                'row': row,
+                'author': authors.get(row.user_id),
+                'community': communities.get(row.community_id),
+                'like_count': like_counts.get(item_id, 0),
+                'comment_count': comment_counts.get(item_id, 0),
+                'user_has_liked': item_id in liked_ids,
+            })
+        else:
+            items.append({
+                'kind': 'story',
+                'id': item_id,
+                'created_at': created_at,
+                'row': row,
+                'author': authors.get(row.user_id),
+                'like_count': row.likes or 0,
+                'comment_count': story_comment_counts.get(item_id, 0),
+            })
+
+    return items, next_cursor
+
+
+def feed_item_to_dict(item):
+    """JSON-friendly view of a feed item"""
+    row = item['row']
+    author = item['author']
+    data = {
+        'kind': item['kind'],
+        'id': item['id'],
+        'created_at': item['created_at'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'author': {'id': author.id, 'username': author.username} if author else None,
+        'like_count': item['like_count'],
+        'comment_count': item['comment_count'],
+    }
+    if item['kind'] == 'post':
+        community = item['community']
+        data.update({
+            'content': row.content,
+            'image_filename': row.image_filename,
+            'community': {'id': community.id, 'name': community.name} if community else None,
+            'user_has_liked': item['user_has_liked'],
+        })
+    else:
+        data.update({
+            'title': row.title,
+            'description': row.description,
+        })
+    return data
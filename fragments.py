@@ -0,0 +1,225 @@
+"""Tagged cache for listing queries and rendered template fragments.
+
+Listing pages (event browse, communities, story browse, notifications) are
+read far more often than the rows behind them change. Their query results
+and rendered cards are cached here, each entry tagged with what it shows:
+
+    events = remember(('events', q, category), ['events'], load_events)
+
+    {% call cached_fragment('event-card', e.id, mine, tags=['event:%d' % e.id]) %}
+      ...card markup...
+    {% endcall %}
+
+and writes invalidate the tags they touch, after committing:
+
+    invalidate('events', f'event:{event.id}')
+
+Tags are version counters. An entry records the version of each of its
+tags as they were *before* it was computed, and is a miss once any of them
+has moved on: invalidating is one counter bump per tag, no index of keys
+has to be kept, and a result computed while a write was in flight is
+never served.
+
+Tag conventions: a listing carries the collection tag ('events',
+'communities', 'stories') that every write to that table bumps; a card
+carries its row's tag ('event:<id>', ...) so a write re-renders only that
+card. Keys must include everything else the output depends on (filters,
+the viewer, "is this mine"); cached_fragment adds whether the page is in
+lite mode (lite.py) itself.
+
+Entries live in a per-process LRU (cache.TTLCache). With CACHE_URL set,
+tag versions and entries also go to a shared backend, so every worker sees
+every invalidation:
+
+    CACHE_URL=redis://localhost:6379/0   RedisBackend (needs the redis package)
+    CACHE_URL=local                      LocalBackend: the same interface kept
+                                         in this process (tests, benchmarks)
+"""
+import pickle
+import threading
+
+from markupsafe import Markup
+
+from cache import TTLCache
+from lite import is_lite
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+LISTING_TTL = 300  # seconds; an upper bound on staleness if an invalidation is missed
+KEY_PREFIX = 'bridgegen:'
+
+# Benchmarks flip this to measure uncached pages
+ENABLED = True
+
+MISS = object()
+
+
+# --- SHARED BACKENDS ---
+class LocalBackend:
+    """In-process stand-in for a shared cache server"""
+
+    def __init__(self, maxsize=10000):
+        self._entries = TTLCache(maxsize=maxsize, ttl=LISTING_TTL)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry, ttl):
+        self._entries.set(key, entry, ttl)
+
+    def versions(self, tags):
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisBackend:
+    """Entries and tag versions in Redis, shared by every worker"""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_URL points at Redis but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        data = self._client.get(KEY_PREFIX + repr(key))
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, entry, ttl):
+        self._client.set(KEY_PREFIX + repr(key), pickle.dumps(entry), ex=ttl)
+
+    def versions(self, tags):
+        return [int(v or 0) for v in self._client.mget([f"{KEY_PREFIX}tag:{t}" for t in tags])]
+
+    def bump(self, tags):
+        pipe = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"{KEY_PREFIX}tag:{tag}")
+        pipe.execute()
+
+
+def make_backend(url):
+    if not url:
+        return None
+    if url == 'local':
+        return LocalBackend()
+    return RedisBackend(url)
+
+
+# --- TAGGED CACHE ---
+class TaggedCache:
+    def __init__(self, maxsize=2048, ttl=LISTING_TTL, backend=None):
+        self.ttl = ttl
+        self.backend = backend
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}  # tag versions when there is no shared backend
+        self._lock = threading.Lock()
+
+    def versions(self, tags):
+        """Current version of each tag; read these before computing a value to put()"""
+        if self.backend is not None:
+            return dict(zip(tags, self.backend.versions(tags)))
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    def get(self, key):
+        entry = self._local.get(key)
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self._local.set(key, entry)
+        if entry is None:
+            return MISS
+        versions, value = entry
+        if self.versions(list(versions)) != versions:
+            return MISS
+        return value
+
+    def remember(self, key, tags, compute, ttl=None):
+        """The cached value for key, or compute() stored under tags"""
+        if not ENABLED:
+            return compute()
+        try:
+            value = self.get(key)
+            if value is not MISS:
+                return value
+            versions = self.versions(list(tags))
+        except Exception as e:
+            print(f"Error reading cache entry {key!r}: {e}")
+            return compute()
+
+        value = compute()
+        self.put(key, versions, value, ttl)
+        return value
+
+    def put(self, key, versions, value, ttl=None):
+        entry = (versions, value)
+        self._local.set(key, entry, ttl)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, entry, ttl or self.ttl)
+            except Exception as e:
+                print(f"Error writing cache entry {key!r}: {e}")
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            with self._lock:
+                for tag in tags:
+                    self._versions[tag] = self._versions.get(tag, 0) + 1
+            return
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            print(f"Error invalidating cache tags {tags}: {e}")
+
+    def clear(self):
+        self._local.clear()
+
+
+listing_cache = TaggedCache()
+
+
+def remember(key, tags, compute, ttl=None):
+    return listing_cache.remember(key, tags, compute, ttl)
+
+
+def invalidate(*tags):
+    """Call after committing a write, with the tags of everything it changed"""
+    listing_cache.invalidate(*tags)
+
+
+# --- QUERY RESULTS ---
+class Row(dict):
+    """Column snapshot of a model row, readable like the ORM object"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def snapshot(obj, **extra):
+    """A Row of obj's columns (plus extra fields), safe to keep across sessions"""
+    row = Row((attr.key, getattr(obj, attr.key)) for attr in obj.__mapper__.column_attrs)
+    row.update(extra)
+    return row
+
+
+# --- TEMPLATE FRAGMENTS ---
+def cached_fragment(*key, tags=(), ttl=None, caller=None):
+    """{% call cached_fragment(name, *key, tags=[...]) %} markup {% endcall %}"""
+    # Lite pages render the same card with other images and markup
+    return Markup(remember(('fragment', is_lite()) + key, list(tags), lambda: str(caller()), ttl))
+
+
+def register_fragment_cache(app):
+    listing_cache.backend = make_backend(app.config.get('CACHE_URL'))
+    app.add_template_global(cached_fragment)
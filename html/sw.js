@@ -0,0 +1,146 @@
+// BridgeGen service worker, rendered by routes/pwa.py (strategies are listed there)
+const VERSION = {{ version|tojson }};
+const SETTINGS = {{ settings|tojson }};
+
+const SHELL_CACHE = 'shell-' + VERSION;
+const PAGE_CACHE = 'pages';
+const MEDIA_CACHE = 'media';
+const STATIC_CACHE = 'static';
+const CACHES = [SHELL_CACHE, PAGE_CACHE, MEDIA_CACHE, STATIC_CACHE];
+
+const CDN_HOSTS = SETTINGS.cdn.map(url => new URL(url).host);
+const BLOB = /\/blobs\/[0-9a-f]{2}\/[0-9a-f]{2}\/[0-9a-f]{64}/;
+{% if enabled %}
+
+self.addEventListener('install', event => {
+    event.waitUntil(caches.open(SHELL_CACHE).then(cache => Promise.all([
+        // 'reload': straight from the server, not a stale HTTP cache copy
+        cache.addAll(SETTINGS.shell.map(url => new Request(url, { cache: 'reload' }))),
+        // Cross-origin files come back opaque, which addAll refuses; they are a bonus
+        ...SETTINGS.cdn.map(url => fetch(url, { mode: 'no-cors' })
+            .then(response => cache.put(url, response))
+            .catch(() => null))
+    ])).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (!CACHES.includes(name)) await caches.delete(name);
+        }
+        if (self.registration.navigationPreload) {
+            await self.registration.navigationPreload.enable();
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || request.headers.has('range')) return;
+    const url = new URL(request.url);
+
+    if (request.mode === 'navigate') {
+        if (url.pathname === SETTINGS.logout) {
+            event.waitUntil(forgetUser());
+            return;
+        }
+        event.respondWith(networkFirst(event));
+    } else if (url.origin !== location.origin) {
+        if (CDN_HOSTS.includes(url.host)) event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (BLOB.test(url.pathname) || (url.pathname.startsWith('/avatar/') && url.searchParams.has('v'))) {
+        event.respondWith(cacheFirst(request, MEDIA_CACHE, SETTINGS.media_cache_size));
+    } else if (SETTINGS.shell.includes(url.pathname)) {
+        // Refreshed by the next worker whenever one of them changes
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+    } else if (url.pathname.startsWith(SETTINGS.static + 'dist/')) {
+        event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (url.pathname.startsWith(SETTINGS.static) && !url.pathname.startsWith(SETTINGS.static + 'uploads/')) {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
+
+// Pages: the network, else the copy saved last time, else the offline page
+async function networkFirst(event) {
+    const request = event.request;
+    try {
+        const response = (await event.preloadResponse) || await fetch(request);
+        const cacheControl = response.headers.get('Cache-Control') || '';
+        if (response.status === 200 && !cacheControl.includes('no-store')) {
+            const copy = response.clone();
+            event.waitUntil(caches.open(PAGE_CACHE)
+                .then(cache => cache.put(request, copy))
+                .then(() => trim(PAGE_CACHE, SETTINGS.page_cache_size)));
+        }
+        return response;
+    } catch (error) {
+        return (await caches.match(request, { cacheName: PAGE_CACHE }))
+            || (await caches.match(SETTINGS.offline))
+            || Response.error();
+    }
+}
+
+// Files whose URL changes with their content, and the shell
+async function cacheFirst(request, cacheName, limit) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (keepForGood(response)) {
+        const cache = await caches.open(cacheName);
+        await cache.put(request, response.clone());
+        if (limit) trim(cacheName, limit);
+    }
+    return response;
+}
+
+// CDN URLs carry their version; our own responses have to say immutable
+// (a blob's original is sent for a minute while its resized copy renders)
+function keepForGood(response) {
+    if (response.type === 'opaque') return true;
+    if (response.type === 'cors') return response.ok;
+    return response.ok && (response.headers.get('Cache-Control') || '').includes('immutable');
+}
+
+// Unversioned static files (no build yet): cached copy now, fresh one for next time
+async function staleWhileRevalidate(event) {
+    const request = event.request;
+    // The refreshed copy before the one the shell was installed with
+    const cached = (await caches.match(request, { cacheName: STATIC_CACHE })) || (await caches.match(request));
+    const refresh = fetch(request).then(async response => {
+        if (response.ok) {
+            const cache = await caches.open(STATIC_CACHE);
+            await cache.put(request, response.clone());
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(refresh.catch(() => null));
+        return cached;
+    }
+    return refresh;
+}
+
+// Oldest entries go first once a cache holds more than limit
+async function trim(cacheName, limit) {
+    const cache = await caches.open(cacheName);
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - limit)).map(key => cache.delete(key)));
+}
+
+// Signing out: nothing of this account stays on the device
+async function forgetUser() {
+    await caches.delete(PAGE_CACHE);
+    indexedDB.deleteDatabase('bridgegen-chat');
+}
+{% else %}
+
+// Switched off: remove every cache and unregister, so pages load as before
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) await caches.delete(name);
+        await self.registration.unregister();
+    })());
+});
+{% endif %}
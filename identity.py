@@ -0,0 +1,93 @@
+"""Identity cache for the Flask-Login user_loader.
+
+load_user runs on every request and every Socket.IO event. Instead of a
+SELECT each time, a column snapshot of the user is kept in a process-wide
+TTL/LRU cache. On a hit the snapshot is turned back into a detached User and
+merged into the current session with load=False, which attaches it without
+touching the database. Route code can keep mutating current_user and
+committing as before.
+
+Snapshots must be dropped with invalidate_user() whenever a route changes a
+user's columns (username, email, colour, profile picture, ...). The password
+hash is never part of one: it stays out of process memory and any shared
+cache, and is loaded from the database on first access, which only the
+login check makes.
+
+Relationship collections that the cache does not cover (friends is a
+dynamic relationship and queries on every access; hobbies and interests are
+lazy loads) are memoised per request on flask.g via get_friend_ids(),
+get_hobby_names() and get_interest_names().
+"""
+from flask import g
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from models import db, User, Hobby, Interest, connections, user_hobbies, user_interests
+from cache import TTLCache
+
+IDENTITY_TTL = 300  # seconds
+
+_identity_cache = TTLCache(maxsize=4096, ttl=IDENTITY_TTL)
+
+# Columns left out stay unloaded on a cached user and are read on first access
+_UNCACHED_COLUMNS = {'_password_hash'}
+_USER_COLUMNS = [c.key for c in User.__mapper__.column_attrs if c.key not in _UNCACHED_COLUMNS]
+
+
+def _snapshot(user):
+    return {key: getattr(user, key) for key in _USER_COLUMNS}
+
+
+def load_cached_user(user_id):
+    """Return the user for user_id, hitting the database only on a cache miss"""
+    snapshot = _identity_cache.get(user_id)
+    if snapshot is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            _identity_cache.set(user_id, _snapshot(user))
+        return user
+
+    # Reuse the instance if this session already holds it
+    existing = db.session.identity_map.get(identity_key(User, user_id))
+    if existing is not None:
+        return existing
+
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def invalidate_user(user_id):
+    """Drop the cached snapshot after a profile change"""
+    _identity_cache.delete(user_id)
+
+
+# --- PER-REQUEST RELATIONSHIP MEMO ---
+def _memo(name, user_id, load):
+    memo = g.setdefault(name, {})
+    if user_id not in memo:
+        memo[user_id] = load()
+    return memo[user_id]
+
+
+def get_friend_ids(user_id):
+    """Ids of the users user_id has added as friends, memoised for this request"""
+    return _memo('_friend_ids', user_id, lambda: {r[0] for r in db.session.query(connections.c.friend_id)
+                                                  .filter(connections.c.user_id == user_id).all()})
+
+
+def get_hobby_names(user_id):
+    """Names of user_id's hobbies, memoised for this request"""
+    return _memo('_hobby_names', user_id, lambda: [r[0] for r in db.session.query(Hobby.name)
+                                                   .join(user_hobbies, user_hobbies.c.hobby_id == Hobby.id)
+                                                   .filter(user_hobbies.c.user_id == user_id)
+                                                   .order_by(Hobby.id).all()])
+
+
+def get_interest_names(user_id):
+    """Names of user_id's interests, memoised for this request"""
+    return _memo('_interest_names', user_id, lambda: [r[0] for r in db.session.query(Interest.name)
+                                                      .join(user_interests, user_interests.c.interest_id == Interest.id)
+                                                      .filter(user_interests.c.user_id == user_id)
+                                                      .order_by(Interest.id).all()])
+
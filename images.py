@@ -0,0 +1,234 @@
+"""Image derivatives for uploaded blobs: thumbnails, WebP/AVIF, srcset markup.
+
+When a new image blob is stored (see blobstore.py), a worker process renders:
+
+    css/uploads/variants/ab/<sha256>/meta.json     {width, height, widths, formats}
+    css/uploads/variants/ab/<sha256>/320.webp      one file per width and format
+    ...
+
+- widths: WIDTHS that are narrower than the original, plus the original width
+- formats: webp, avif (when Pillow supports it) and a jpeg/png fallback
+- EXIF is stripped (after applying its orientation); the blob itself is
+  left untouched so its hash still matches its bytes
+
+/uploads/<blob>?w=320 then serves the best variant the browser accepts
+(routes/media.py), and templates use upload_img() / upload_url() to emit
+srcset, sizes, width/height and lazy-loading markup. In lite mode (lite.py)
+both send one LITE_IMAGE_WIDTH thumbnail instead.
+
+Pillow is optional: without it no variants are made and every helper falls
+back to the original file.
+"""
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, url_for
+from markupsafe import Markup, escape
+
+import blobstore
+from cache import TTLCache
+from lite import LITE_IMAGE_WIDTH, is_lite
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+WIDTHS = (160, 320, 640, 1280)
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+QUALITY = {'avif': 55, 'webp': 80, 'jpeg': 82}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}  # sha256 -> future, so an image is never rendered twice at once
+_failed = set()  # sha256 of images Pillow could not read; not retried until restart
+_meta_cache = TTLCache(maxsize=4096, ttl=600)
+
+
+# --- WORKER PROCESS (no Flask here) ---
+def _save(im, path, fmt):
+    tmp_path = path + '.tmp'
+    options = {'quality': QUALITY[fmt]} if fmt in QUALITY else {'optimize': True}
+    if fmt == 'jpeg':
+        options.update(optimize=True, progressive=True)
+    # No exif= argument, so no metadata is written
+    im.save(tmp_path, format=fmt.upper(), **options)
+    os.replace(tmp_path, path)
+
+
+def render_variants(src_path, out_dir):
+    """Write every derivative of one image plus meta.json; returns the metadata"""
+    with Image.open(src_path) as original:
+        im = ImageOps.exif_transpose(original)
+        has_alpha = im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info
+        im = im.convert('RGBA' if has_alpha else 'RGB')
+    width, height = im.size
+
+    formats = ['webp'] + (['avif'] if features.check('avif') else [])
+    fallback = 'png' if has_alpha else 'jpeg'
+    widths = [w for w in WIDTHS if w < width] + [width]
+
+    os.makedirs(out_dir, exist_ok=True)
+    for w in widths:
+        resized = im if w == width else im.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+        for fmt in formats + [fallback]:
+            _save(resized, os.path.join(out_dir, f"{w}.{fmt}"), fmt)
+
+    meta = {'width': width, 'height': height, 'widths': widths, 'formats': formats, 'fallback': fallback}
+    with open(os.path.join(out_dir, 'meta.json.tmp'), 'w') as f:
+        json.dump(meta, f)
+    # meta.json appears last, so its presence means every variant is ready
+    os.replace(os.path.join(out_dir, 'meta.json.tmp'), os.path.join(out_dir, 'meta.json'))
+    return meta
+
+
+# --- QUEUEING ---
+def _get_executor(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forked children would inherit the eventlet hub and open sockets
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            # The executor's own exit hook never runs under eventlet, and the
+            # idle workers would then keep the process from exiting
+            atexit.register(_executor.shutdown, cancel_futures=True)
+        return _executor
+
+
+def is_image(name):
+    return os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS
+
+
+def queue_variants(name):
+    """Render derivatives of an image blob in the background; returns the future or None"""
+    match = blobstore.BLOB_PATTERN.fullmatch(name)
+    if Image is None or not match or not is_image(name):
+        return None
+    digest = match.group(1)
+    src_path = os.path.join(blobstore.uploads_dir(), name)
+    executor = _get_executor(current_app.config.get('IMAGE_WORKERS', 2))
+    # Check, submit and register in one hold so concurrent uploads share a render
+    with _executor_lock:
+        if digest in _failed:
+            return None
+        if digest in _pending:
+            return _pending[digest]
+        future = executor.submit(render_variants, src_path, blobstore.variant_dir(digest))
+        _pending[digest] = future
+    # Outside the lock: a future that is already done runs _finished right here
+    future.add_done_callback(lambda f: _finished(digest, f))
+    return future
+
+
+def _finished(digest, future):
+    with _executor_lock:
+        _pending.pop(digest, None)
+        if future.exception() is not None:
+            _failed.add(digest)
+    if future.exception() is not None:
+        print(f"Error rendering image variants: {future.exception()}")
+
+
+def variant_meta(name):
+    """Metadata of a blob's variants, or None if they are not ready (or it is no image)"""
+    match = blobstore.BLOB_PATTERN.fullmatch(name or '')
+    if not match:
+        return None
+    digest = match.group(1)
+    meta = _meta_cache.get(digest)
+    if meta is None:
+        try:
+            with open(os.path.join(blobstore.variant_dir(digest), 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        _meta_cache.set(digest, meta)
+    return meta
+
+
+# --- NEGOTIATION ---
+def pick_variant(name, width, accept):
+    """(path, mimetype) of the best variant for a request, or None to serve the original"""
+    meta = variant_meta(name)
+    if meta is None:
+        return None
+    wanted = width or meta['width']
+    chosen = next((w for w in meta['widths'] if w >= wanted), meta['widths'][-1])
+
+    # Only formats the browser names explicitly; */* is not a promise to decode AVIF
+    named = {value for value, quality in accept if quality > 0}
+    for fmt in ('avif', 'webp'):
+        if fmt in meta['formats'] and MIMETYPES[fmt] in named:
+            break
+    else:
+        fmt = meta['fallback']
+
+    digest = blobstore.BLOB_PATTERN.fullmatch(name).group(1)
+    return os.path.join(blobstore.variant_dir(digest), f"{chosen}.{fmt}"), MIMETYPES[fmt]
+
+
+# --- TEMPLATE HELPERS ---
+def _blob_name(value):
+    match = blobstore.BLOB_PATTERN.search(value or '')
+    return match.group(0) if match else None
+
+
+def upload_url(value, width=None):
+    """URL of an upload column value (any of the formats in blobstore.py), resized when possible"""
+    name = _blob_name(value)
+    if name is None:
+        if not value or value.startswith(('http', '/')):
+            return value
+        return url_for('static', filename=value if value.startswith('uploads/') else 'uploads/' + value)
+    if width and is_lite():
+        width = min(width, LITE_IMAGE_WIDTH)
+    if width and variant_meta(name):
+        return url_for('media.uploaded_file', filename=name, w=width)
+    return url_for('media.uploaded_file', filename=name)
+
+
+def upload_img(value, alt='', sizes='100vw', width=640, **attrs):
+    """<img> for an upload with srcset, sizes, intrinsic size and lazy loading.
+
+    Extra keyword arguments become attributes (class_ for class).
+    """
+    name = _blob_name(value)
+    meta = variant_meta(name) if name else None
+    tag = {'src': upload_url(value, width), 'alt': alt, 'loading': 'lazy', 'decoding': 'async'}
+    if meta and is_lite():
+        # The thumbnail only, whatever the screen
+        tag['width'] = min(meta['width'], LITE_IMAGE_WIDTH)
+        tag['height'] = round(meta['height'] * tag['width'] / meta['width'])
+    elif meta:
+        tag['srcset'] = ', '.join(f"{url_for('media.uploaded_file', filename=name, w=w)} {w}w"
+                                  for w in meta['widths'])
+        tag['sizes'] = sizes
+        # Lets the browser reserve the right box before the image arrives
+        tag['width'] = meta['width']
+        tag['height'] = meta['height']
+    tag.update({key.rstrip('_'): value for key, value in attrs.items()})
+    return Markup('<img %s>' % ' '.join(f'{key}="{escape(value)}"' for key, value in tag.items()))
+
+
+def register_image_helpers(app):
+    app.add_template_global(upload_img)
+    app.add_template_global(upload_url)
+    blobstore.STORE_HOOKS.append(queue_variants)
+
+
+def build_missing_variants():
+    """Render variants for every stored image blob that has none; returns how many were queued"""
+    futures = []
+    for name in blobstore.iter_blobs():
+        if is_image(name) and variant_meta(name) is None:
+            future = queue_variants(name)
+            if future is not None:
+                futures.append(future)
+    for future in futures:
+        future.exception()  # wait
+    return len(futures)
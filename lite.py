@@ -0,0 +1,88 @@
+"""Lite mode: lighter pages for slow connections and old devices.
+
+Each request is lite or not, decided once (is_lite()):
+
+- the visitor's own choice first: the LITE_COOKIE cookie, 'on' or 'off',
+  set by the "Lite version" / "Full version" link in base.html
+  (/lite, routes/lite.py)
+- otherwise the browser's client hints: `Save-Data: on`, or an effective
+  connection type (`ECT`) of slow-2g or 2g. HTML responses ask for ECT
+  with Accept-CH and vary on the hints and the cookie
+
+Templates check lite_mode(). In lite mode:
+
+- base.html loads no scripts (site bundle, Bootstrap JS, translator,
+  chatbot, service worker) and no icon fonts; lite.css opens the tabs,
+  dropdowns and collapsed parts Bootstrap JS would have toggled
+- upload_img() / upload_url() send one LITE_IMAGE_WIDTH thumbnail and no srcset
+- long lists come LITE_PAGE_SIZE at a time with older/newer links:
+  paginate(items) in the view, {% include 'lite_pager.html' %} under the list
+- the chat page is a plain HTML conversation with a form, no Socket.IO
+- cached fragments and anonymous pages are cached per mode
+"""
+from flask import g, has_request_context, request, url_for
+
+LITE_COOKIE = 'lite'
+LITE_COOKIE_AGE = 365 * 24 * 3600
+SLOW_ECT = {'slow-2g', '2g'}
+LITE_PAGE_SIZE = 10  # cards, posts, contacts or messages per page
+LITE_IMAGE_WIDTH = 320  # the one width images are sent at
+
+# Benchmarks flip this to measure the full pages only
+ENABLED = True
+
+
+def is_lite():
+    """Whether this request gets lite pages (False outside a request)"""
+    if not ENABLED or not has_request_context():
+        return False
+    if 'lite' not in g:
+        choice = request.cookies.get(LITE_COOKIE)
+        if choice in ('on', 'off'):
+            g.lite = choice == 'on'
+        else:
+            g.lite = (request.headers.get('Save-Data', '').strip().lower() == 'on'
+                      or request.headers.get('ECT', '').strip().lower() in SLOW_ECT)
+    return g.lite
+
+
+# --- PAGINATION ---
+class Pager:
+    """Where one page of a lite list sits, for lite_pager.html"""
+
+    def __init__(self, number, has_next):
+        self.number = number
+        self.has_next = has_next
+        self.has_prev = number > 1
+
+    def url(self, number):
+        args = {key: value for key, value in request.args.items() if key != 'page'}
+        return url_for(request.endpoint, **(request.view_args or {}), **args, page=number)
+
+
+def paginate(items, per_page=LITE_PAGE_SIZE):
+    """(items, pager): the ?page of a list or query in lite mode, else (items, None)"""
+    if not is_lite():
+        return items, None
+    number = max(1, request.args.get('page', 1, type=int))
+    start = (number - 1) * per_page
+    if hasattr(items, 'offset'):
+        # A query: one row past the page tells whether there is another
+        has_next = items.offset(start + per_page).limit(1).count() > 0
+        return items.offset(start).limit(per_page), Pager(number, has_next)
+    return items[start:start + per_page], Pager(number, len(items) > start + per_page)
+
+
+# --- HOOKS ---
+def add_lite_headers(response):
+    """after_request hook: ask for the connection hint and vary pages on the mode's inputs"""
+    if ENABLED and response.mimetype == 'text/html':
+        response.headers['Accept-CH'] = 'ECT, Save-Data'
+        for header in ('Save-Data', 'ECT', 'Cookie'):
+            response.vary.add(header)
+    return response
+
+
+def register_lite(app):
+    app.add_template_global(is_lite, 'lite_mode')
+    app.after_request(add_lite_headers)
@@ -4,6 +4,8 @@ from datetime import datetime, date, time
 from werkzeug.security import generate_password_hash, check_password_hash
 import pytz
 
+from offload import run_blocking
+
 db = SQLAlchemy()
 
 # Singapore timezone constant
@@ -53,11 +55,12 @@ class User(UserMixin, db.Model):
     # --- PASSWORD LOGIC (The Fix) ---
     
     # This is the function your app.py is calling!
+    # Hashing is deliberately slow, so it runs off the eventlet hub
     def set_password(self, password):
-        self._password_hash = generate_password_hash(password)
+        self._password_hash = run_blocking(generate_password_hash, password)
 
     def check_password(self, password):
-        return check_password_hash(self._password_hash, password)
+        return run_blocking(check_password_hash, self._password_hash, password)
 
     # (Optional) Property setter if you want to use new_user.password = 'xyz'
     @property
@@ -66,7 +69,7 @@ class User(UserMixin, db.Model):
 
     @password.setter
     def password(self, password):
-        self._password_hash = generate_password_hash(password)
+        self.set_password(password)
 
     # --- HELPER METHODS ---
     def is_friend(self, user):
@@ -134,6 +137,39 @@ class Story(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     author = db.relationship('User', backref='stories')
 
+    # Timelines read a set of authors newest-first
+    __table_args__ = (
+        db.Index('ix_story_user_timestamp', 'user_id', 'timestamp'),
+    )
+
+    def to_dict(self, author_name=None, comments=None):
+        """Convert story to the dictionary shape the story templates use
+
+        Pass author_name / comments when they were batch-loaded to avoid a
+        lazy load per story on list pages.
+        """
+        if author_name is None:
+            author_name = self.author.username if self.author else ''
+        if comments is None:
+            comments = [{'author': c.author, 'text': c.text} for c in self.comments]
+        shown_date = self.date or (self.timestamp.date() if self.timestamp else None)
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'date': shown_date.strftime('%Y-%m-%d') if shown_date else '',
+            'media': [m for m in (self.media or '').split(',') if m],
+            'tags': [t for t in (self.tags or '').split(',') if t],
+            'privacy': self.privacy,
+            'likes': self.likes or 0,
+            'comments': comments,
+            'saved': bool(self.saved),
+            'reported': bool(self.reported),
+            'voice': self.voice_recording,
+            'author': author_name,
+            'user_id': self.user_id
+        }
+
 class StoryComment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     story_id = db.Column(db.Integer, db.ForeignKey('story.id'), nullable=False)
@@ -183,6 +219,10 @@ class CommunityMember(db.Model):
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     role = db.Column(db.String(20), default='member')  # 'admin', 'member'
 
+    __table_args__ = (
+        db.Index('ix_community_member_user', 'user_id', 'community_id'),
+    )
+
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
@@ -192,6 +232,11 @@ class Post(db.Model):
     community_id = db.Column(db.Integer, db.ForeignKey('community.id'), nullable=False)
     
     author = db.relationship('User', backref='posts')
+
+    # Feed reads posts per community newest-first
+    __table_args__ = (
+        db.Index('ix_post_community_created', 'community_id', 'created_at'),
+    )
     
     @property
     def like_count(self):
@@ -250,7 +295,16 @@ class Message(db.Model):
     # Relationships
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_messages')
     receiver = db.relationship('User', foreign_keys=[receiver_id], backref='received_messages')
-    
+
+    # Conversations are read by (sender, receiver) pair; unread badges by receiver.
+    # AUTOINCREMENT: ids only grow, even after the newest message is deleted, as
+    # chat sync and the history ETags use the max id as a watermark (routes/chat.py)
+    __table_args__ = (
+        db.Index('ix_message_sender_receiver', 'sender_id', 'receiver_id'),
+        db.Index('ix_message_receiver_read', 'receiver_id', 'is_read'),
+        {'sqlite_autoincrement': True},
+    )
+
     def to_dict(self):
         """Convert message to dictionary for JSON serialization
         
@@ -287,4 +341,22 @@ class Message(db.Model):
         }
     
     def __repr__(self):
-        return f'<Message {self.id}: {self.sender_id} -> {self.receiver_id}>'
\ No newline at end of file
+        return f'<Message {self.id}: {self.sender_id} -> {self.receiver_id}>'
+
+
+class MessageTombstone(db.Model):
+    """A deleted Message, kept so chat caches drop it on their next sync (/chat/sync)"""
+    id = db.Column(db.Integer, primary_key=True)  # the sync watermark: only grows
+    message_id = db.Column(db.Integer, nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_message_tombstone_sender_receiver', 'sender_id', 'receiver_id'),
+        {'sqlite_autoincrement': True},
+    )
+
+    @classmethod
+    def of(cls, message):
+        return cls(message_id=message.id, sender_id=message.sender_id, receiver_id=message.receiver_id)
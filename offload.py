@@ -0,0 +1,83 @@
+"""Run blocking work off the eventlet hub.
+
+The Procfile runs a single eventlet worker, so every HTTP request and every
+Socket.IO connection shares one OS thread. CPU-heavy or disk-bound calls
+(password hashing, saving and deleting uploads) would stall all of them
+while they run. run_blocking() hands such calls to eventlet's native thread
+pool when it is called from a green thread, and simply calls them inline
+everywhere else (flask CLI, threading mode, scripts).
+
+offload_engine() does the same for a SQLAlchemy engine: the DBAPI
+connection is wrapped in a tpool.Proxy, so every execute/fetch/commit runs
+in the thread pool while other green threads keep being served.
+
+eventlet is optional: without it every call runs inline.
+"""
+import os
+
+from sqlalchemy import event
+
+try:
+    from eventlet import patcher, tpool
+    from eventlet.greenthread import getcurrent
+except ImportError:
+    tpool = None
+
+# Benchmarks flip this to compare against the inline behaviour
+ENABLED = True
+
+
+def _on_hub():
+    """True when called from a green thread scheduled by the eventlet hub"""
+    return tpool is not None and getcurrent().parent is not None
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Call fn(*args, **kwargs) without blocking other green threads"""
+    if ENABLED and _on_hub():
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+# --- FILE HELPERS ---
+def save_upload(file, path):
+    """Write an uploaded FileStorage to disk"""
+    run_blocking(file.save, path)
+
+
+def _remove_all(paths):
+    removed = []
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+                removed.append(path)
+        except OSError as e:
+            print(f"Error deleting file {path}: {e}")
+    return removed
+
+
+def remove_files(paths):
+    """Delete files that exist in one offloaded batch, returning the removed paths"""
+    paths = [p for p in paths if p]
+    if not paths:
+        return []
+    return run_blocking(_remove_all, paths)
+
+
+# --- DATABASE ---
+def _tpooled_connect(dialect, conn_rec, cargs, cparams):
+    conn = tpool.execute(dialect.loaded_dbapi.connect, *cargs, **cparams)
+    # Cursors returned by the connection are proxied too, so fetches also run in the pool
+    return tpool.Proxy(conn, autowrap_names=('cursor', 'execute'))
+
+
+def offload_engine(engine):
+    """Route every DBAPI call on engine through the thread pool.
+
+    Only applies inside a monkey-patched eventlet process; returns whether it did.
+    """
+    if tpool is None or not patcher.is_monkey_patched('thread'):
+        return False
+    event.listen(engine, 'do_connect', _tpooled_connect)
+    return True
@@ -0,0 +1,130 @@
+"""Full-page cache for anonymous visitors on public pages.
+
+Event browse and event details are reachable without logging in and are
+the pages shared on social media, so a popular link brings a burst of
+visitors who all get the same anonymous render. @anonymous_page keeps
+that render in fragments.listing_cache:
+
+- only GET/HEAD requests from visitors who are not logged in and have no
+  flashed message waiting; logged-in users always get the live page
+- keyed on the path and the query string with tracking parameters
+  (utm_*, fbclid, ...) and empty values dropped and the rest sorted, so
+  every click on a shared link is the same entry; lite mode (lite.py)
+  pages are kept apart from full ones
+- fresh for PAGE_TTL seconds; for PAGE_STALE seconds after that the old
+  copy is still served while one background task renders a new one
+- tagged like the listing caches, so the invalidate() calls event writes
+  already make purge the page at once (a purged page is never served stale)
+- X-Cache: HIT / STALE / MISS on every response it handles
+"""
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, current_app, g, request, session
+from flask_login import current_user
+
+from extensions import socketio
+from fragments import MISS, listing_cache
+from lite import is_lite
+
+PAGE_TTL = 30  # seconds a page is served without re-rendering
+PAGE_STALE = 300  # seconds after that it is served while a new copy renders
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid', 'ref', 'source'}
+
+# Benchmarks flip this to measure uncached pages
+ENABLED = True
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def normalized_query(args):
+    """The query string without tracking parameters or empty values, sorted"""
+    pairs = sorted(
+        (key, value.strip()) for key, values in args.lists() for value in values
+        if value.strip() and key not in TRACKING_PARAMS and not key.startswith('utm_')
+    )
+    return urlencode(pairs)
+
+
+def _cacheable():
+    if not ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    return not current_user.is_authenticated and '_flashes' not in session
+
+
+def _from_entry(entry, state):
+    stored_at, status, mimetype, body = entry
+    response = Response(body, status=status, mimetype=mimetype)
+    response.headers['X-Cache'] = state
+    response.headers['Age'] = str(int(time.time() - stored_at))
+    return response
+
+
+def _render(key, tags, ttl, view, kwargs):
+    """Run the view and store its response when it is safe to share"""
+    versions = listing_cache.versions(tags)  # before rendering, so a concurrent write wins
+    response = current_app.make_response(view(**kwargs))
+    if response.status_code == 200 and not response.is_streamed and not session.modified:
+        entry = (time.time(), response.status_code, response.mimetype, response.get_data())
+        listing_cache.put(key, versions, entry, ttl)
+    return response
+
+
+def _refresh(app, url_root, path, query, key, tags, ttl, view, kwargs):
+    try:
+        with app.test_request_context(path, base_url=url_root, query_string=query):
+            g.lite = key[3]  # the copy being replaced was rendered in this mode
+            _render(key, tags, ttl, view, kwargs)
+    except Exception as e:
+        print(f"Error refreshing cached page {path}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+
+def _refresh_in_background(key, tags, ttl, view, kwargs):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    socketio.start_background_task(_refresh, current_app._get_current_object(), request.url_root,
+                                   request.path, key[2], key, tags, ttl, view, kwargs)
+
+
+def anonymous_page(tags, ttl=PAGE_TTL, stale=PAGE_STALE):
+    """Cache a view's page for anonymous visitors.
+
+    tags is a list, or a function of the view's arguments returning one:
+
+        @anonymous_page(lambda event_id: [f'event:{event_id}'])
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not _cacheable():
+                return view(**kwargs)
+            key = ('page', request.path, normalized_query(request.args), is_lite())
+            page_tags = list(tags(**kwargs) if callable(tags) else tags)
+            try:
+                entry = listing_cache.get(key)
+            except Exception as e:
+                print(f"Error reading cached page {request.path}: {e}")
+                return view(**kwargs)
+
+            if entry is not MISS:
+                age = time.time() - entry[0]
+                if age < ttl:
+                    return _from_entry(entry, 'HIT')
+                if age < ttl + stale:
+                    _refresh_in_background(key, page_tags, ttl + stale, view, kwargs)
+                    return _from_entry(entry, 'STALE')
+
+            response = _render(key, page_tags, ttl + stale, view, kwargs)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
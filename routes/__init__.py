@@ -0,0 +1,13 @@
+"""Blueprint registration.
+
+Route modules are imported here, inside register_blueprints(), rather than
+at package import, so importing the package stays cheap and each app built
+by create_app() gets the same blueprint objects.
+"""
+
+
+def register_blueprints(app):
+    from routes import auth, events, stories, communities, chat, chatbot, media, uploads, pwa, lite
+
+    for module in (auth, events, stories, communities, chat, chatbot, media, uploads, pwa, lite):
+        app.register_blueprint(module.bp)
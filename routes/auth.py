@@ -0,0 +1,417 @@
+"""Account, profile and friendship routes"""
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, make_response
+from flask_login import login_required, current_user, login_user, logout_user
+from werkzeug.utils import secure_filename
+
+from models import db, User, Notification, Hobby, Interest
+from vocab import set_user_vocab
+from identity import invalidate_user, get_hobby_names, get_interest_names
+from blobstore import store_blob, release
+from avatars import BUILTIN_AVATARS, is_valid_profile_pic
+from timeline import invalidate_friendship
+from fragments import remember, invalidate, snapshot
+
+bp = Blueprint('auth', __name__)
+
+# --- HELPER: Get Current User (Legacy Support) ---
+# You can now use 'current_user' directly, but keeping this for your existing code
+def get_current_user():
+    if current_user.is_authenticated:
+        return current_user
+    return None
+
+@bp.route('/')
+def home():
+    return render_template('home.html', user=current_user)
+
+@bp.route('/auth', methods=['GET', 'POST'])
+def auth():
+    if current_user.is_authenticated:
+        return redirect(url_for('auth.home'))
+
+    if request.method == 'POST':
+        action = request.form.get('action')
+        
+        # --- REGISTER ---
+        if action == 'register':
+            username = request.form.get('username')
+            email = request.form.get('email')
+            password = request.form.get('password')
+            
+            if User.query.filter_by(email=email).first():
+                flash('Email already exists.', 'danger')
+            elif User.query.filter_by(username=username).first():
+                flash('Username already taken.', 'danger')
+            else:
+                new_user = User(username=username, email=email)
+                new_user.set_password(password)
+                db.session.add(new_user)
+                db.session.commit()
+                
+                login_user(new_user, remember=False) # Auto login after register
+                flash(f'Welcome, {username}!', 'success')
+                return redirect(url_for('auth.home'))
+
+        # --- LOGIN ---
+        elif action == 'login':
+            email = request.form.get('email')
+            password = request.form.get('password')
+            remember = request.form.get('remember') == 'on'
+            user = User.query.filter_by(email=email).first()
+            
+            if user and user.check_password(password):
+                login_user(user, remember=remember) # Use remember checkbox value
+                flash('Welcome back!', 'success')
+                return redirect(url_for('auth.home'))
+            else:
+                flash('Login Failed. Check email or password.', 'danger')
+
+    return render_template('auth.html')
+
+def signed_out(response):
+    """Every response that signs a user out: the browser drops its HTTP cache and
+    site storage (the service worker's saved pages, the chat IndexedDB), so the
+    next person on the device doesn't see them. Clear-Site-Data needs HTTPS or
+    localhost; the service worker also clears its caches on /logout."""
+    response.headers['Clear-Site-Data'] = '"cache", "storage"'
+    return response
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return signed_out(redirect(url_for('auth.home')))
+
+
+
+@bp.route('/add_friend_by_id', methods=['POST'])
+@login_required
+def add_friend_by_id():
+    target_id = request.form.get('friend_id')
+    
+    if not target_id or not target_id.isdigit():
+        flash('Please enter a valid numeric ID.', 'danger')
+        return redirect(url_for('auth.profile'))
+        
+    friend = User.query.get(int(target_id))
+    
+    if not friend:
+        flash('User not found. Check the ID and try again.', 'danger')
+    elif friend.id == current_user.id:
+        flash('You cannot add yourself!', 'warning')
+    elif current_user.is_friend(friend):
+        flash(f'You are already connected with {friend.username}.', 'info')
+    else:
+        current_user.add_friend(friend)
+        notif = Notification(message=f"{current_user.username} added you via ID!", user_id=friend.id)
+        db.session.add(notif)
+        db.session.commit()
+        invalidate_friendship(current_user.id, friend.id)
+        invalidate(f'notifications:{friend.id}')
+        flash(f'Success! You are now connected with {friend.username}.', 'success')
+        
+    return redirect(url_for('auth.profile'))
+
+@bp.route('/connect/<int:user_id>')
+@login_required
+def connect_user(user_id):
+    user_to_add = User.query.get_or_404(user_id)
+    
+    if current_user == user_to_add:
+        flash('You cannot connect with yourself!', 'warning')
+    elif current_user.is_friend(user_to_add):
+        flash(f'You are already connected with {user_to_add.username}.', 'info')
+    else:
+        current_user.add_friend(user_to_add)
+        msg = f"{current_user.username} started following you!"
+        notif = Notification(message=msg, user_id=user_to_add.id)
+        db.session.add(notif)
+        db.session.commit()
+        invalidate_friendship(current_user.id, user_to_add.id)
+        invalidate(f'notifications:{user_to_add.id}')
+        flash(f'You are now connected with {user_to_add.username}!', 'success')
+        
+    return redirect(url_for('communities.community'))
+
+@bp.route('/disconnect/<int:user_id>')
+@login_required
+def disconnect_user(user_id):
+    user_to_remove = User.query.get_or_404(user_id)
+    current_user.remove_friend(user_to_remove)
+    db.session.commit()
+    invalidate_friendship(current_user.id, user_to_remove.id)
+    flash(f'Disconnected from {user_to_remove.username}.', 'info')
+    return redirect(url_for('communities.community'))
+
+@bp.route('/remove_friend/<int:friend_id>', methods=['POST'])
+@login_required
+def remove_friend(friend_id):
+    """Remove a friend"""
+    try:
+        # Get the friend user
+        friend = User.query.get(friend_id)
+        
+        if not friend:
+            return jsonify({'success': False, 'error': 'User not found'}), 404
+        
+        # Check if they are friends
+        if not current_user.is_friend(friend):
+            return jsonify({'success': False, 'error': 'Not friends'}), 400
+        
+        # Remove friendship (this should handle bidirectional removal)
+        current_user.remove_friend(friend)
+        db.session.commit()
+        invalidate_friendship(current_user.id, friend.id)
+        
+        return jsonify({'success': True}), 200
+        
+    except Exception as e:
+        print(f"Error removing friend: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/notifications')
+@login_required
+def notifications():
+    user_id = current_user.id
+    notifs = remember(('notifications', user_id), [f'notifications:{user_id}'], lambda: [
+        snapshot(n) for n in Notification.query.filter_by(user_id=user_id).order_by(Notification.timestamp.desc()).all()
+    ])
+    return render_template('notifications.html', notifications=notifs, user=current_user)
+
+@bp.route('/profile')
+@login_required
+def profile():
+    return render_template('profile.html', user=current_user,
+                           user_interest_names=get_interest_names(current_user.id),
+                           hobby_names=get_hobby_names(current_user.id))
+
+@bp.route('/forgot_password')
+def forgot_password():
+    return render_template('forgot_password.html', user=None)
+
+@bp.route('/update_color', methods=['POST'])
+@login_required
+def update_color():
+    color = request.form.get('color')
+    if color:
+        current_user.background_color = color
+        db.session.commit()
+        invalidate_user(current_user.id)
+        flash('Background color updated!', 'success')
+    
+    return redirect(url_for('auth.profile'))
+
+
+# --- HOBBIES & INTERESTS ROUTES ---
+
+@bp.route('/hobbies')
+@login_required
+def hobbies():
+    return render_template('hobbies.html', user=current_user)
+
+@bp.route('/save_hobbies', methods=['POST'])
+@login_required
+def save_hobbies():
+    selected_names = request.form.getlist('hobbies')
+    other_hobby = request.form.get('other_hobby') 
+    
+    if other_hobby:
+        other_hobby = other_hobby.strip().title()
+        if other_hobby:
+            selected_names.append(other_hobby)
+
+    # Resolves every name at once and creates the "other" hobby in the same transaction
+    set_user_vocab(current_user._get_current_object(), Hobby, selected_names)
+    db.session.commit()
+    flash('Hobbies updated!', 'success')
+    return redirect(url_for('auth.profile'))
+
+# --- CHANGE USERNAME ROUTES ---
+@bp.route('/change_username', methods=['GET', 'POST'])
+@login_required
+def change_username():
+    if request.method == 'POST':
+        new_username = request.form.get('new_username')
+        if User.query.filter_by(username=new_username).first():
+            flash('This username is already taken.', 'danger')
+        else:
+            current_user.username = new_username
+            db.session.commit()
+            invalidate_user(current_user.id)
+            invalidate('stories', f'user:{current_user.id}')  # author names on story cards
+            return render_template('success_action.html', 
+                                   message="Username Updated!", 
+                                   sub_message="Your new username is set.",
+                                   btn_text="Back to Profile",
+                                   redirect_url=url_for('auth.profile'))
+
+    return render_template('change_username.html', user=current_user)
+
+# --- CHANGE EMAIL ROUTES ---
+@bp.route('/change_email', methods=['GET', 'POST'])
+@login_required
+def change_email():
+    if request.method == 'POST':
+        new_email = request.form.get('new_email')
+        if User.query.filter_by(email=new_email).first():
+            flash('This email is already in use.', 'danger')
+        else:
+            current_user.email = new_email
+            db.session.commit()
+            invalidate_user(current_user.id)
+            return render_template('success_action.html', 
+                                   message="Email Updated!", 
+                                   sub_message="Your email has been changed.",
+                                   btn_text="Back to Profile",
+                                   redirect_url=url_for('auth.profile'))
+
+    return render_template('change_email.html', user=current_user)
+
+@bp.route('/update_profile', methods=['POST'])
+@login_required
+def update_profile():
+    # 1. Update DOB
+    d = request.form.get('dob_d')
+    m = request.form.get('dob_m')
+    y = request.form.get('dob_y')
+    if d and m and y:
+        current_user.dob = f"{d}-{m}-{y}"
+
+    # 2. Update Interests
+    selected_interests_str = request.form.get('selected_interests')
+    if selected_interests_str is not None: 
+        interest_names = selected_interests_str.split(',') if selected_interests_str else []
+        set_user_vocab(current_user._get_current_object(), Interest, interest_names)
+
+    try:
+        db.session.commit()
+        invalidate_user(current_user.id)
+        flash('Profile updated successfully!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error updating profile: {e}', 'error')
+
+    return redirect(url_for('auth.profile'))
+
+
+@bp.route('/choose_profile_pic', methods=['GET', 'POST'])
+@login_required
+def choose_profile_pic():
+    if request.method == 'POST':
+        selected_avatar = request.form.get('avatar')
+        if selected_avatar and is_valid_profile_pic(selected_avatar):
+            current_user.profile_pic = selected_avatar
+            db.session.commit()
+            invalidate_user(current_user.id)
+            # Success Page
+            return render_template('success_action.html', 
+                                   message="SUCCESS!", 
+                                   sub_message="Your Profile Picture has been saved",
+                                   btn_text="MyProfile",
+                                   redirect_url=url_for('auth.profile'))
+
+    return render_template('choose_profile_pic.html', user=current_user, avatars=BUILTIN_AVATARS)
+
+
+@bp.route('/upload_profile_pic', methods=['POST'])
+@login_required
+def upload_profile_pic():
+    if 'file' not in request.files:
+        flash('No file part', 'error')
+        return redirect(url_for('auth.choose_profile_pic'))
+    
+    file = request.files['file']
+    if file.filename == '':
+        flash('No selected file', 'error')
+        return redirect(url_for('auth.choose_profile_pic'))
+
+    if file:
+        filename = secure_filename(file.filename)
+        old_pic = current_user.profile_pic
+        current_user.profile_pic = f"/css/uploads/{store_blob(file, filename)}"
+        db.session.commit()
+        invalidate_user(current_user.id)
+        release([old_pic])
+        
+        flash('Profile picture uploaded!', 'success')
+        return redirect(url_for('auth.profile'))
+
+    return redirect(url_for('auth.choose_profile_pic'))
+
+
+@bp.route('/update_profile_pic', methods=['POST'])
+@login_required
+def update_profile_pic():
+    avatar_url = request.form.get('avatar_url')
+    if avatar_url and not is_valid_profile_pic(avatar_url):
+        # Only the suggested pictures or an upload; /avatar reads whatever is stored here
+        flash('Please choose one of the suggested pictures or upload a photo.', 'error')
+        return redirect(url_for('auth.choose_profile_pic'))
+    if avatar_url:
+        old_pic = current_user.profile_pic
+        current_user.profile_pic = avatar_url
+        db.session.commit()
+        invalidate_user(current_user.id)
+        release([old_pic])
+        flash('Avatar updated!', 'success')
+    return redirect(url_for('auth.profile'))
+
+@bp.route('/remove_profile_pic')
+@login_required
+def remove_profile_pic():
+    # Back to the default; /avatar draws their initials
+    old_pic = current_user.profile_pic
+    current_user.profile_pic = 'default.png'
+    db.session.commit()
+    invalidate_user(current_user.id)
+    release([old_pic])
+    
+    flash('Profile picture removed.', 'info')
+    return redirect(url_for('auth.profile'))
+
+
+@bp.route('/delete_account', methods=['GET', 'POST'])
+@login_required
+def delete_account():
+    if request.method == 'POST':
+        user_id = current_user.id
+        db.session.delete(current_user)
+        db.session.commit()
+        invalidate_user(user_id)
+        invalidate('stories', f'user:{user_id}', f'notifications:{user_id}')
+        logout_user()
+        return signed_out(make_response(render_template('success_action.html', 
+                               message="Successfully Deleted!", 
+                               sub_message="You have deleted your account you may go back to Homepage",
+                               btn_text="Homepage",
+                               redirect_url=url_for('auth.home'))))
+
+    return render_template('delete_account.html', user=current_user)
+
+@bp.route('/settings')
+def settings():
+    return render_template('base.html')
+
+@bp.route('/users/<int:user_id>/add-friend', methods=['POST'])
+@login_required
+def add_friend(user_id):
+    """Add a user as friend"""
+    if user_id == current_user.id:
+        return jsonify({'error': 'Cannot add yourself'}), 400
+        
+    # Check if already friends
+    friend = User.query.get(user_id)
+    if friend and current_user.is_friend(friend):
+        return jsonify({'status': 'already_friends'})
+    
+    # Add friend
+    if friend:
+        current_user.add_friend(friend)
+        db.session.commit()
+        invalidate_friendship(current_user.id, friend.id)
+        return jsonify({'status': 'success'})
+    
+    return jsonify({'error': 'User not found'}), 404
@@ -0,0 +1,642 @@
+"""One-on-one chat: pages, JSON endpoints and Socket.IO handlers"""
+from datetime import datetime
+
+import pytz
+from flask import Blueprint, render_template, redirect, request, jsonify, session, url_for
+from flask_login import login_required, current_user
+from flask_socketio import emit, join_room
+from werkzeug.utils import secure_filename
+
+from extensions import socketio
+from models import db, ChatMessage, Message, MessageTombstone, User, connections
+from db_scope import scoped_event
+from chunked_upload import UploadError, claim_upload, upload_size
+from blobstore import store_blob, release
+from conditional import CACHE_CONTROL, conditional_json, watermark_etag
+from streaming import rows, stream_page
+from avatars import avatar_url
+from identity import get_friend_ids
+from lite import LITE_PAGE_SIZE, is_lite, paginate
+
+bp = Blueprint('chat', __name__)
+
+HISTORY_PAGE = 50  # messages per history page
+MAX_HISTORY_PAGE = 200
+LOCAL_TZ = pytz.timezone('Asia/Singapore')  # chat.js shows times in SST too
+
+# Online users: {user_id: socket_id}
+active_users = {}
+
+@bp.route('/chat')
+@login_required
+def chat():
+    messages = ChatMessage.query.order_by(ChatMessage.timestamp.desc()).limit(50).all()
+    messages = messages[::-1]
+    return render_template('chat.html', user=current_user, messages=messages)
+
+@bp.route('/chat/messaging')
+@login_required
+def chat_messaging():
+    """Real-time chat messaging page - Only show friends"""
+    if is_lite():
+        return lite_chat_page()
+    
+    # Get user's actual friends (not all users), streamed into the contact list
+    all_users = []
+    friends = rows(User.query.join(connections, connections.c.friend_id == User.id)
+                   .filter(connections.c.user_id == current_user.id), prepare=all_users.extend)
+    
+    # For the "new chat" modal, also show only friends: it renders after the
+    # contact list, by which time all_users holds every friend streamed
+    
+    return stream_page('chat.html', user=current_user, friends=friends, all_users=all_users)
+
+def lite_chat_page():
+    """The chat page in lite mode (lite.py): friends with unread counts, or
+    with ?with=<friend id> the latest messages of that chat and a form to
+    reply; ?before=<message id> pages back. Plain HTML, no Socket.IO"""
+    current_user_id = current_user.id
+    friends_query = User.query.join(connections, connections.c.friend_id == User.id) \
+        .filter(connections.c.user_id == current_user_id)
+    peer_id = request.args.get('with', type=int)
+    peer = friends_query.filter(User.id == peer_id).first() if peer_id else None
+
+    if peer is None:
+        friends, pager = paginate(friends_query.order_by(User.username))
+        unread = dict(db.session.query(Message.sender_id, db.func.count(Message.id))
+                      .filter(Message.receiver_id == current_user_id, Message.is_read == False)
+                      .group_by(Message.sender_id).all())
+        return render_template('chat_lite.html', friends=friends.all(), pager=pager, unread=unread,
+                               peer=None, user=current_user)
+
+    _mark_read(current_user_id, peer.id)
+    messages, has_more = history_page(current_user_id, peer.id, request.args.get('before', type=int), LITE_PAGE_SIZE)
+    messages = [dict(msg.to_dict(), sent_at=pytz.utc.localize(msg.timestamp).astimezone(LOCAL_TZ))
+                for msg in messages]
+    db.session.commit()  # the read marks; after serializing, as commit() expires every row
+    return render_template('chat_lite.html', peer=peer, messages=messages, has_more=has_more, user=current_user)
+
+@bp.route('/chat/send/<int:user_id>', methods=['POST'])
+@login_required
+def chat_send(user_id):
+    """Send a message from the lite chat page's form"""
+    text = request.form.get('message', '').strip()
+    if text and user_id in get_friend_ids(current_user.id):
+        message = Message(sender_id=current_user.id, receiver_id=user_id, message=text, timestamp=datetime.utcnow())
+        db.session.add(message)
+        db.session.commit()
+        # Open chat pages on either side hear of it as if it came over the socket
+        message_data = message.to_dict()
+        for room_user in (user_id, current_user.id):
+            if room_user in active_users:
+                socketio.emit('receive_message', message_data, room=f'user_{room_user}')
+    return redirect(url_for('chat.chat_messaging', **{'with': user_id}))
+
+@bp.route('/chat/upload', methods=['POST'])
+@login_required
+def chat_upload_file():
+    """Handle file upload for chat messages"""
+    try:
+        # A finished chunked upload can be sent as upload_id instead of the file
+        try:
+            file = claim_upload(request.form.get('upload_id'), current_user.id, 'chat') or request.files.get('file')
+        except UploadError as e:
+            return jsonify({'success': False, 'error': e.message}), e.status
+
+        # Check if file is in request
+        if file is None:
+            return jsonify({
+                'success': False,
+                'error': 'No file provided'
+            }), 400
+        
+        receiver_id = request.form.get('receiver_id')
+        message_text = request.form.get('message', '')
+        
+        # Check if filename is empty
+        if file.filename == '':
+            return jsonify({
+                'success': False,
+                'error': 'No file selected'
+            }), 400
+        
+        # Validate receiver_id
+        if not receiver_id:
+            return jsonify({
+                'success': False,
+                'error': 'No receiver specified'
+            }), 400
+        
+        # Size limit: PURPOSES['chat'] in chunked_upload.py
+        try:
+            file_size = upload_size(file, 'chat')
+        except UploadError as e:
+            return jsonify({'success': False, 'error': e.message}), e.status
+        
+        # Generate secure filename
+        filename = secure_filename(file.filename)
+        
+        # Save file (identical bytes are only stored once)
+        file_url = f"/css/uploads/{store_blob(file, filename)}"
+        
+        # Create message record in database
+        new_message = Message(
+            sender_id=current_user.id,
+            receiver_id=int(receiver_id),
+            message=message_text if message_text else None,
+            attachment_url=file_url,
+            attachment_name=filename,
+            attachment_type=file.content_type,
+            attachment_size=file_size,
+            timestamp=datetime.utcnow()
+        )
+        
+        db.session.add(new_message)
+        db.session.commit()
+        
+        # Prepare message data for socket emission
+        message_data = new_message.to_dict()
+        
+        # Emit to receiver via Socket.IO
+        if int(receiver_id) in active_users:
+            socketio.emit('receive_message', message_data, room=f'user_{receiver_id}')
+        
+        # Also emit to sender (for multiple devices/tabs)
+        socketio.emit('receive_message', message_data, room=f'user_{current_user.id}')
+        
+        return jsonify({
+            'success': True,
+            'message': message_data
+        }), 200
+        
+    except Exception as e:
+        print(f"ERROR in chat_upload_file: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+@bp.route('/chat/message/<int:message_id>/edit', methods=['PUT'])
+@login_required
+def edit_message(message_id):
+    """Edit a message"""
+    try:
+        # Get the message
+        message = Message.query.get(message_id)
+        
+        if not message:
+            return jsonify({'success': False, 'error': 'Message not found'}), 404
+        
+        # Check if user owns the message
+        if message.sender_id != current_user.id:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+        
+        # Get new message text
+        data = request.get_json()
+        new_text = data.get('message', '').strip()
+        
+        if not new_text:
+            return jsonify({'success': False, 'error': 'Message cannot be empty'}), 400
+        
+        # Cannot edit messages with attachments
+        if message.attachment_url:
+            return jsonify({'success': False, 'error': 'Cannot edit messages with attachments'}), 400
+        
+        # Update message
+        message.message = new_text
+        message.edited = True
+        message.edited_at = datetime.utcnow()
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': {
+                'id': message.id,
+                'message': message.message,
+                'edited': True,
+                'edited_at': message.edited_at.isoformat()
+            }
+        }), 200
+        
+    except Exception as e:
+        print(f"Error editing message: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _conversation(user_id, peer_id):
+    return db.or_(
+        db.and_(Message.sender_id == user_id, Message.receiver_id == peer_id),
+        db.and_(Message.sender_id == peer_id, Message.receiver_id == user_id)
+    )
+
+def history_watermark(user_id, peer_id):
+    """(count, max id, latest edit, read count) of a conversation, and how many
+    of peer's messages are unread, in one aggregate query. Message ids are
+    never reused, so a delete followed by a send still raises the max id"""
+    count, last_id, last_edit, read, unread = db.session.query(
+        db.func.count(Message.id),
+        db.func.max(Message.id),
+        db.func.max(Message.edited_at),
+        db.func.sum(db.case((Message.is_read == True, 1), else_=0)),
+        db.func.sum(db.case((db.and_(Message.sender_id == peer_id, Message.is_read == False), 1), else_=0)),
+    ).filter(_conversation(user_id, peer_id)).one()
+    return (count, last_id, last_edit, read or 0), unread or 0
+
+def _tombstones(user_id, peer_id):
+    return db.or_(
+        db.and_(MessageTombstone.sender_id == user_id, MessageTombstone.receiver_id == peer_id),
+        db.and_(MessageTombstone.sender_id == peer_id, MessageTombstone.receiver_id == user_id)
+    )
+
+def sync_watermark(user_id, peer_id):
+    """Where a cached copy of the conversation is up to: the last message id,
+    the latest edit and the last tombstone id, and how many of peer's
+    messages are unread, in one query. Both ids only grow (AUTOINCREMENT,
+    models.py), so a deleted message's id never comes back as a new message"""
+    last_tombstone = db.select(db.func.max(MessageTombstone.id)).where(_tombstones(user_id, peer_id))
+    last_id, last_edit, unread, deleted = db.session.query(
+        db.func.max(Message.id),
+        db.func.max(Message.edited_at),
+        db.func.sum(db.case((db.and_(Message.sender_id == peer_id, Message.is_read == False), 1), else_=0)),
+        last_tombstone.scalar_subquery(),
+    ).filter(_conversation(user_id, peer_id)).one()
+    watermark = {'after': last_id or 0, 'edited': last_edit.isoformat() if last_edit else None,
+                 'deleted': deleted or 0}
+    return watermark, unread or 0
+
+def history_page(user_id, peer_id, before=None, limit=HISTORY_PAGE):
+    """The limit latest messages (older than id before), oldest first, and
+    whether there are older ones still"""
+    query = Message.query.filter(_conversation(user_id, peer_id))
+    if before:
+        query = query.filter(Message.id < before)
+    messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    return messages[:limit][::-1], len(messages) > limit
+
+def _mark_read(user_id, peer_id):
+    Message.query.filter(
+        Message.sender_id == peer_id,
+        Message.receiver_id == user_id,
+        Message.is_read == False
+    ).update({'is_read': True})
+
+@bp.route('/chat/history/<int:user_id>')
+@login_required
+def chat_history(user_id):
+    """Get chat history between current user and specified user.
+
+    ?limit=N returns the latest N messages (older than ?before=<message id>)
+    with has_more; without it the whole history comes back.
+    """
+    current_user_id = current_user.id
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', type=int)
+
+    def load():
+        if limit:
+            messages, has_more = history_page(current_user_id, user_id, before, min(limit, MAX_HISTORY_PAGE))
+            return {'messages': [msg.to_dict() for msg in messages], 'has_more': has_more}
+        messages = Message.query.filter(_conversation(current_user_id, user_id)) \
+            .order_by(Message.timestamp.asc()).all()
+        return {'messages': [msg.to_dict() for msg in messages]}
+
+    scope = ('history', current_user_id, user_id, before, limit)
+    watermark, unread = history_watermark(current_user_id, user_id)
+    if not unread:
+        # Nothing to mark read: answer 304 before loading a single row
+        return conditional_json(watermark_etag(*scope, *watermark), load)
+
+    _mark_read(current_user_id, user_id)
+    # Serialize and take the watermark inside the transaction, so they agree
+    # with each other and commit() does not expire every row first
+    payload = load()
+    watermark, _ = history_watermark(current_user_id, user_id)
+    db.session.commit()
+
+    response = jsonify(payload)
+    response.set_etag(watermark_etag(*scope, *watermark))
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+@bp.route('/chat/unread-count')
+@login_required
+def unread_count():
+    """Get unread message counts"""
+    unread = db.and_(Message.receiver_id == current_user.id, Message.is_read == False)
+    # The unread set only grows by new (higher, never reused) ids and shrinks
+    # by rows leaving it, so its size and max id change whenever it does
+    total, last_id = db.session.query(db.func.count(Message.id), db.func.max(Message.id)).filter(unread).one()
+
+    def counts():
+        rows = db.session.query(Message.sender_id, db.func.count(Message.id)).filter(unread) \
+            .group_by(Message.sender_id).all()
+        return {'counts': {str(sender_id): n for sender_id, n in rows}, 'total': total}
+
+    return conditional_json(watermark_etag('unread', current_user.id, total, last_id), counts)
+
+@bp.route('/chat/sync/<int:user_id>')
+@login_required
+def chat_sync(user_id):
+    """What changed in a conversation since the client's cached copy.
+
+    The client sends the watermark it got last time (?after=<message id>
+    &edited=<edited_at>&deleted=<tombstone id>) and the oldest message it
+    holds (?from=<message id>). It gets back the messages created or edited
+    since, the ids deleted since and the new watermark. Without a watermark,
+    or with more than MAX_HISTORY_PAGE new messages, it gets reset: true and
+    the latest history page to start over from.
+    """
+    current_user_id = current_user.id
+    after = request.args.get('after', type=int)
+    oldest = request.args.get('from', 0, type=int)
+    edited = request.args.get('edited', type=datetime.fromisoformat)
+    deleted = request.args.get('deleted', 0, type=int)
+    # Taken before loading: a change racing this request comes again next time rather than never
+    watermark, unread = sync_watermark(current_user_id, user_id)
+
+    def load():
+        if after is not None:
+            conversation = _conversation(current_user_id, user_id)
+            created = Message.query.filter(conversation, Message.id > after) \
+                .order_by(Message.id).limit(MAX_HISTORY_PAGE + 1).all()
+            if len(created) <= MAX_HISTORY_PAGE:
+                changed = Message.query.filter(conversation, Message.id.between(oldest, after),
+                                               (Message.edited_at > edited) if edited else (Message.edited_at != None))
+                gone = db.session.query(MessageTombstone.message_id) \
+                    .filter(_tombstones(current_user_id, user_id), MessageTombstone.id > deleted)
+                return {'reset': False,
+                        'messages': [msg.to_dict() for msg in sorted(changed.all() + created, key=lambda m: m.id)],
+                        'deleted': [message_id for (message_id,) in gone],
+                        'watermark': watermark}
+        messages, has_more = history_page(current_user_id, user_id)
+        return {'reset': True, 'messages': [msg.to_dict() for msg in messages], 'has_more': has_more,
+                'deleted': [], 'watermark': watermark}
+
+    etag = watermark_etag('sync', current_user_id, user_id, after, oldest, edited, deleted, *watermark.values())
+    if not unread:
+        return conditional_json(etag, load)
+
+    _mark_read(current_user_id, user_id)
+    payload = load()
+    db.session.commit()  # after serializing, as commit() expires every row
+
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+@bp.route('/chat/bootstrap')
+@login_required
+def chat_bootstrap():
+    """Everything the chat page needs to start, in one request however many
+    friends and messages there are: friends, who is online, unread counts and
+    the last message of every conversation (three queries) and, for
+    ?open=<user id>, the latest page of that conversation, marked read, with
+    its sync watermark (three more: the read marks, the page, the watermark)"""
+    current_user_id = current_user.id
+    open_id = request.args.get('open', type=int)
+
+    friends = User.query.join(connections, connections.c.friend_id == User.id) \
+        .filter(connections.c.user_id == current_user_id).all()
+
+    history = None
+    if open_id:
+        _mark_read(current_user_id, open_id)
+        messages, has_more = history_page(current_user_id, open_id)
+        history = {'user_id': open_id, 'messages': [msg.to_dict() for msg in messages], 'has_more': has_more,
+                   'watermark': sync_watermark(current_user_id, open_id)[0]}
+
+    unread = db.session.query(Message.sender_id, db.func.count(Message.id)) \
+        .filter(Message.receiver_id == current_user_id, Message.is_read == False) \
+        .group_by(Message.sender_id).all()
+
+    # Newest message per conversation partner: the newest sent and the newest
+    # received per partner (each an index-only scan), then the later of the two
+    sent = db.select(db.func.max(Message.id)).where(Message.sender_id == current_user_id) \
+        .group_by(Message.receiver_id)
+    received = db.select(db.func.max(Message.id)).where(Message.receiver_id == current_user_id) \
+        .group_by(Message.sender_id)
+    previews = {}
+    for msg in Message.query.filter(Message.id.in_(db.union_all(sent, received))).order_by(Message.id):
+        previews[msg.receiver_id if msg.sender_id == current_user_id else msg.sender_id] = msg
+
+    payload = {
+        'friends': [{'id': f.id, 'username': f.username, 'avatar': avatar_url(f, 64)} for f in friends],
+        'online': [f.id for f in friends if f.id in active_users],
+        'unread': {str(sender_id): n for sender_id, n in unread},
+        'previews': {str(partner_id): msg.to_dict() for partner_id, msg in previews.items()},
+        'history': history,
+    }
+    db.session.commit()  # the read marks; after serializing, as commit() expires every row
+    return jsonify(payload)
+
+# ============================================================
+# MESSAGE DELETE ROUTE
+# ============================================================
+
+@bp.route('/chat/message/<int:message_id>/delete', methods=['DELETE'])
+@login_required
+def delete_message(message_id):
+    """Delete a message"""
+    try:
+        # Get the message
+        message = Message.query.get(message_id)
+        
+        if not message:
+            return jsonify({'success': False, 'error': 'Message not found'}), 404
+        
+        # Check if user owns the message
+        if message.sender_id != current_user.id:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+        
+        # Delete message from database, leaving a tombstone for cached copies
+        attachment_url = message.attachment_url
+        db.session.add(MessageTombstone.of(message))
+        db.session.delete(message)
+        db.session.commit()
+        
+        # Delete the attached file unless another row still uses it
+        for full_path in release([attachment_url], legacy=True):
+            print(f"Deleted file: {full_path}")
+        
+        return jsonify({'success': True}), 200
+        
+    except Exception as e:
+        print(f"Error deleting message: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# ============================================================
+# CLEAR CHAT HISTORY ROUTE
+# ============================================================
+
+@bp.route('/chat/clear/<int:user_id>', methods=['DELETE'])
+@login_required
+def clear_chat_history(user_id):
+    """Clear all messages with a specific user"""
+    try:
+        # Get all messages between current user and specified user
+        messages = Message.query.filter(_conversation(current_user.id, user_id)).all()
+        
+        attachment_urls = [m.attachment_url for m in messages if m.attachment_url]
+        
+        # Delete all messages, leaving tombstones for cached copies
+        db.session.add_all([MessageTombstone.of(m) for m in messages])
+        Message.query.filter(_conversation(current_user.id, user_id)).delete()
+        
+        db.session.commit()
+        
+        # Delete attached files no other row still uses
+        release(attachment_urls, legacy=True)
+        
+        return jsonify({'success': True}), 200
+        
+    except Exception as e:
+        print(f"Error clearing chat: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@socketio.on('send_old_message')
+@scoped_event
+def handle_old_message(data):
+    username = data['username']
+    message_content = data['message']
+    
+    new_msg = ChatMessage(username=username, message=message_content)
+    db.session.add(new_msg)
+    db.session.commit()
+    
+    emit('receive_message', {'username': username, 'message': message_content}, broadcast=True)
+
+@socketio.on('connect')
+@scoped_event
+def handle_connect(auth=None):
+    """Handle client connection"""
+    print(f'Client connected: {request.sid}')
+
+@socketio.on('disconnect')
+@scoped_event
+def handle_disconnect(reason=None):
+    """Handle client disconnection"""
+    print(f'Client disconnected: {request.sid}')
+    for user_id, sid in list(active_users.items()):
+        if sid == request.sid:
+            del active_users[user_id]
+            break
+
+@socketio.on('join')
+@scoped_event
+def handle_join(data):
+    """User joins their personal room"""
+    username = data.get('username')
+    if current_user.is_authenticated:
+        user_id = current_user.id
+        session['user_id'] = user_id  # Store in session for other handlers
+        active_users[user_id] = request.sid
+        join_room(f'user_{user_id}')
+        print(f'User {username} (ID: {user_id}) joined their room')
+
+@socketio.on('send_message')
+@scoped_event
+def handle_send_message_new(data):
+    """Handle sending a message (new chat system)"""
+    try:
+        sender_id = current_user.id if current_user.is_authenticated else session.get('user_id')
+
+        receiver_id = data.get('receiver_id')
+        message_text = data.get('message')
+        
+        if not all([sender_id, receiver_id, message_text]):
+            emit('error', {'message': 'Invalid message data'})
+            return
+        
+        message = Message(
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            message=message_text,
+            timestamp=datetime.utcnow()
+        )
+        db.session.add(message)
+        db.session.commit()
+        
+        # ✅ USE to_dict() instead of manually creating dictionary
+        message_data = message.to_dict()
+        
+        # Send to receiver's room
+        if receiver_id in active_users:
+            socketio.emit('receive_message', message_data, room=f'user_{receiver_id}')
+        
+        # Send to sender (for confirmation)
+        emit('receive_message', message_data)
+        print(f'Message from {sender_id} to {receiver_id}: {message_text}')
+        
+    except Exception as e:
+        print(f'Error sending message: {str(e)}')
+        db.session.rollback()
+        emit('error', {'message': 'Failed to send message'})
+
+@socketio.on('typing')
+@scoped_event
+def handle_typing(data):
+    """Handle typing indicator"""
+    user_id = data.get('user_id')
+    sender_id = current_user.id if current_user.is_authenticated else session.get('user_id')
+    
+    if user_id in active_users:
+        socketio.emit('user_typing', {'user_id': sender_id}, room=f'user_{user_id}')
+
+@socketio.on('stop_typing')
+@scoped_event
+def handle_stop_typing(data):
+    """Handle stop typing indicator"""
+    user_id = data.get('user_id')
+    sender_id = current_user.id if current_user.is_authenticated else session.get('user_id')
+
+    
+    if user_id in active_users:
+        socketio.emit('user_stop_typing', {'user_id': sender_id}, room=f'user_{user_id}')
+@socketio.on('message_edited')
+@scoped_event
+def handle_message_edited(data):
+    """Handle message edited event"""
+    try:
+        message_id = data.get('message_id')
+        new_text = data.get('new_text')
+        receiver_id = data.get('receiver_id')
+        
+        print(f"Message edited: {message_id}, receiver: {receiver_id}")
+        
+        # Emit to receiver
+        if receiver_id in active_users:
+            socketio.emit('message_edited', {
+                'message_id': message_id,
+                'new_text': new_text
+            }, room=f'user_{receiver_id}')
+        
+    except Exception as e:
+        print(f"Error handling message_edited event: {e}")
+
+
+@socketio.on('message_deleted')
+@scoped_event
+def handle_message_deleted(data):
+    """Handle message deleted event"""
+    try:
+        message_id = data.get('message_id')
+        receiver_id = data.get('receiver_id')
+        
+        print(f"Message deleted: {message_id}, receiver: {receiver_id}")
+        
+        # Emit to receiver
+        if receiver_id in active_users:
+            socketio.emit('message_deleted', {
+                'message_id': message_id
+            }, room=f'user_{receiver_id}')
+        
+    except Exception as e:
+        print(f"Error handling message_deleted event: {e}")
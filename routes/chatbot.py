@@ -0,0 +1,42 @@
+"""Rule-based assistant used by the chatbot widget in base.html"""
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+
+bp = Blueprint('chatbot', __name__)
+
+@bp.route('/chatbot', methods=['POST'])
+@login_required
+def chatbot():
+    """Simple rule-based chatbot for assistance"""
+    user_message = request.json.get('message', '')
+    if not user_message:
+        return jsonify({'response': 'Please send a message.'})
+    
+    message_lower = user_message.lower()
+    
+    # Greetings
+    if any(word in message_lower for word in ['hello', 'hi', 'hey', 'greetings']):
+        return jsonify({'response': "Hello! I'm your BridgeGen assistant. How can I help you today? I can help you with communities, events, stories, or answer questions about the platform."})
+    
+    # Community questions
+    if any(word in message_lower for word in ['community', 'communities', 'join', 'find']):
+        return jsonify({'response': "To find communities, go to the Community page and browse. You can search by name or filter by category. Click 'Join' on any community that interests you!"})
+    
+    # Event questions
+    if any(word in message_lower for word in ['event', 'events', 'activities']):
+        return jsonify({'response': "Visit the Events page to browse all events. You can filter by category, search by name, and join events that interest you. Create your own events to connect with others!"})
+    
+    # Story questions
+    if any(word in message_lower for word in ['story', 'stories', 'share']):
+        return jsonify({'response': "Share your stories on the Story page! You can add text, photos, voice recordings, and tags. Your stories help bridge generations and create connections."})
+    
+    # Help
+    if any(word in message_lower for word in ['help', 'assist', 'support', 'how']):
+        return jsonify({'response': "I can help you with: communities, events, stories, navigation, and general questions about BridgeGen. What would you like to know?"})
+    
+    # Features
+    if any(word in message_lower for word in ['feature', 'features', 'what can', 'what does']):
+        return jsonify({'response': "BridgeGen connects youth and elders through communities, events, and stories. You can join communities, attend events, share stories, chat with friends, and build intergenerational connections!"})
+    
+    # Default response
+    return jsonify({'response': "I'm here to help! You can ask me about communities, events, stories, or any questions about using BridgeGen. What would you like to know?"})
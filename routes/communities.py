@@ -0,0 +1,379 @@
+"""Communities, posts and the aggregated feed"""
+from datetime import datetime
+
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+
+from models import db, User, Community, CommunityMember, Post, CommunityComment, PostLike, CommunityEvent
+from feed import get_feed_page, feed_item_to_dict
+from identity import get_friend_ids
+from blobstore import store_blob, release
+from fragments import remember, invalidate, snapshot
+from streaming import rows, stream_page
+from lite import paginate
+
+bp = Blueprint('communities', __name__)
+
+@bp.route('/community')
+@login_required
+def community():
+    """Redirect to communities page"""
+    return redirect(url_for('communities.community_home'))
+
+def browse_communities(search, category):
+    """Communities matching the filters, as cacheable snapshots with member counts"""
+    query = Community.query
+    if search:
+        query = query.filter((Community.name.contains(search)) | (Community.description.contains(search)))
+    if category != 'all':
+        query = query.filter_by(category=category)
+    communities = query.all()
+
+    # One grouped count instead of a member_count query per card
+    counts = dict(db.session.query(CommunityMember.community_id, db.func.count(CommunityMember.id))
+                  .filter(CommunityMember.community_id.in_([c.id for c in communities]))
+                  .group_by(CommunityMember.community_id).all())
+    return [snapshot(c, member_count=counts.get(c.id, 0)) for c in communities]
+
+@bp.route('/communities')
+@login_required
+def community_home():
+    """Browse all communities with search and filter"""
+    search = request.args.get('search', '')
+    category = request.args.get('category', 'all')
+    all_communities = remember(('communities', search, category), ['communities'],
+                               lambda: browse_communities(search, category))
+    
+    # Get user's communities
+    user_memberships = CommunityMember.query.filter_by(user_id=current_user.id).all()
+    user_community_ids = [m.community_id for m in user_memberships]
+    
+    # Split communities
+    my_communities = [c for c in all_communities if c.id in user_community_ids]
+    discover_communities = [c for c in all_communities if c.id not in user_community_ids]
+    discover_communities, pager = paginate(discover_communities)
+    
+    return render_template('community_communities.html',
+                         my_communities=my_communities,
+                         discover_communities=discover_communities,
+                         pager=pager,
+                         search=search,
+                         category=category,
+                         user=current_user)
+
+@bp.route('/communities/<int:community_id>')
+@login_required
+def community_detail(community_id):
+    """View community details with posts, members, and events"""
+    community = Community.query.get_or_404(community_id)
+    is_member = CommunityMember.query.filter_by(
+        user_id=current_user.id,
+        community_id=community_id
+    ).first() is not None
+    is_creator = community.creator_id == current_user.id
+    
+    upcoming_events = CommunityEvent.query.filter_by(community_id=community_id).filter(CommunityEvent.date_time >= datetime.utcnow()).order_by(CommunityEvent.date_time).all()
+    
+    # Posts stream in as the feed renders, a batch at a time, with their
+    # authors, comments and likes loaded per batch rather than per post
+    user_id = current_user.id
+
+    def add_likes(batch):
+        ids = [post.id for post in batch]
+        counts = dict(db.session.query(PostLike.post_id, db.func.count(PostLike.id))
+                      .filter(PostLike.post_id.in_(ids)).group_by(PostLike.post_id).all())
+        liked = {post_id for (post_id,) in db.session.query(PostLike.post_id)
+                 .filter(PostLike.user_id == user_id, PostLike.post_id.in_(ids))}
+        for post in batch:
+            post.like_total = counts.get(post.id, 0)
+            post.user_has_liked = post.id in liked
+
+    posts, pager = paginate(Post.query.filter_by(community_id=community_id)
+                            .options(db.selectinload(Post.author),
+                                     db.selectinload(Post.comments).selectinload(CommunityComment.author))
+                            .order_by(Post.created_at.desc()))
+    posts = rows(posts, prepare=add_likes)
+
+    # Get members
+    memberships = CommunityMember.query.filter_by(community_id=community_id).all()
+    friend_ids = get_friend_ids(current_user.id)
+    members = []
+    users_by_id = {u.id: u for u in User.query.filter(User.id.in_([m.user_id for m in memberships])).all()}
+    for m in memberships:
+        user = users_by_id.get(m.user_id)
+        if not user:
+            continue
+        user.role = m.role
+        # Check friendship status
+        user.is_friend_status = user.id in friend_ids and user.id != current_user.id
+        members.append(user)
+
+    return stream_page('community_community_detail.html',
+                         community=community,
+                         is_member=is_member,
+                         is_creator=is_creator,
+                         upcoming_events=upcoming_events,
+                         posts=posts,
+                         pager=pager,
+                         members=members,
+                         user=current_user)
+
+@bp.route('/communities/<int:community_id>/posts/create', methods=['POST'])
+@login_required
+def community_create_post(community_id):
+    """Create a post in a community"""
+    if not CommunityMember.query.filter_by(user_id=current_user.id, community_id=community_id).first():
+        flash('You must be a member to post.', 'error')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+        
+    content = request.form.get('content')
+    image = request.files.get('image')
+    
+    if not content and not image:
+        flash('Post cannot be empty', 'error')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+        
+    filename = None
+    if image and image.filename:
+        filename = store_blob(image, secure_filename(image.filename))
+        
+    post = Post(
+        content=content,
+        image_filename=filename,
+        user_id=current_user.id,
+        community_id=community_id
+    )
+    db.session.add(post)
+    db.session.commit()
+    invalidate(f'community:{community_id}')
+    
+    flash('Post created!', 'success')
+    return redirect(url_for('communities.community_detail', community_id=community_id))
+
+@bp.route('/posts/<int:post_id>/like', methods=['POST'])
+@login_required
+def community_like_post(post_id):
+    """Toggle like on a post"""
+    post = Post.query.get_or_404(post_id)
+    like = PostLike.query.filter_by(user_id=current_user.id, post_id=post_id).first()
+    
+    if like:
+        db.session.delete(like)
+        action = 'unliked'
+    else:
+        like = PostLike(user_id=current_user.id, post_id=post_id)
+        db.session.add(like)
+        action = 'liked'
+        
+    db.session.commit()
+    if request.form.get('lite'):
+        # The plain form on lite pages (lite.py); the script wants JSON
+        return redirect(request.referrer or url_for('communities.community_detail', community_id=post.community_id))
+    return jsonify({'status': 'success', 'action': action, 'count': post.like_count})
+
+@bp.route('/posts/<int:post_id>/comment', methods=['POST'])
+@login_required
+def community_add_comment(post_id):
+    """Add a comment to a post"""
+    content = request.form.get('content')
+    if not content:
+        flash('Comment cannot be empty', 'error')
+        return redirect(request.referrer)
+        
+    comment = CommunityComment(
+        content=content,
+        user_id=current_user.id,
+        post_id=post_id
+    )
+    db.session.add(comment)
+    db.session.commit()
+    community_id = db.session.query(Post.community_id).filter_by(id=post_id).scalar()
+    invalidate(f'community:{community_id}')
+    
+    return redirect(request.referrer)
+
+@bp.route('/communities/<int:community_id>/members/<int:user_id>/role', methods=['POST'])
+@login_required
+def community_toggle_role(community_id, user_id):
+    """Toggle member role between admin and member"""
+    community = Community.query.get_or_404(community_id)
+    if community.creator_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+        
+    membership = CommunityMember.query.filter_by(community_id=community_id, user_id=user_id).first_or_404()
+    
+    new_role = request.json.get('role')
+    if new_role in ['admin', 'member']:
+        membership.role = new_role
+        db.session.commit()
+        invalidate(f'community:{community_id}')
+        return jsonify({'status': 'success'})
+        
+    return jsonify({'error': 'Invalid role'}), 400
+
+@bp.route('/communities/<int:community_id>/create-event', methods=['GET', 'POST'])
+@login_required
+def community_create_event(community_id):
+    """Create an event for a community"""
+    community = Community.query.get_or_404(community_id)
+    
+    if community.creator_id != current_user.id:
+        flash('Only the community admin can create events.', 'error')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+    
+    if request.method == 'POST':
+        date_str = request.form['date']
+        time_str = request.form['time']
+        dt_str = f"{date_str} {time_str}"
+        try:
+            event_date_time = datetime.strptime(dt_str, '%Y-%m-%d %H:%M')
+        except ValueError:
+            flash('Invalid date or time format', 'error')
+            return render_template('community_create_event.html', community=community, user=current_user)
+            
+        event = CommunityEvent(
+            title=request.form['title'],
+            description=request.form['description'],
+            date_time=event_date_time,
+            location=request.form['location'],
+            community_id=community_id
+        )
+        db.session.add(event)
+        db.session.commit()
+        invalidate(f'community:{community_id}')
+        flash('Event created successfully!', 'success')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+        
+    return render_template('community_create_event.html', community=community, user=current_user)
+
+@bp.route('/communities/<int:community_id>/join')
+@login_required
+def community_join(community_id):
+    """Join a community"""
+    if not CommunityMember.query.filter_by(user_id=current_user.id, community_id=community_id).first():
+        membership = CommunityMember(user_id=current_user.id, community_id=community_id)
+        db.session.add(membership)
+        db.session.commit()
+        invalidate('communities', f'community:{community_id}')
+        flash('Joined community!', 'success')
+    
+    return redirect(url_for('communities.community_detail', community_id=community_id))
+
+@bp.route('/communities/<int:community_id>/leave')
+@login_required
+def community_leave(community_id):
+    """Leave a community"""
+    membership = CommunityMember.query.filter_by(user_id=current_user.id, community_id=community_id).first()
+    if membership:
+        db.session.delete(membership)
+        db.session.commit()
+        invalidate('communities', f'community:{community_id}')
+        flash('Left community', 'info')
+    return redirect(url_for('communities.community_home'))
+
+@bp.route('/communities/<int:community_id>/edit', methods=['GET', 'POST'])
+@login_required
+def community_edit(community_id):
+    """Edit a community (creator only)"""
+    community = Community.query.get_or_404(community_id)
+    
+    if community.creator_id != current_user.id:
+        flash('Only the creator can edit this community.', 'danger')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+    
+    if request.method == 'POST':
+        community.name = request.form['name']
+        community.description = request.form['description']
+        community.category = request.form['category']
+        
+        # Handle image upload
+        image = request.files.get('image')
+        old_image = community.image_filename
+        if image and image.filename:
+            community.image_filename = store_blob(image, secure_filename(image.filename))
+        
+        db.session.commit()
+        invalidate('communities', f'community:{community_id}')
+        if old_image != community.image_filename:
+            release([old_image])
+        flash('Community updated!', 'success')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+    
+    return render_template('community_edit_community.html', community=community, user=current_user)
+
+@bp.route('/communities/<int:community_id>/delete', methods=['POST'])
+@login_required
+def community_delete(community_id):
+    """Delete a community"""
+    community = Community.query.get_or_404(community_id)
+    
+    if community.creator_id != current_user.id:
+        flash('You can only delete communities you created', 'error')
+        return redirect(url_for('communities.community_detail', community_id=community_id))
+    
+    images = [community.image_filename] + [row.image_filename for row in
+                                           Post.query.with_entities(Post.image_filename).filter_by(community_id=community_id)]
+    CommunityMember.query.filter_by(community_id=community_id).delete()
+    db.session.delete(community)
+    db.session.commit()
+    invalidate('communities', f'community:{community_id}')
+    release(images)
+    
+    flash('Community deleted successfully', 'success')
+    return redirect(url_for('communities.community_home'))
+
+@bp.route('/create-community', methods=['GET', 'POST'])
+@login_required
+def community_create():
+    """Create a new community"""
+    if request.method == 'POST':
+        name = request.form['name']
+        description = request.form['description']
+        category = request.form['category']
+        image = request.files.get('image')
+
+        filename = None
+        if image and image.filename:
+            filename = store_blob(image, secure_filename(image.filename))
+        
+        community = Community(
+            name=name,
+            description=description,
+            category=category,
+            image_filename=filename,
+            creator_id=current_user.id
+        )
+        db.session.add(community)
+        db.session.commit()
+        
+        # Auto-join as creator
+        membership = CommunityMember(
+            user_id=current_user.id, 
+            community_id=community.id,
+            role='admin'
+        )
+        db.session.add(membership)
+        db.session.commit()
+        invalidate('communities')
+        
+        flash('Community created!', 'success')
+        return redirect(url_for('communities.community_detail', community_id=community.id))
+    
+    return render_template('community_create_community.html', user=current_user)
+
+# ========== FEED ROUTE ==========
+
+@bp.route('/feed')
+@login_required
+def feed():
+    """Recent posts from joined communities plus stories friends shared with the user"""
+    items, next_cursor = get_feed_page(current_user.id, request.args.get('cursor'))
+
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'items': [feed_item_to_dict(item) for item in items],
+            'next_cursor': next_cursor
+        })
+
+    return render_template('feed.html', items=items, next_cursor=next_cursor, user=current_user)
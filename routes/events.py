@@ -0,0 +1,350 @@
+"""Event browsing, creation, participation and reflections"""
+import calendar
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+
+from models import db, Event, EventParticipant, Reflection
+from chunked_upload import UploadError, claim_upload
+from blobstore import store_blob, release
+from fragments import remember, invalidate, snapshot
+from page_cache import anonymous_page
+from lite import paginate
+from streaming import rows, stream_page
+from forms import EventForm, ReflectionForm, CreatorReflectionForm
+
+bp = Blueprint('events', __name__)
+
+@bp.route('/events')
+def events():
+    """Redirect to the new event browse page"""
+    return redirect(url_for('events.event_browse'))
+
+def browse_events(q, category):
+    """Events matching the browse filters, as cacheable snapshots"""
+    query = Event.query
+    if q:
+        query = query.filter(Event.title.ilike(f'%{q}%'))
+    if category:
+        query = query.filter(Event.category == category)
+    return [snapshot(e) for e in query.order_by(Event.date.asc(), Event.time.asc()).all()]
+
+@bp.route('/events/browse')
+@anonymous_page(['events'])
+def event_browse():
+    """Browse all events with search and filter"""
+    q = request.args.get('q', '').strip()
+    category = request.args.get('category', '').strip()
+    events = remember(('events', q, category), ['events'], lambda: browse_events(q, category))
+    events, pager = paginate(events)
+    
+    joined_ids = set()
+    if current_user.is_authenticated:
+        joined_ids = {p.event_id for p in EventParticipant.query.filter_by(user_id=current_user.id).all()}
+    
+    return render_template('event_browse.html', events=events, pager=pager, joined_ids=joined_ids, q=q, category=category, user=current_user if current_user.is_authenticated else None)
+
+@bp.route('/events/<int:event_id>')
+@anonymous_page(lambda event_id: [f'event:{event_id}'])
+def event_details(event_id):
+    """View event details"""
+    event = Event.query.get_or_404(event_id)
+    joined = False
+    is_creator = False
+    if current_user.is_authenticated:
+        joined = EventParticipant.query.filter_by(user_id=current_user.id, event_id=event.id).first() is not None
+        is_creator = event.host == current_user.username
+    return render_template('event_details.html', event=event, joined=joined, is_creator=is_creator, user=current_user if current_user.is_authenticated else None)
+
+def event_image(form):
+    """The submitted image: a finished chunked upload, else the form's file field"""
+    return claim_upload(request.form.get('image_upload_id'), current_user.id, 'event') or form.image.data
+
+@bp.route('/events/create', methods=['GET', 'POST'])
+@login_required
+def event_create():
+    """Create a new event"""
+    form = EventForm()
+    
+    if form.validate_on_submit():
+        try:
+            image = event_image(form)
+        except UploadError as e:
+            flash(e.message, 'danger')
+            return render_template('event_create.html', form=form, user=current_user)
+
+        filename = None
+        if image:
+            filename = store_blob(image, secure_filename(image.filename))
+
+        event = Event(
+            title=form.title.data,
+            description=form.description.data,
+            date=form.date.data,
+            time=form.time.data,
+            category=form.category.data,
+            location=form.location.data,
+            slots=form.slots.data,
+            host=current_user.username,
+            image=filename
+        )
+        db.session.add(event)
+        db.session.commit()
+
+        # Automatically add creator as participant
+        participant = EventParticipant(user_id=current_user.id, event_id=event.id)
+        db.session.add(participant)
+        db.session.commit()
+        invalidate('events')
+
+        flash('Event created and you have been added as a participant.', 'success')
+        return redirect(url_for('events.event_details', event_id=event.id))
+    
+    return render_template('event_create.html', form=form, user=current_user)
+
+@bp.route('/events/<int:event_id>/edit', methods=['GET', 'POST'])
+@login_required
+def event_edit(event_id):
+    """Edit an existing event"""
+    event = Event.query.get_or_404(event_id)
+    
+    if event.host != current_user.username:
+        flash('Only the event creator can edit this event.', 'warning')
+        return redirect(url_for('events.event_browse'))
+
+    form = EventForm(obj=event)
+
+    if form.validate_on_submit():
+        try:
+            image = event_image(form)
+        except UploadError as e:
+            flash(e.message, 'danger')
+            return render_template('event_edit.html', form=form, event=event, user=current_user)
+
+        old_image = None
+        if image:
+            orig = secure_filename(getattr(image, 'filename', ''))
+            if orig:
+                old_image = event.image
+                event.image = store_blob(image, orig)
+
+        event.title = form.title.data
+        event.description = form.description.data
+        event.date = form.date.data
+        event.time = form.time.data
+        event.category = form.category.data
+        event.location = form.location.data
+        event.slots = form.slots.data
+
+        db.session.commit()
+        invalidate('events', f'event:{event.id}')
+        if old_image and old_image != event.image:
+            release([old_image], legacy=True)
+        flash('Event updated.', 'success')
+        return redirect(url_for('events.event_details', event_id=event.id))
+
+    return render_template('event_edit.html', form=form, event=event, user=current_user)
+
+@bp.route('/events/<int:event_id>/delete', methods=['POST'])
+@login_required
+def event_delete(event_id):
+    """Delete an event"""
+    event = Event.query.get_or_404(event_id)
+    
+    if event.host != current_user.username:
+        flash('Only the event creator can delete this event.', 'warning')
+        return redirect(url_for('events.event_browse'))
+    
+    image = event.image
+    db.session.delete(event)
+    db.session.commit()
+    invalidate('events', f'event:{event_id}')
+    release([image])
+    flash('Event deleted.', 'info')
+    return redirect(url_for('events.event_browse'))
+
+@bp.route('/events/<int:event_id>/join', methods=['POST'])
+@login_required
+def event_join(event_id):
+    """Join an event"""
+    event = Event.query.get_or_404(event_id)
+    existing = EventParticipant.query.filter_by(user_id=current_user.id, event_id=event.id).first()
+    if not existing:
+        db.session.add(EventParticipant(user_id=current_user.id, event_id=event.id))
+        db.session.commit()
+        invalidate(f'event:{event.id}')
+        flash('You joined the event.', 'success')
+
+    dest = request.referrer or url_for('events.event_browse')
+    return redirect(dest)
+
+@bp.route('/events/<int:event_id>/leave', methods=['POST'])
+@login_required
+def event_leave(event_id):
+    """Leave an event"""
+    part = EventParticipant.query.filter_by(user_id=current_user.id, event_id=event_id).first()
+    if part:
+        db.session.delete(part)
+        db.session.commit()
+        invalidate(f'event:{event_id}')
+        flash('You left the event.', 'info')
+
+    dest = request.referrer or url_for('events.event_browse')
+    return redirect(dest)
+
+@bp.route('/events/my-events')
+@login_required
+def event_my_events():
+    """View user's events with calendar"""
+    # Calendar month/year selection
+    try:
+        sel_month = int(request.args.get('month', datetime.utcnow().month))
+        sel_year = int(request.args.get('year', datetime.utcnow().year))
+    except ValueError:
+        sel_month = datetime.utcnow().month
+        sel_year = datetime.utcnow().year
+
+    num_days = calendar.monthrange(sel_year, sel_month)[1]
+    first_weekday = calendar.monthrange(sel_year, sel_month)[0]
+    leading_blanks = first_weekday
+
+    # All joined events (including those the user created)
+    joined_all = (db.session.query(Event)
+                  .join(EventParticipant, Event.id == EventParticipant.event_id)
+                  .filter(EventParticipant.user_id == current_user.id))
+
+    # The calendar only needs this month's; the lists stream in below it
+    month_start = date(sel_year, sel_month, 1)
+    joined_in_month = joined_all.filter(Event.date >= month_start,
+                                        Event.date < month_start + timedelta(days=num_days)).all()
+    joined_days = {e.date.day for e in joined_in_month}
+
+    # Joined events (exclude those where user is the host)
+    joined = rows(joined_all.filter(Event.host != current_user.username)
+                  .order_by(Event.date.asc(), Event.time.asc()))
+
+    # Created events
+    created = rows(Event.query.filter(Event.host == current_user.username).order_by(Event.date.asc()))
+
+    # Reflections (attended) for joined events in selected month
+    joined_event_ids = [e.id for e in joined_in_month]
+    attended_days = set()
+    if joined_event_ids:
+        attended = Reflection.query.filter(Reflection.user_id == current_user.id, Reflection.event_id.in_(joined_event_ids)).all()
+        attended_event_ids = {r.event_id for r in attended}
+        events_map = {e.id: e for e in joined_in_month}
+        for eid in attended_event_ids:
+            ev = events_map.get(eid)
+            if ev:
+                attended_days.add(ev.date.day)
+
+    # Prev/next month links
+    if sel_month == 1:
+        prev_month, prev_year = 12, sel_year - 1
+    else:
+        prev_month, prev_year = sel_month - 1, sel_year
+    if sel_month == 12:
+        next_month, next_year = 1, sel_year + 1
+    else:
+        next_month, next_year = sel_month + 1, sel_year
+
+    month_name = calendar.month_name[sel_month]
+
+    return stream_page('event_my_events.html',
+                       joined=joined,
+                       created=created,
+                       sel_month=sel_month,
+                       sel_year=sel_year,
+                       month_name=month_name,
+                       num_days=num_days,
+                       leading_blanks=leading_blanks,
+                       joined_days=joined_days,
+                       attended_days=attended_days,
+                       prev_month=prev_month,
+                       prev_year=prev_year,
+                       next_month=next_month,
+                       next_year=next_year,
+                       user=current_user)
+
+@bp.route('/events/reflection/<int:event_id>', methods=['GET', 'POST'])
+@login_required
+def event_reflection(event_id):
+    """Submit a reflection for an event"""
+    event = Event.query.get_or_404(event_id)
+    
+    # Allow reflection if user joined OR is the event host
+    participant = EventParticipant.query.filter_by(user_id=current_user.id, event_id=event.id).first()
+    if not participant and event.host != current_user.username:
+        flash('Only participants or the event creator can submit reflections.', 'warning')
+        return redirect(url_for('events.event_browse'))
+
+    form = ReflectionForm()
+    existing = Reflection.query.filter_by(user_id=current_user.id, event_id=event.id).first()
+
+    if request.method == 'GET' and existing:
+        try:
+            form.rating.data = existing.rating
+            form.comments.data = existing.comments
+        except Exception:
+            pass
+
+    if form.validate_on_submit():
+        if existing:
+            existing.rating = form.rating.data
+            existing.comments = form.comments.data
+            existing.submitted_at = datetime.utcnow()
+        else:
+            new_ref = Reflection(
+                user_id=current_user.id,
+                event_id=event.id,
+                rating=form.rating.data,
+                comments=form.comments.data,
+                submitted_at=datetime.utcnow()
+            )
+            db.session.add(new_ref)
+        db.session.commit()
+        flash('Reflection submitted.', 'success')
+        return redirect(url_for('events.event_my_events'))
+
+    return render_template('event_reflection.html', form=form, event=event, user=current_user)
+
+@bp.route('/events/reflection/creator/<int:event_id>', methods=['GET', 'POST'])
+@login_required
+def event_creator_reflection(event_id):
+    """Submit a creator reflection for an event"""
+    event = Event.query.get_or_404(event_id)
+    
+    if event.host != current_user.username:
+        flash('Only the event creator can submit a creator reflection here.', 'warning')
+        return redirect(url_for('events.event_browse'))
+
+    form = CreatorReflectionForm()
+    existing = Reflection.query.filter_by(user_id=current_user.id, event_id=event.id).first()
+
+    if request.method == 'GET' and existing:
+        form.rating.data = existing.rating
+        form.comments.data = existing.comments
+
+    if form.validate_on_submit():
+        if existing:
+            existing.rating = form.rating.data
+            existing.comments = form.comments.data
+            existing.submitted_at = datetime.utcnow()
+            db.session.commit()
+            flash('You have updated your post reflection.', 'success')
+        else:
+            new_ref = Reflection(
+                user_id=current_user.id,
+                event_id=event.id,
+                rating=form.rating.data,
+                comments=form.comments.data,
+                submitted_at=datetime.utcnow()
+            )
+            db.session.add(new_ref)
+            db.session.commit()
+            flash('You have submitted your post reflection.', 'success')
+        return redirect(url_for('events.event_my_events'))
+
+    return render_template('event_creator_reflection.html', form=form, event=event, user=current_user)
@@ -0,0 +1,29 @@
+"""The switch between lite and full pages (see lite.py)"""
+from urllib.parse import urlsplit
+
+from flask import Blueprint, redirect, request, url_for
+
+from lite import LITE_COOKIE, LITE_COOKIE_AGE
+
+bp = Blueprint('lite', __name__)
+
+
+@bp.route('/lite')
+def toggle():
+    """/lite?on=1 or ?on=0: remember the visitor's choice and go back to ?next"""
+    choice = 'on' if request.args.get('on') == '1' else 'off'
+    target = request.args.get('next', '')
+    if not is_local_path(target):
+        target = url_for('auth.home')
+    response = redirect(target)
+    response.set_cookie(LITE_COOKIE, choice, max_age=LITE_COOKIE_AGE, samesite='Lax')
+    return response
+
+
+def is_local_path(target):
+    """Whether a redirect target is a path on this site. Browsers read a
+    backslash as a slash, so /\\other.host is //other.host too."""
+    if not target.startswith('/') or '\\' in target or any(ord(c) < 32 or ord(c) == 127 for c in target):
+        return False
+    parts = urlsplit(target)
+    return not parts.scheme and not parts.netloc
@@ -0,0 +1,104 @@
+"""Serving of user uploads and avatars"""
+import os
+
+from flask import Blueprint, send_from_directory, send_file, current_app, request, redirect, abort
+
+from avatars import avatar_source, avatar_version, snap_size, placeholder, cached_photo, photo_etag
+from blobstore import BLOB_PATTERN
+from identity import load_cached_user
+from images import pick_variant, queue_variants
+
+bp = Blueprint('media', __name__)
+
+# A blob's URL names its content, so browsers and proxies may keep it forever
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# The original, sent while the requested variant is still being rendered
+PENDING = 'public, max-age=60'
+
+
+@bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serve uploaded files, or the best resized variant of an image blob.
+
+    ?w=320 asks for a copy at least 320px wide; AVIF or WebP is sent when
+    the Accept header names it, otherwise the original format. Range and
+    If-None-Match / If-Range requests are answered by send_file.
+    """
+    blob = BLOB_PATTERN.fullmatch(filename)
+    variant = pick_variant(filename, request.args.get('w', type=int), request.accept_mimetypes)
+    if variant and os.path.exists(variant[0]):
+        # Strong ETags from the content hash, the same on every host
+        etag = f"{blob.group(1)}-{os.path.basename(variant[0])}"
+        response = _not_modified(etag) or send_file(variant[0], mimetype=variant[1], etag=etag)
+        response.vary.add('Accept')
+        return response
+    if blob:
+        response = _not_modified(blob.group(1))
+        if response:
+            return response
+    uploads_dir = os.path.join(current_app.root_path, 'css', 'uploads')
+    response = send_from_directory(uploads_dir, filename, etag=blob.group(1) if blob else True)
+    if 'w' in request.args and queue_variants(filename) is not None:
+        response.headers['Cache-Control'] = PENDING
+    return response
+
+
+def _not_modified(etag):
+    """304 for a matching If-None-Match, checked before Range as RFC 9110 orders it"""
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+@bp.before_app_request
+def static_blobs():
+    """Blob URLs under /css/uploads/ (chat attachments, stories) get the same ETags and caching"""
+    if request.endpoint == 'static':
+        filename = request.view_args.get('filename', '')
+        if filename.startswith('uploads/') and BLOB_PATTERN.fullmatch(filename[len('uploads/'):]):
+            return uploaded_file(filename[len('uploads/'):])
+
+
+@bp.route('/avatar/<int:user_id>')
+def avatar(user_id):
+    """Square avatar at ?s=32|64|128; links from avatar_url() carry ?v= and never expire"""
+    user = load_cached_user(user_id)
+    if user is None:
+        abort(404)
+    size = snap_size(request.args.get('s', type=int))
+    # An outdated ?v= still gets the current avatar, just not for a year
+    cache_control = IMMUTABLE if request.args.get('v') == avatar_version(user) else 'public, max-age=300'
+
+    kind, source = avatar_source(user)
+    if kind == 'remote':
+        response = redirect(source)
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        return response
+
+    path = None
+    if kind == 'photo':
+        fmt = 'webp' if 'image/webp' in request.accept_mimetypes.values() else 'jpeg'
+        # None without Pillow or for an undecodable file: the initials, never the file itself
+        path = cached_photo(source, size, fmt)
+    if path:
+        response = send_file(path, mimetype=f'image/{fmt}', etag=False, conditional=False)
+        response.vary.add('Accept')
+        etag = photo_etag(source, size, fmt)
+    else:
+        svg, etag = placeholder(user, size)
+        response = current_app.response_class(svg, mimetype='image/svg+xml')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+
+@bp.after_app_request
+def cache_blobs(response):
+    """Long-lived caching for content-addressed uploads, whichever route served them"""
+    if (response.status_code in (200, 206, 304) and BLOB_PATTERN.search(request.path)
+            and response.headers.get('Cache-Control') != PENDING):
+        response.headers['Cache-Control'] = IMMUTABLE
+    return response
@@ -0,0 +1,116 @@
+"""Installable app shell: service worker, web app manifest and offline page.
+
+/sw.js is rendered from html/sw.js with the shell it precaches: the site
+bundles, the per-section CSS/JS, the icons and /offline. Once
+`flask --app app build-assets` has run those URLs are fingerprinted, so a
+new build changes the worker's VERSION; browsers install it and drop the
+old shell. The worker is served from the root because it only controls
+pages under its own path.
+
+What the worker does with each request:
+
+- pages: network first (with navigation preload), falling back to the
+  last copy of the page it saw, then to /offline
+- the shell, built assets (/css/dist/), content-addressed uploads and
+  ?v= avatars: cache first, as their URLs change whenever their content
+  does (and the shell is fetched again by each new worker)
+- other static files: from the cache at once, refreshed in the background
+- the CDN files base.html loads (versioned URLs) and their fonts: cache first
+- everything else (JSON, Socket.IO, POSTs): not touched
+
+Visiting /logout clears the saved pages and the chat cache; every sign-out
+response (logout, account deletion) also sends Clear-Site-Data
+(signed_out() in routes/auth.py), so cleanup doesn't hang on the URL the
+browser navigated to. Set ENABLED
+to False to retire the worker: /sw.js then serves one that deletes its
+caches and unregisters itself.
+"""
+import hashlib
+import json
+import os
+
+from flask import Blueprint, current_app, jsonify, render_template, url_for
+
+from assets import asset_urls
+
+bp = Blueprint('pwa', __name__)
+
+# Cached by the worker on install, next to the site bundles
+SHELL = ['base.css', 'event_style.css', 'story_style.css', 'js/story_script.js',
+         'icons/icon.svg', 'icons/icon-192.png', 'icons/icon-512.png']
+# Third-party files every page loads (versioned URLs, so they never change)
+CDN_SHELL = [
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/bootstrap-icons.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+]
+PAGE_CACHE_SIZE = 30  # recently visited pages kept for offline use
+MEDIA_CACHE_SIZE = 200  # uploads and avatars kept
+THEME_COLOR = '#4A90E2'
+
+# Benchmarks and rollbacks flip this
+ENABLED = True
+
+
+def shell_urls():
+    urls = asset_urls('bundle/site.css') + asset_urls('bundle/site.js')
+    urls += [url_for('static', filename=name) for name in SHELL]
+    return urls + [url_for('pwa.offline')]
+
+
+@bp.app_template_global()
+def service_worker_url():
+    """The worker for base.html to register, or None while it is switched off"""
+    return url_for('pwa.service_worker') if ENABLED else None
+
+
+@bp.route('/sw.js')
+def service_worker():
+    """The service worker; no-cache so browsers see a new build straight away"""
+    settings = {
+        'shell': shell_urls(),
+        'cdn': CDN_SHELL,
+        'static': current_app.static_url_path + '/',
+        'offline': url_for('pwa.offline'),
+        'logout': url_for('auth.logout'),
+        'page_cache_size': PAGE_CACHE_SIZE,
+        'media_cache_size': MEDIA_CACHE_SIZE,
+    }
+    # Fingerprinted URLs change with their files; the rest (icons, or
+    # everything before a build) count by modification time
+    prefix = settings['static']
+    mtimes = [os.path.getmtime(os.path.join(current_app.static_folder, *url[len(prefix):].split('/')))
+              for url in settings['shell'] if url.startswith(prefix) and not url.startswith(prefix + 'dist/')]
+    version = hashlib.sha1(json.dumps([settings, mtimes], sort_keys=True).encode()).hexdigest()[:12]
+    script = render_template('sw.js', version=version, settings=settings, enabled=ENABLED)
+    response = current_app.response_class(script, mimetype='text/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@bp.route('/manifest.webmanifest')
+def web_manifest():
+    response = jsonify({
+        'name': 'BridgeGen',
+        'short_name': 'BridgeGen',
+        'start_url': url_for('auth.home'),
+        'scope': '/',
+        'display': 'standalone',
+        'background_color': '#f4f4f4',
+        'theme_color': THEME_COLOR,
+        'icons': [
+            {'src': url_for('static', filename='icons/icon-192.png'), 'sizes': '192x192', 'type': 'image/png'},
+            {'src': url_for('static', filename='icons/icon-512.png'), 'sizes': '512x512', 'type': 'image/png'},
+            {'src': url_for('static', filename='icons/icon.svg'), 'sizes': 'any', 'type': 'image/svg+xml'},
+        ],
+    })
+    response.mimetype = 'application/manifest+json'
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
+@bp.route('/offline')
+def offline():
+    """Shown by the worker for pages it has no copy of while the network is down"""
+    return render_template('offline.html')
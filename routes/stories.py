@@ -0,0 +1,342 @@
+"""Story pages backed by the Story table"""
+from datetime import datetime
+
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+
+from models import db, Story, StoryComment
+from chunked_upload import UploadError, claim_upload
+from blobstore import store_blob, release
+from timeline import get_friends_timeline, stories_to_dicts, visibility_filter, can_view, invalidate_author
+from fragments import remember, invalidate
+from lite import paginate
+
+bp = Blueprint('stories', __name__)
+
+def get_recommended_stories(user=None):
+    """Get recommended stories for a user based on their tags"""
+    if not user:
+        top = Story.query.filter(Story.privacy == 'Public').order_by(Story.likes.desc()).limit(4).all()
+        return stories_to_dicts(top)
+
+    visible = Story.query.filter(visibility_filter(user.id))
+    user_tags = {t for (tags,) in db.session.query(Story.tags).filter(Story.user_id == user.id).all()
+                 for t in (tags or '').split(',') if t}
+    rec = []
+    if user_tags:
+        candidates = visible.filter(Story.user_id != user.id).order_by(Story.timestamp.desc()).limit(100).all()
+        rec = [s for s in candidates if user_tags & set((s.tags or '').split(','))]
+
+    if not rec:
+        rec = visible.order_by(Story.likes.desc()).limit(4).all()
+    return stories_to_dicts(rec[:4])
+
+@bp.route('/story')
+def story():
+    """Redirect to the new story home page"""
+    return redirect(url_for('stories.story_home'))
+
+STORY_TAG_OPTIONS = ["Travel", "Photography", "Tech", "Learning", "Food", "Lifestyle", "Art"]
+
+def get_own_story(story_id):
+    """Fetch a story owned by the current user, or None"""
+    s = Story.query.get(story_id)
+    if s and s.user_id == current_user.id:
+        return s
+    return None
+
+def save_story_media(media_files):
+    """Save uploaded story media and return their static paths"""
+    media = []
+    for file in media_files:
+        if file.filename:
+            filename = secure_filename(file.filename)
+            media.append("uploads/" + store_blob(file, filename))
+    return media
+
+def claimed_story_media():
+    """Finished chunked uploads (large videos) sent as media_upload_id"""
+    return [claim_upload(uid, current_user.id, 'story') for uid in request.form.getlist("media_upload_id")]
+
+def filter_by_tag(stories, tag):
+    """Exact tag match on the comma-separated tags column"""
+    return [s for s in stories if tag in (s.tags or '').split(',')]
+
+@bp.route('/story/home')
+@login_required
+def story_home():
+    """Story home page with user's stories and recommendations"""
+    mine = Story.query.filter_by(user_id=current_user.id).order_by(Story.timestamp.desc()).limit(4).all()
+    my_stories = stories_to_dicts(mine)
+    recommended = get_recommended_stories(current_user)
+    return render_template('story_home.html', my_stories=my_stories, recommended=recommended, user=current_user)
+
+def browse_stories(viewer_id, q, tag):
+    """(story dicts, tag options) for the browse page"""
+    visible = Story.query.filter(visibility_filter(viewer_id))
+    tags = sorted({t for (story_tags,) in visible.with_entities(Story.tags).all() for t in (story_tags or '').split(',') if t})
+
+    query = visible
+    if q:
+        query = query.filter(db.or_(Story.title.ilike(f'%{q}%'), Story.description.ilike(f'%{q}%')))
+    if tag:
+        query = query.filter(Story.tags.contains(tag))
+    filtered = query.order_by(Story.timestamp.desc()).all()
+    if tag:
+        filtered = filter_by_tag(filtered, tag)
+    return stories_to_dicts(filtered), tags
+
+@bp.route('/story/browse')
+@login_required
+def story_browse():
+    """Browse all stories the current user may see, with search and filter"""
+    q = request.args.get("q", "").strip().lower()
+    tag = request.args.get("tag", "").strip()
+    # Visibility depends on who has friended the viewer, hence the friends tag
+    stories, tags = remember(('stories', current_user.id, q, tag), ['stories', f'friends:{current_user.id}'],
+                             lambda: browse_stories(current_user.id, q, tag))
+    stories, pager = paginate(stories)
+    return render_template('story_browse.html', stories=stories, pager=pager, tags=tags, q=q, selected_tag=tag, user=current_user)
+
+@bp.route('/story/timeline')
+@login_required
+def story_timeline():
+    """Stories from friends, respecting each story's privacy setting"""
+    stories = stories_to_dicts(get_friends_timeline(current_user.id))
+    tags = sorted({t for s in stories for t in s["tags"]})
+    stories, pager = paginate(stories)
+    return render_template('story_browse.html', stories=stories, pager=pager, tags=tags, q='', selected_tag='', user=current_user)
+
+@bp.route('/story/details/<int:story_id>', methods=['GET', 'POST'])
+@login_required
+def story_details(story_id):
+    """View details of a story (others' stories)"""
+    s = Story.query.get(story_id)
+    if not s or not can_view(s, current_user.id):
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_browse'))
+    
+    if request.method == 'POST':
+        action = request.form.get("action")
+        if action == "like":
+            s.likes = (s.likes or 0) + 1
+        elif action == "save":
+            s.saved = not s.saved
+        elif action == "report":
+            s.reported = True
+            flash("Story reported.", "info")
+        elif action == "comment":
+            author = request.form.get("author", current_user.username).strip() or current_user.username
+            text = request.form.get("text", "").strip()
+            if text:
+                db.session.add(StoryComment(story_id=s.id, author=author, text=text))
+        db.session.commit()
+        invalidate('stories', f'story:{s.id}')
+        return redirect(url_for('stories.story_details', story_id=story_id))
+    
+    return render_template('story_details.html', story=s.to_dict(), user=current_user)
+
+@bp.route('/story/my-story/<int:story_id>', methods=['GET', 'POST'])
+@login_required
+def story_my_story(story_id):
+    """View user's own story"""
+    s = Story.query.get(story_id)
+    if not s:
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_my_stories'))
+    if s.user_id != current_user.id:
+        flash("You can only view your own stories from this page.", "warning")
+        return redirect(url_for('stories.story_details', story_id=story_id))
+    
+    if request.method == 'POST':
+        action = request.form.get("action")
+        if action == "comment":
+            author = request.form.get("author", current_user.username).strip() or current_user.username
+            text = request.form.get("text", "").strip()
+            if text:
+                db.session.add(StoryComment(story_id=s.id, author=author, text=text))
+                db.session.commit()
+                invalidate('stories', f'story:{s.id}')
+        return redirect(url_for('stories.story_my_story', story_id=story_id))
+    
+    return render_template('story_my_story.html', story=s.to_dict(), user=current_user)
+
+@bp.route('/story/create', methods=['GET', 'POST'])
+@login_required
+def story_create():
+    """Create a new story"""
+    if request.method == 'POST':
+        title = request.form.get("title", "").strip()
+        description = request.form.get("description", "").strip()
+        privacy = request.form.get("privacy", "").strip()
+        
+        if not title or not description or not privacy:
+            flash("Title, description, and privacy setting are required.", "warning")
+            return render_template('story_create.html', tag_options=STORY_TAG_OPTIONS, user=current_user)
+        
+        selected_tags = request.form.getlist("tags")
+        custom_tags_str = request.form.get("custom_tags", "").strip()
+        custom_tags = [tag.strip() for tag in custom_tags_str.split(",") if tag.strip()]
+        tags = list(set(selected_tags + custom_tags))
+        
+        if not selected_tags:
+            flash("Please select at least one predefined tag.", "warning")
+            return render_template('story_create.html', tag_options=STORY_TAG_OPTIONS, user=current_user)
+        
+        voiceRecording = request.form.get("voiceRecording")
+        try:
+            claimed = claimed_story_media()
+        except UploadError as e:
+            flash(e.message, "warning")
+            return render_template('story_create.html', tag_options=STORY_TAG_OPTIONS, user=current_user)
+        media = save_story_media(request.files.getlist("media") + claimed)
+        
+        story = Story(
+            title=title,
+            description=description,
+            tags=",".join(tags),
+            date=datetime.now().date(),
+            privacy=privacy,
+            likes=0,
+            media=",".join(media),
+            voice_recording=voiceRecording,
+            user_id=current_user.id
+        )
+        db.session.add(story)
+        db.session.commit()
+        invalidate_author(current_user.id)
+        invalidate('stories')
+        return redirect(url_for('stories.story_confirm_post', story_id=story.id))
+    
+    return render_template('story_create.html', tag_options=STORY_TAG_OPTIONS, user=current_user)
+
+@bp.route('/story/confirm-post/<int:story_id>', methods=['GET', 'POST'])
+@login_required
+def story_confirm_post(story_id):
+    """Confirm post before finalizing"""
+    s = get_own_story(story_id)
+    if not s:
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_create'))
+    return render_template('story_confirm_post.html', story=s.to_dict(), user=current_user)
+
+@bp.route('/story/finalize-post/<int:story_id>', methods=['POST'])
+@login_required
+def story_finalize_post(story_id):
+    """Finalize the post"""
+    s = get_own_story(story_id)
+    if not s:
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_create'))
+    flash("Story posted successfully!", "success")
+    return redirect(url_for('stories.story_my_stories'))
+
+@bp.route('/story/edit/<int:story_id>', methods=['GET', 'POST'])
+@login_required
+def story_edit(story_id):
+    """Edit an existing story"""
+    s = Story.query.get(story_id)
+    if not s:
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_my_stories'))
+    if s.user_id != current_user.id:
+        flash("You can only edit your own stories.", "warning")
+        return redirect(url_for('stories.story_details', story_id=story_id))
+    
+    if request.method == 'POST':
+        s.title = request.form.get("title", s.title).strip() or s.title
+        s.description = request.form.get("description", s.description).strip() or s.description
+        date_str = request.form.get("date")
+        if date_str:
+            try:
+                s.date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            except ValueError:
+                pass
+        
+        selected_tags = request.form.getlist("tags")
+        custom_tags_str = request.form.get("custom_tags", "").strip()
+        custom_tags = [tag.strip() for tag in custom_tags_str.split(",") if tag.strip()]
+        new_tags = list(set(selected_tags + custom_tags))
+        if new_tags:
+            s.tags = ",".join(new_tags)
+        
+        s.privacy = request.form.get("privacy", s.privacy) or s.privacy
+        
+        try:
+            claimed = claimed_story_media()
+        except UploadError as e:
+            flash(e.message, "warning")
+            return redirect(url_for('stories.story_edit', story_id=story_id))
+
+        existing_media = request.form.getlist("existing_media")
+        media = [m for m in existing_media if m.strip()]
+        media += save_story_media(request.files.getlist("media") + claimed)
+        removed_media = set((s.media or '').split(',')) - set(media)
+        s.media = ",".join(media)
+
+        db.session.commit()
+        invalidate_author(current_user.id)
+        invalidate('stories', f'story:{story_id}')
+        release(removed_media)
+        return redirect(url_for('stories.story_confirm_save', story_id=story_id))
+    
+    return render_template('story_edit.html', story=s.to_dict(), tag_options=STORY_TAG_OPTIONS, user=current_user)
+
+@bp.route('/story/confirm-save/<int:story_id>')
+@login_required
+def story_confirm_save(story_id):
+    """Confirm save after editing"""
+    s = get_own_story(story_id)
+    if not s:
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_my_stories'))
+    flash("Story saved successfully!", "success")
+    return render_template('story_confirm_save.html', story=s.to_dict(), user=current_user)
+
+@bp.route('/story/my-stories')
+@login_required
+def story_my_stories():
+    """View all user's stories"""
+    q = request.args.get("q", "").strip().lower()
+    tag = request.args.get("tag", "").strip()
+    mine = Story.query.filter_by(user_id=current_user.id)
+    tags = sorted({t for (story_tags,) in mine.with_entities(Story.tags).all() for t in (story_tags or '').split(',') if t})
+    if q:
+        mine = mine.filter(db.or_(Story.title.ilike(f'%{q}%'), Story.description.ilike(f'%{q}%')))
+    stories = mine.order_by(Story.timestamp.desc()).all()
+    if tag:
+        stories = filter_by_tag(stories, tag)
+    return render_template('story_my_stories.html', stories=stories_to_dicts(stories), tags=tags, q=q, selected_tag=tag, user=current_user)
+
+@bp.route('/story/delete/<int:story_id>', methods=['GET', 'POST'])
+@login_required
+def story_delete(story_id):
+    """Delete a story"""
+    s = get_own_story(story_id)
+    if not s:
+        flash("Story not found.", "warning")
+        return redirect(url_for('stories.story_my_stories'))
+    
+    if request.method == 'POST':
+        confirm = request.form.get("confirm")
+        if confirm == "yes":
+            media = s.media
+            StoryComment.query.filter_by(story_id=s.id).delete()
+            db.session.delete(s)
+            db.session.commit()
+            release([media])
+            invalidate_author(current_user.id)
+            invalidate('stories', f'story:{story_id}')
+            flash("Story deleted successfully.", "success")
+            return redirect(url_for('stories.story_my_stories'))
+        else:
+            return redirect(url_for('stories.story_my_stories'))
+    
+    return render_template('story_confirm_delete.html', story=s.to_dict(), pending=True, user=current_user)
+
+@bp.route('/story/confirm-delete')
+@login_required
+def story_confirm_delete():
+    """Confirm deletion"""
+    return render_template('story_confirm_delete.html', story=None, pending=False, user=current_user)
@@ -0,0 +1,65 @@
+"""Chunked, resumable upload sessions (protocol described in chunked_upload.py)"""
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required, current_user
+
+from chunked_upload import UploadError, init_upload, get_status, append_chunk, complete_upload, abort_upload
+
+bp = Blueprint('uploads', __name__)
+
+
+@bp.app_errorhandler(UploadError)
+def upload_error(e):
+    return jsonify({'success': False, 'error': e.message, **e.extra}), e.status
+
+
+def _session_json(meta):
+    return {
+        'success': True,
+        'upload_id': meta['upload_id'],
+        'offset': meta['offset'],
+        'size': meta['size'],
+        'complete': meta['complete'],
+        'sha256': meta['sha256'],
+    }
+
+
+@bp.route('/upload-sessions/init', methods=['POST'])
+@login_required
+def upload_init():
+    """Start a chunked upload"""
+    data = request.get_json(silent=True) or {}
+    meta = init_upload(current_user.id, data.get('filename'), data.get('size'),
+                       data.get('purpose'), data.get('content_type'))
+    return jsonify({**_session_json(meta), 'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']}), 201
+
+
+@bp.route('/upload-sessions/<upload_id>')
+@login_required
+def upload_status(upload_id):
+    """How much of an upload has arrived, so the client knows where to resume"""
+    return jsonify(_session_json(get_status(upload_id, current_user.id)))
+
+
+@bp.route('/upload-sessions/<upload_id>/append', methods=['POST', 'PUT'])
+@login_required
+def upload_append(upload_id):
+    """Append the request body at ?offset=N (or the Upload-Offset header)"""
+    offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+    new_offset = append_chunk(upload_id, current_user.id, offset, request.stream, request.content_length)
+    return jsonify({'success': True, 'upload_id': upload_id, 'offset': new_offset})
+
+
+@bp.route('/upload-sessions/<upload_id>/complete', methods=['POST'])
+@login_required
+def upload_complete(upload_id):
+    """Finish an upload once every chunk has arrived"""
+    data = request.get_json(silent=True) or {}
+    return jsonify(_session_json(complete_upload(upload_id, current_user.id, data.get('sha256'))))
+
+
+@bp.route('/upload-sessions/<upload_id>', methods=['DELETE'])
+@login_required
+def upload_abort(upload_id):
+    """Abandon an upload and delete what has arrived"""
+    abort_upload(upload_id, current_user.id)
+    return jsonify({'success': True})
@@ -0,0 +1,528 @@
+"""Database schema setup and demo data.
+
+Nothing here runs at import time. Use the CLI commands registered in app.py:
+
+    flask --app app init-db   # create any missing tables / indexes
+    flask --app app seed      # init-db + demo hobbies, users, events, stories
+"""
+from datetime import datetime
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Event, Story, StoryComment, Hobby, Interest
+from vocab import resolve_ids
+
+
+# --- SCHEMA SETUP ---
+def ensure_schema():
+    """Create missing tables and indexes; a no-op on an up-to-date database.
+
+    One inspector pass lists the existing tables and indexes, so an
+    up-to-date database costs a handful of catalogue reads instead of a
+    CREATE attempt per table.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = [t for t in db.metadata.sorted_tables if t.name not in existing_tables]
+    if missing:
+        db.metadata.create_all(db.engine, tables=missing)
+
+    # Indexes added to tables that already existed
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.engine)
+
+    upgrade_autoincrement(existing_tables)
+    return [t.name for t in missing]
+
+
+# Ids an AUTOINCREMENT table must not hand out again besides its own rows:
+# table -> (table, column) recording ids that were deleted
+RETIRED_IDS = {'message': ('message_tombstone', 'message_id')}
+
+
+def upgrade_autoincrement(existing_tables):
+    """Rebuild SQLite tables created before their model asked for AUTOINCREMENT.
+
+    Without it SQLite reuses the highest id once that row is deleted, so a
+    watermark of "the max id" stops moving. SQLite can't ALTER a table into
+    AUTOINCREMENT: the rows are copied into a new table that replaces it.
+    Returns the names of the tables rebuilt.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return []
+    rebuilt = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables or not table.dialect_options['sqlite'].get('autoincrement'):
+            continue
+        with db.engine.begin() as conn:
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {'name': table.name}).scalar()
+            if 'AUTOINCREMENT' in ddl.upper():
+                continue
+            scratch = MetaData()  # the staging copy's foreign keys resolve against it
+            for other in db.metadata.sorted_tables:
+                other.to_metadata(scratch)
+            staging = table.to_metadata(scratch, name=f'{table.name}_rebuild')
+            columns = ', '.join(f'"{c.name}"' for c in table.columns)
+            conn.execute(CreateTable(staging))
+            conn.execute(text(f'INSERT INTO "{staging.name}" ({columns}) SELECT {columns} FROM "{table.name}"'))
+            conn.execute(text(f'DROP TABLE "{table.name}"'))  # and its indexes
+            conn.execute(text(f'ALTER TABLE "{staging.name}" RENAME TO "{table.name}"'))
+            for index in table.indexes:
+                index.create(conn)
+            if table.name in RETIRED_IDS:
+                retired_table, retired_column = RETIRED_IDS[table.name]
+                if retired_table in existing_tables:
+                    retired = conn.execute(text(f'SELECT MAX("{retired_column}") FROM "{retired_table}"')).scalar()
+                    _raise_sequence(conn, table.name, retired or 0)
+        rebuilt.append(table.name)
+    return rebuilt
+
+
+def _raise_sequence(conn, table_name, floor):
+    """Make the next AUTOINCREMENT id of table_name greater than floor"""
+    params = {'name': table_name, 'floor': floor}
+    updated = conn.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :floor) WHERE name = :name"), params)
+    if not updated.rowcount:
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :floor)"), params)
+
+
+# --- DATABASE SEEDER ---
+def seed_data():
+    hobbies_list = ['Coding', 'Gardening', 'Gaming', 'Cooking', 'Music']
+    resolve_ids(Hobby, hobbies_list)
+            
+    interests_list = ['Family', 'History', 'Food', 'Work Life', 'Travel', 'Health']
+    resolve_ids(Interest, interests_list)
+    
+    # Add sample users if they don't exist (one existence query for all of them)
+    sample_users = ['Yong', 'Lim Wei', 'Chen Hui', 'Margaret', 'Sarah']
+    existing = {name for (name,) in db.session.query(User.username).filter(User.username.in_(sample_users)).all()}
+    missing = [username for username in sample_users if username not in existing]
+    if missing:
+        # Hash once; every sample account shares the same demo password
+        password_hash = generate_password_hash('password123')
+        for username in missing:
+            user = User(username=username, email=f"{username.lower().replace(' ', '')}@example.com", dob='1990-01-01')
+            user._password_hash = password_hash
+            db.session.add(user)
+    
+    db.session.commit()
+    
+    # Add sample events if they don't exist
+    if Event.query.count() == 0:
+        sample_events = [
+            Event(
+                title='Traditional Dumpling Making Workshop',
+                description='Learn the art of making traditional Chinese dumplings from our experienced seniors. Perfect for beginners! We\'ll cover different folding techniques and share family recipes passed down through generations.',
+                date=datetime(2026, 2, 5).date(),
+                time=datetime.strptime('14:00', '%H:%M').time(),
+                category='Cooking',
+                location='Community Center, Toa Payoh Block 5',
+                slots=15,
+                host='Lim Wei',
+                image='default.png'
+            ),
+            Event(
+                title='Python for Beginners Workshop',
+                description='Join us for a hands-on Python programming workshop! Perfect for seniors who want to learn coding basics. We\'ll cover variables, loops, and build a simple calculator app together.',
+                date=datetime(2026, 2, 8).date(),
+                time=datetime.strptime('10:00', '%H:%M').time(),
+                category='Technology',
+                location='Ngee Ann Polytechnic, Block 51',
+                slots=20,
+                host='Yong',
+                image='default.png'
+            ),
+            Event(
+                title='Morning Tai Chi at Botanic Gardens',
+                description='Start your day with energizing Tai Chi exercises in the beautiful Singapore Botanic Gardens. Suitable for all fitness levels. Bring your own mat!',
+                date=datetime(2026, 2, 1).date(),
+                time=datetime.strptime('07:00', '%H:%M').time(),
+                category='Fitness',
+                location='Singapore Botanic Gardens, Palm Valley',
+                slots=25,
+                host='Margaret',
+                image='default.png'
+            ),
+            Event(
+                title='Vintage Photography Walk',
+                description='Explore the historic streets of Chinatown while learning vintage photography techniques. Bring your camera or smartphone. We\'ll share tips on composition, lighting, and capturing Singapore\'s heritage.',
+                date=datetime(2026, 2, 10).date(),
+                time=datetime.strptime('15:30', '%H:%M').time(),
+                category='Art',
+                location='Chinatown Heritage Centre',
+                slots=12,
+                host='Yong',
+                image='default.png'
+            ),
+            Event(
+                title='Community Gardening Day',
+                description='Help us beautify our neighborhood! Join fellow residents in planting flowers and vegetables in our community garden. Tools and refreshments provided. Great way to meet neighbors!',
+                date=datetime(2026, 2, 12).date(),
+                time=datetime.strptime('09:00', '%H:%M').time(),
+                category='Environmental',
+                location='Bishan Community Garden',
+                slots=30,
+                host='Chen Hui',
+                image='default.png'
+            ),
+            Event(
+                title='Guitar Jam Session for Beginners',
+                description='Bring your guitar and join us for a casual jam session! Whether you\'re just starting out or have been playing for years, everyone is welcome. We\'ll play classic oldies and modern hits.',
+                date=datetime(2026, 2, 15).date(),
+                time=datetime.strptime('18:00', '%H:%M').time(),
+                category='Music',
+                location='Esplanade Outdoor Theatre',
+                slots=18,
+                host='Sarah',
+                image='default.png'
+            ),
+            Event(
+                title='Coffee Chat: Life Stories',
+                description='Join us for a relaxed afternoon of coffee and conversation. Share your life experiences, listen to others\' stories, and make new friends across generations. Refreshments provided!',
+                date=datetime(2026, 2, 6).date(),
+                time=datetime.strptime('15:00', '%H:%M').time(),
+                category='Social',
+                location='Starbucks, Orchard Central',
+                slots=10,
+                host='Lim Wei',
+                image='default.png'
+            ),
+            Event(
+                title='Heritage Craft Workshop: Batik Painting',
+                description='Discover the beautiful art of batik painting! Learn traditional techniques and create your own batik masterpiece to take home. All materials included. No experience necessary.',
+                date=datetime(2026, 2, 18).date(),
+                time=datetime.strptime('13:00', '%H:%M').time(),
+                category='Craft',
+                location='Kampong Glam Community Centre',
+                slots=15,
+                host='Chen Hui',
+                image='default.png'
+            ),
+            Event(
+                title='Board Games & Snacks Night',
+                description='Dust off those classic board games and join us for a fun evening! From Monopoly to Scrabble, we\'ll have a variety of games. Bring your favorites or try something new. Snacks provided!',
+                date=datetime(2026, 2, 20).date(),
+                time=datetime.strptime('19:00', '%H:%M').time(),
+                category='Social',
+                location='Tampines Regional Library',
+                slots=20,
+                host='Margaret',
+                image='default.png'
+            ),
+            Event(
+                title='Coastal Cleanup at East Coast Park',
+                description='Make a difference for our environment! Join us in cleaning up East Coast Park beach. Gloves and bags provided. Stay after for a beach picnic and socializing!',
+                date=datetime(2026, 2, 22).date(),
+                time=datetime.strptime('08:00', '%H:%M').time(),
+                category='Environmental',
+                location='East Coast Park, Area C',
+                slots=40,
+                host='Yong',
+                image='default.png'
+            ),
+            Event(
+                title='Mandarin Conversation Circle',
+                description='Improve your Mandarin Chinese in a relaxed, friendly setting. Native speakers welcome to help out! All levels from beginner to advanced. Hot tea and snacks provided.',
+                date=datetime(2026, 2, 24).date(),
+                time=datetime.strptime('14:00', '%H:%M').time(),
+                category='Social',
+                location='Jurong Regional Library',
+                slots=15,
+                host='Chen Hui',
+                image='default.png'
+            ),
+            Event(
+                title='Healthy Cooking: Low-Sodium Recipes',
+                description='Learn to prepare delicious meals while keeping sodium intake in check. Perfect for seniors managing blood pressure. Chef will demonstrate and provide recipe cards. Tasting session included!',
+                date=datetime(2026, 2, 25).date(),
+                time=datetime.strptime('10:00', '%H:%M').time(),
+                category='Cooking',
+                location='Bukit Merah Community Centre',
+                slots=20,
+                host='Margaret',
+                image='default.png'
+            ),
+            Event(
+                title='Smartphone Basics Workshop',
+                description='Master the basics of your smartphone! Learn about apps, taking photos, video calls, and staying safe online. One-on-one support available. Bring your own device.',
+                date=datetime(2026, 2, 27).date(),
+                time=datetime.strptime('11:00', '%H:%M').time(),
+                category='Technology',
+                location='Ang Mo Kio Community Club',
+                slots=25,
+                host='Lim Wei',
+                image='default.png'
+            ),
+            Event(
+                title='Walking Tour: Hidden Gems of Singapore',
+                description='Discover lesser-known spots and stories of Singapore! Our local expert will guide you through hidden alleys, heritage trails, and scenic viewpoints. Easy pace, suitable for all fitness levels.',
+                date=datetime(2026, 3, 1).date(),
+                time=datetime.strptime('09:00', '%H:%M').time(),
+                category='Outdoor',
+                location='Meet at Raffles Hotel, Singapore',
+                slots=22,
+                host='Sarah',
+                image='default.png'
+            ),
+            Event(
+                title='Watercolor Painting Basics',
+                description='Express your creativity with watercolor! Learn basic techniques including washes, glazing, and wet-on-wet methods. All materials provided. No prior experience needed.',
+                date=datetime(2026, 3, 3).date(),
+                time=datetime.strptime('15:00', '%H:%M').time(),
+                category='Art',
+                location='Tampines West Community Centre',
+                slots=18,
+                host='Yong',
+                image='default.png'
+            ),
+            Event(
+                title='Yoga & Meditation for Relaxation',
+                description='Find peace and flexibility through gentle yoga and guided meditation. Perfect for beginners and seniors. No equipment needed beyond a mat. Increase mobility and reduce stress!',
+                date=datetime(2026, 3, 5).date(),
+                time=datetime.strptime('08:30', '%H:%M').time(),
+                category='Fitness',
+                location='Clementi Community Centre',
+                slots=30,
+                host='Chen Hui',
+                image='default.png'
+            ),
+            Event(
+                title='Storytelling: Share Your Memoir',
+                description='Ever wanted to preserve your life story? Join our storytelling session and share your most memorable moments. Others will listen, appreciate, and you\'ll create lasting memories together.',
+                date=datetime(2026, 3, 8).date(),
+                time=datetime.strptime('16:00', '%H:%M').time(),
+                category='Social',
+                location='Buona Vista Community Centre',
+                slots=12,
+                host='Margaret',
+                image='default.png'
+            ),
+            Event(
+                title='Ukulele for Seniors',
+                description='Pick up a ukulele and play your favorite songs! Perfect instrument for beginners. Learn basic chords and strum some classics. Instruments available for rent if you don\'t have one.',
+                date=datetime(2026, 3, 10).date(),
+                time=datetime.strptime('14:00', '%H:%M').time(),
+                category='Music',
+                location='Serangoon Community Club',
+                slots=16,
+                host='Lim Wei',
+                image='default.png'
+            ),
+            Event(
+                title='Woodworking: Build a Bird House',
+                description='Learn basic woodworking by building a beautiful bird house! All tools and materials provided. Take home your creation and attract birds to your garden.',
+                date=datetime(2026, 3, 12).date(),
+                time=datetime.strptime('10:00', '%H:%M').time(),
+                category='Craft',
+                location='MacPherson Community Centre',
+                slots=14,
+                host='Yong',
+                image='default.png'
+            )
+        ]
+        
+        for event in sample_events:
+            db.session.add(event)
+        
+        db.session.commit()
+        print("Database seeded with sample events!")
+
+    # Add sample stories if they don't exist
+    if Story.query.count() == 0:
+        author_names = {sample["author"] for sample in SAMPLE_STORIES}
+        authors = {u.username: u.id for u in User.query.filter(User.username.in_(author_names)).all()}
+        for sample in SAMPLE_STORIES:
+            author_id = authors.get(sample["author"])
+            if not author_id:
+                continue
+            posted = datetime.strptime(sample["date"], "%Y-%m-%d")
+            story = Story(
+                title=sample["title"],
+                description=sample["description"],
+                date=posted.date(),
+                media=",".join(sample["media"]),
+                tags=",".join(sample["tags"]),
+                privacy=sample["privacy"],
+                likes=sample["likes"],
+                saved=sample["saved"],
+                reported=sample["reported"],
+                timestamp=posted,
+                user_id=author_id
+            )
+            story.comments = [StoryComment(author=c["author"], text=c["text"]) for c in sample["comments"]]
+            db.session.add(story)
+        db.session.commit()
+        print("Database seeded with sample stories!")
+            
+    db.session.commit()
+    print("Database seeded with Hobbies and Interests!")
+
+# --- SAMPLE STORIES (seeded into the Story table) ---
+SAMPLE_STORIES = [
+    {
+        "title": "Sunset at Marina Bay",
+        "description": "Caught the golden hour—added a timelapse clip.",
+        "media": [],
+        "date": "2026-01-10",
+        "tags": ["Travel", "Photography"],
+        "privacy": "Public",
+        "likes": 12,
+        "comments": [
+            {"author": "Ava", "text": "Beautiful colors!"},
+            {"author": "Ken", "text": "Timelapse is smooth."}
+        ],
+        "saved": False,
+        "reported": False,
+        "author": "Yong"
+    },
+    {
+        "title": "First Flask App",
+        "description": "Built a small app with Bootstrap and WTForms.",
+        "media": [],
+        "date": "2026-01-12",
+        "tags": ["Tech", "Learning"],
+        "privacy": "Public",
+        "likes": 7,
+        "comments": [{"author": "Mia", "text": "Nice progress!"}],
+        "saved": True,
+        "reported": False,
+        "author": "Yong"
+    },
+    {
+        "title": "Weekend Hike at Bukit Timah",
+        "description": "Conquered the summit trail at Bukit Timah Nature Reserve today! The climb was challenging but the view from the top was absolutely worth it.",
+        "media": [],
+        "date": "2026-01-13",
+        "tags": ["Travel", "Nature", "Lifestyle"],
+        "privacy": "Public",
+        "likes": 15,
+        "comments": [
+            {"author": "Jake", "text": "Great photos! I should go hiking more."},
+            {"author": "Sarah", "text": "The trail looks amazing!"}
+        ],
+        "saved": False,
+        "reported": False,
+        "author": "Yong"
+    },
+    {
+        "title": "Morning Tai Chi at East Coast Park",
+        "description": "Started my day with a peaceful tai chi session by the beach. The morning breeze and sound of waves made it even more relaxing.",
+        "media": [],
+        "date": "2026-01-15",
+        "tags": ["Lifestyle", "Health", "Seniors"],
+        "privacy": "Public",
+        "likes": 24,
+        "comments": [
+            {"author": "Margaret", "text": "I should join you next time!"},
+            {"author": "Robert", "text": "Great way to start the day."}
+        ],
+        "saved": False,
+        "reported": False,
+        "author": "Lim Wei"
+    },
+    {
+        "title": "Grandma's Secret Chicken Rice Recipe",
+        "description": "Spent the afternoon learning my grandmother's famous Hainanese chicken rice recipe. She shared tips passed down from her mother.",
+        "media": ["uploads/chicken_rice.avif"],
+        "date": "2026-01-14",
+        "tags": ["Food", "Family", "Seniors"],
+        "privacy": "Public",
+        "likes": 31,
+        "comments": [
+            {"author": "Sarah", "text": "Please share the recipe!"},
+            {"author": "David", "text": "Family recipes are precious treasures."}
+        ],
+        "saved": False,
+        "reported": False,
+        "author": "Chen Hui"
+    },
+    {
+        "title": "My First Day on BridgeGen",
+        "description": "Just joined this amazing community platform! Excited to connect with people from different generations and share our stories.",
+        "media": [],
+        "date": "2026-01-20",
+        "tags": ["Lifestyle", "Community"],
+        "privacy": "Public",
+        "likes": 8,
+        "comments": [
+            {"author": "Yong", "text": "Welcome to the community!"},
+            {"author": "Lim Wei", "text": "Glad to have you here!"}
+        ],
+        "saved": False,
+        "reported": False,
+        "author": "yongen"
+    },
+    {
+        "title": "Building BridgeGen Platform",
+        "description": "Working on a full-stack Flask application for my web development project. Implementing user authentication, stories, events, and community features. It's challenging but rewarding!",
+        "media": [],
+        "date": "2026-01-22",
+        "tags": ["Tech", "Learning", "Projects"],
+        "privacy": "Public",
+        "likes": 15,
+        "comments": [
+            {"author": "Yong", "text": "Flask is powerful, keep it up!"},
+            {"author": "Mia", "text": "Can't wait to see the final product!"}
+        ],
+        "saved": True,
+        "reported": False,
+        "author": "yongen"
+    },
+    {
+        "title": "Coffee Study Session at NP",
+        "description": "Pulled an all-nighter at the library preparing for my IT project presentation. Coffee is my best friend right now!",
+        "media": [],
+        "date": "2026-01-23",
+        "tags": ["Education", "Lifestyle"],
+        "privacy": "Public",
+        "likes": 12,
+        "comments": [
+            {"author": "Jake", "text": "Good luck with your presentation!"},
+            {"author": "Sarah", "text": "You got this!"}
+        ],
+        "saved": False,
+        "reported": False,
+        "author": "yongen"
+    },
+    {
+        "title": "Weekend Gaming Marathon",
+        "description": "Finally beat that boss I've been stuck on for weeks! Gaming is such a great way to unwind after a long week of coding.",
+        "media": [],
+        "date": "2026-01-24",
+        "tags": ["Gaming", "Lifestyle", "Entertainment"],
+        "privacy": "Public",
+        "likes": 20,
+        "comments": [
+            {"author": "Ken", "text": "Which game?"},
+            {"author": "David", "text": "Gaming and coding go hand in hand!"}
+        ],
+        "saved": True,
+        "reported": False,
+        "author": "yongen"
+    },
+    {
+        "title": "Learning Python for Web Development",
+        "description": "Deep diving into Flask, SQLAlchemy, and building RESTful APIs. The learning curve is steep but I'm making steady progress every day.",
+        "media": [],
+        "date": "2026-01-25",
+        "tags": ["Tech", "Learning", "Programming"],
+        "privacy": "Public",
+        "likes": 18,
+        "comments": [
+            {"author": "Yong", "text": "Python is a great choice!"},
+            {"author": "Mia", "text": "Keep up the great work!"}
+        ],
+        "saved": True,
+        "reported": False,
+        "author": "yongen"
+    },
+]
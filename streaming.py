@@ -0,0 +1,92 @@
+"""Streamed rendering for pages with long lists.
+
+Community detail, My Events and the chat page used to run every query and
+render every card before sending a byte. stream_page() sends the page while
+it renders instead:
+
+    return stream_page('event_my_events.html', joined=rows(joined_query), ...)
+
+- {{ flush() }} in a template sends everything rendered so far. base.html
+  flushes the <head>, nav and flashed messages before the content block,
+  and pages flush again after their above-the-fold part. Between flushes
+  output is buffered up to STREAM_BUFFER characters, so the wire sees a few
+  sizeable chunks rather than one per template expression (compress.py
+  compresses each one)
+- lists go in as lazy iterables from rows(query), fetched BATCH_SIZE at a
+  time when the template reaches them, after the top of the page is on its
+  way. A batch can be prepared in one go (likes, counts) with prepare=
+- the database session the view used is removed when the view returns,
+  so rows the view loaded are detached by the time the template reads
+  them: their columns are fine, but a lazy relationship (post.author,
+  current_user.friends) must be loaded up front or queried inside rows()
+- the response headers, session cookie included, go out before the body:
+  flashed messages are popped up front, and anything else that touches the
+  session has to happen in the view, not the template
+- flush() renders nothing in pages that use render_template
+"""
+from itertools import islice
+
+from flask import current_app, g, get_flashed_messages, render_template, stream_template
+from markupsafe import Markup
+
+from models import db
+
+BATCH_SIZE = 50  # rows fetched per query while a list streams
+STREAM_BUFFER = 16 * 1024  # characters buffered between explicit flushes
+
+FLUSH_MARKER = '<!--flush-->'
+
+# Benchmarks flip this to measure whole-page rendering
+ENABLED = True
+
+
+def flush():
+    """{{ flush() }}: send what has rendered so far when the page is streamed"""
+    return Markup(FLUSH_MARKER if g.get('streaming') else '')
+
+
+def rows(query, size=BATCH_SIZE, prepare=None):
+    """Iterate query's rows, fetching size at a time; prepare(batch) runs on each batch first"""
+    # Model.query is bound to the view's session, which is gone by now
+    results = iter(query.with_session(db.session()).yield_per(size))
+    while batch := list(islice(results, size)):
+        if prepare is not None:
+            prepare(batch)
+        yield from batch
+
+
+def _buffered(parts, name):
+    buffer, buffered = [], 0
+    try:
+        for part in parts:
+            if FLUSH_MARKER in part:
+                # str() first: Markup.split would escape-wrap every piece
+                *flushed, part = str(part).split(FLUSH_MARKER)
+                buffer.extend(flushed)
+                if any(buffer):
+                    yield ''.join(buffer)
+                buffer, buffered = [], 0
+            buffer.append(part)
+            buffered += len(part)
+            if buffered >= STREAM_BUFFER:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+    except Exception as e:
+        # The status line is long gone; end the page where it broke
+        print(f"Error streaming {name}: {e}")
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+    """Like render_template, but the response streams as the template renders"""
+    if not ENABLED:
+        return render_template(template_name, **context)
+    get_flashed_messages()  # popped now, while the session can still be saved
+    g.streaming = True
+    parts = stream_template(template_name, **context)
+    return current_app.response_class(_buffered(parts, template_name), mimetype='text/html')
+
+
+def register_streaming(app):
+    app.add_template_global(flush)
@@ -0,0 +1,133 @@
+"""Privacy-aware story timelines.
+
+Story visibility rules:
+- Public  -> everyone
+- Friends -> the author and users the author has added as a friend
+- Private -> only the author
+
+The friends timeline is built fan-out-on-read: the viewer's followed authors
+and the authors who count the viewer as a friend are resolved with one query
+each, and the privacy rules are applied inside the story query itself, which
+walks the (user_id, timestamp) index. The resulting story ids are kept in a
+short-TTL per-viewer cache that is dropped on new posts and friendship
+changes.
+"""
+from models import db, User, Story, StoryComment, connections
+from cache import TTLCache
+from fragments import invalidate
+
+TIMELINE_SIZE = 50
+TIMELINE_TTL = 60  # seconds
+
+_timeline_cache = TTLCache(maxsize=2048, ttl=TIMELINE_TTL)
+
+
+# --- FRIENDSHIP LOOKUPS (one query each) ---
+def followed_ids(viewer_id):
+    """Users the viewer has added as friends"""
+    rows = db.session.query(connections.c.friend_id).filter(connections.c.user_id == viewer_id).all()
+    return {r[0] for r in rows}
+
+
+def follower_ids(author_id):
+    """Users who have added the author as a friend"""
+    rows = db.session.query(connections.c.user_id).filter(connections.c.friend_id == author_id).all()
+    return {r[0] for r in rows}
+
+
+# --- BULK PRIVACY CHECKS ---
+def visibility_filter(viewer_id):
+    """SQL filter selecting every story the viewer may see"""
+    friended_viewer = db.select(connections.c.user_id).where(connections.c.friend_id == viewer_id)
+    return db.or_(
+        Story.privacy == 'Public',
+        Story.user_id == viewer_id,
+        db.and_(Story.privacy == 'Friends', Story.user_id.in_(friended_viewer))
+    )
+
+
+def can_view(story, viewer_id):
+    """Single-story privacy check used by the detail pages"""
+    if story.user_id == viewer_id or story.privacy == 'Public':
+        return True
+    if story.privacy == 'Friends':
+        return db.session.query(connections).filter(
+            connections.c.user_id == story.user_id,
+            connections.c.friend_id == viewer_id
+        ).first() is not None
+    return False
+
+
+# --- HYDRATION ---
+def stories_to_dicts(stories):
+    """Convert a list of stories to template dicts with authors and comments batch-loaded"""
+    if not stories:
+        return []
+    story_ids = [s.id for s in stories]
+    author_ids = {s.user_id for s in stories}
+    authors = dict(db.session.query(User.id, User.username).filter(User.id.in_(author_ids)).all())
+
+    comments = {sid: [] for sid in story_ids}
+    for c in StoryComment.query.filter(StoryComment.story_id.in_(story_ids)).order_by(StoryComment.id).all():
+        comments[c.story_id].append({'author': c.author, 'text': c.text})
+
+    return [s.to_dict(author_name=authors.get(s.user_id, ''), comments=comments[s.id]) for s in stories]
+
+
+def load_stories(story_ids):
+    """Fetch stories by id, preserving the given order"""
+    if not story_ids:
+        return []
+    by_id = {s.id: s for s in Story.query.filter(Story.id.in_(story_ids)).all()}
+    return [by_id[sid] for sid in story_ids if sid in by_id]
+
+
+# --- FRIENDS TIMELINE ---
+def _timeline_story_ids(viewer_id, limit):
+    following = followed_ids(viewer_id)
+    if not following:
+        return []
+    friended_viewer = {r[0] for r in db.session.query(connections.c.user_id).filter(
+        connections.c.friend_id == viewer_id,
+        connections.c.user_id.in_(following)
+    ).all()}
+
+    privacy_ok = Story.privacy == 'Public'
+    if friended_viewer:
+        privacy_ok = db.or_(privacy_ok, db.and_(Story.privacy == 'Friends', Story.user_id.in_(friended_viewer)))
+
+    rows = (db.session.query(Story.id)
+            .filter(Story.user_id.in_(following), privacy_ok)
+            .order_by(Story.timestamp.desc(), Story.id.desc())
+            .limit(limit)
+            .all())
+    return [r[0] for r in rows]
+
+
+def get_friends_timeline(viewer_id, limit=TIMELINE_SIZE):
+    """Stories from the viewer's friends that the viewer is allowed to see, newest first"""
+    story_ids = _timeline_cache.get(viewer_id)
+    if story_ids is None:
+        story_ids = _timeline_story_ids(viewer_id, TIMELINE_SIZE)
+        _timeline_cache.set(viewer_id, story_ids)
+    return load_stories(story_ids[:limit])
+
+
+# --- INVALIDATION ---
+def invalidate_viewer(viewer_id):
+    """Drop the cached timeline for one viewer"""
+    _timeline_cache.delete(viewer_id)
+
+
+def invalidate_author(author_id):
+    """Call after an author creates, edits or deletes a story"""
+    for viewer_id in follower_ids(author_id) | {author_id}:
+        invalidate_viewer(viewer_id)
+
+
+def invalidate_friendship(user_id, friend_id):
+    """Call after a connection between two users is added or removed"""
+    invalidate_viewer(user_id)
+    invalidate_viewer(friend_id)
+    # Story browse listings are cached per viewer (routes/stories.py)
+    invalidate(f'friends:{user_id}', f'friends:{friend_id}')
@@ -0,0 +1,117 @@
+"""Process-wide name -> id cache for the small Hobby / Interest lookup tables.
+
+Profile saves resolve every selected name at once: known names come from the
+cache, and unknown ones are inserted with a single INSERT ... ON CONFLICT DO
+NOTHING followed by one SELECT for their ids. That statement exists on SQLite
+and PostgreSQL; other databases select first and insert each new name in a
+savepoint, skipping any a concurrent save inserted first. Nothing is
+committed here, so the caller's commit covers the whole profile save.
+
+Ids for rows created in a transaction only enter the cache once that
+transaction commits, so a rollback can never leave dangling ids behind.
+"""
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, Hobby, Interest, user_hobbies, user_interests
+
+_LINK_TABLES = {
+    Hobby: (user_hobbies, 'hobby_id', 'hobbies'),
+    Interest: (user_interests, 'interest_id', 'interests'),
+}
+
+_vocab = {}
+_lock = threading.Lock()
+
+
+def _load(model):
+    """Name -> id mapping for a vocabulary table, loaded once per process"""
+    names = _vocab.get(model)
+    if names is None:
+        names = dict(db.session.query(model.name, model.id).all())
+        with _lock:
+            _vocab[model] = names
+    return names
+
+
+def _insert_ignore(table, dialect):
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).on_conflict_do_nothing(index_elements=['name'])
+
+
+def _insert_missing(model, names):
+    """Insert the names the table does not have yet; one inserted concurrently is skipped"""
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        db.session.execute(_insert_ignore(model.__table__, dialect), [{'name': name} for name in names])
+        return
+    existing = {name for (name,) in db.session.query(model.name).filter(model.name.in_(names))}
+    for name in names:
+        if name in existing:
+            continue
+        try:
+            # A savepoint, so losing the race for one name keeps the rest of the save
+            with db.session.begin_nested():
+                db.session.execute(model.__table__.insert(), {'name': name})
+        except IntegrityError:
+            pass  # another save inserted it first; the caller's SELECT picks up its id
+
+
+def clean_names(names):
+    """Strip blanks and duplicates while keeping the user's order"""
+    seen = []
+    for name in names:
+        name = (name or '').strip()
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def resolve_ids(model, names):
+    """Return {name: id} for every name, inserting any that do not exist yet"""
+    names = clean_names(names)
+    known = _load(model)
+    resolved = {name: known[name] for name in names if name in known}
+    missing = [name for name in names if name not in resolved]
+    if not missing:
+        return resolved
+
+    _insert_missing(model, missing)
+    created = dict(db.session.query(model.name, model.id).filter(model.name.in_(missing)).all())
+    resolved.update(created)
+
+    pending = db.session.info.setdefault('pending_vocab', [])
+    pending.append((model, created))
+    return resolved
+
+
+def set_user_vocab(user, model, names):
+    """Replace a user's hobbies or interests with the given names in bulk"""
+    link_table, fk_column, attr = _LINK_TABLES[model]
+    ids = list(dict.fromkeys(resolve_ids(model, names).values()))
+
+    db.session.execute(link_table.delete().where(link_table.c.user_id == user.id))
+    if ids:
+        db.session.execute(link_table.insert(), [{'user_id': user.id, fk_column: vid} for vid in ids])
+    # The ORM collection no longer matches the link table
+    db.session.expire(user, [attr])
+
+
+# --- CACHE CONSISTENCY ---
+@event.listens_for(Session, 'after_commit')
+def _promote_pending(session):
+    for model, created in session.info.pop('pending_vocab', []):
+        with _lock:
+            if model in _vocab:
+                _vocab[model].update(created)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_pending(session, previous_transaction):
+    session.info.pop('pending_vocab', None)